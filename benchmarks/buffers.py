@@ -0,0 +1,69 @@
+"""Benchmark the memory allocated by the base64 decoding and encoding.
+
+Usage::
+
+    python benchmarks/buffers.py [size in MB] [iterations]
+
+It decodes and encodes the same payload many times, as a process
+downloading and uploading files under sustained load, with the standard
+library and with :class:`textunited.buffers.BufferPool`. For each path it
+prints the seconds per call, the memory allocated at the peak of each call
+measured with tracemalloc, and the buffers allocated by the pool.
+"""
+import base64
+import os
+import sys
+import time
+import tracemalloc
+
+from textunited.buffers import BufferPool
+
+
+def measure(func, iterations):
+    """Return the seconds and the peak bytes allocated by each call."""
+    func()
+    elapsed = 0.0
+    peak = 0
+    for _ in range(iterations):
+        # traced from zero for each call, tracemalloc.reset_peak needs
+        # Python 3.9
+        tracemalloc.start()
+        start = time.perf_counter()
+        func()
+        elapsed += time.perf_counter() - start
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return elapsed / iterations, peak
+
+
+def main(size_mb=16, iterations=20):
+    """Print the time and the memory of each path."""
+    content = os.urandom(size_mb * 1024 * 1024)
+    payload = str(base64.b64encode(content), 'ascii')
+    pool = BufferPool(max_buffer_size=2 * len(payload))
+
+    def pool_decode():
+        with pool.decode(payload) as buffer:
+            return len(buffer.view)
+
+    paths = [
+        ('decode std', lambda: base64.b64decode(payload)),
+        ('decode pool', pool_decode),
+        ('encode std', lambda: str(base64.b64encode(content), 'utf-8')),
+        ('encode pool', lambda: pool.encode(content)),
+    ]
+    print('{} MB payload, {} iterations'.format(size_mb, iterations))
+    print('{:<12} {:>10} {:>10} {:>12}'.format(
+        'path', 'time (s)', 'peak (MB)', 'pool allocs'
+    ))
+    for name, func in paths:
+        allocations = pool.stats()['allocations']
+        elapsed, peak = measure(func, iterations)
+        print('{:<12} {:>10.4f} {:>10.2f} {:>12}'.format(
+            name, elapsed, peak / (1024 * 1024),
+            pool.stats()['allocations'] - allocations,
+        ))
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,69 @@
+"""Benchmark the base64 codec to find the crossover of the process pool.
+
+Usage::
+
+    python benchmarks/codec.py [max size in MB]
+
+For each payload size it prints the seconds spent decoding by the standard
+library and by the chunked process pool path, and the longest time another
+thread of the process was stalled meanwhile. The threshold of
+:class:`textunited.codec.Codec` should be set around the first size where the
+process pool is faster, or where the stall of the standard library is not
+acceptable for the application.
+"""
+import base64
+import os
+import sys
+import threading
+import time
+
+from textunited.codec import Codec
+
+
+def measure(func):
+    """Return the seconds spent by func and the longest stall of a thread."""
+    gaps = []
+    done = threading.Event()
+
+    def tick():
+        last = time.perf_counter()
+        while not done.is_set():
+            time.sleep(0.001)
+            now = time.perf_counter()
+            gaps.append(now - last)
+            last = now
+
+    ticker = threading.Thread(target=tick)
+    ticker.start()
+    time.sleep(0.01)
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    done.set()
+    ticker.join()
+    return elapsed, max(gaps)
+
+
+def main(max_size_mb=256):
+    """Print the timings of both paths for growing payloads."""
+    parallel = Codec(threshold=0)
+    # start the worker processes before measuring
+    parallel.b64decode(base64.b64encode(b'warm up'))
+    print('{} CPUs'.format(os.cpu_count()))
+    print('{:>10} {:>10} {:>10} {:>10} {:>10}'.format(
+        'size (MB)', 'std (s)', 'stall (s)', 'pool (s)', 'stall (s)'
+    ))
+    size = 1024 * 1024
+    while size <= max_size_mb * 1024 * 1024:
+        encoded = base64.b64encode(os.urandom(size))
+        std = measure(lambda: base64.b64decode(encoded))
+        pool = measure(lambda: parallel.b64decode(encoded))
+        print('{:>10} {:>10.4f} {:>10.4f} {:>10.4f} {:>10.4f}'.format(
+            size // (1024 * 1024), *(std + pool)
+        ))
+        size *= 2
+    parallel.shutdown()
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,69 @@
+"""Benchmark the import time of the package.
+
+Usage::
+
+    python benchmarks/importtime.py [--record FILE]
+
+It runs ``python -X importtime`` for a few import statements and prints the
+microseconds spent importing modules, minus the imports of the interpreter
+start up, of the fastest run out of five. With ``--record`` the
+results are appended as a JSON line with the package version, so they can be
+compared across releases.
+"""
+import json
+import subprocess
+import sys
+
+STATEMENTS = (
+    'import textunited',
+    'from textunited import Language',
+    'from textunited import TextUnitedClient',
+)
+RUNS = 5
+
+
+def import_time(statement):
+    """Return the microseconds of all the top level imports."""
+    best = None
+    for _ in range(RUNS):
+        output = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', statement],
+            stderr=subprocess.PIPE,
+            check=True,
+            universal_newlines=True,
+        ).stderr
+        total = 0
+        for line in output.splitlines():
+            if not line.startswith('import time:') or '|' not in line:
+                continue
+            _, cumulative, name = line.split('|')
+            # nested imports are included in the top level ones
+            if not name.startswith('  ') and cumulative.strip().isdigit():
+                total += int(cumulative)
+        best = total if best is None else min(best, total)
+    return best
+
+
+def main(argv):
+    """Print the import times and record them if asked."""
+    import textunited
+
+    start_up = import_time('pass')
+    results = {
+        statement: import_time(statement) - start_up
+        for statement in STATEMENTS
+    }
+    for statement, value in results.items():
+        print('{:>10} us  {}'.format(value, statement))
+
+    if len(argv) == 2 and argv[0] == '--record':
+        with open(argv[1], 'a') as f:
+            f.write(json.dumps({
+                'version': textunited.__version__,
+                'python': sys.version.split()[0],
+                'results': results,
+            }) + '\n')
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
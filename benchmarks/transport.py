@@ -0,0 +1,256 @@
+"""Benchmark the HTTP transports against local stand-in servers.
+
+Usage::
+
+    python benchmarks/transport.py [requests] [threads] [latency in ms]
+
+Local servers answer every request with a small file content in the format
+of ``/projectfiles``, after the given latency. Each transport sends the same
+requests from a pool of threads through the client, and the requests per
+second and the connections opened are printed.
+
+The HTTP/1.1 transports are measured against a threaded HTTP/1.1 server and
+the HTTP/2 transport against an HTTP/2 server without TLS, built with the
+`h2` package installed by the ``http2`` extra. With HTTP/1.1 each thread
+needs its own connection, with HTTP/2 the requests of all the threads are
+multiplexed over a single connection.
+"""
+import asyncio
+import base64
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+import requests
+
+from textunited.client import TextUnitedClient
+from textunited.transport import (
+    HTTP2Transport,
+    RequestsTransport,
+    Urllib3Transport,
+)
+
+BODY = json.dumps({
+    'Content': str(base64.b64encode(os.urandom(4096)), 'utf-8'),
+}).encode()
+
+
+class Counter:
+    """Counter of the connections accepted by a server."""
+
+    def __init__(self):
+        """Constructor."""
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def increment(self):
+        """Count a connection."""
+        with self._lock:
+            self.value += 1
+
+
+class Handler(BaseHTTPRequestHandler):
+    """Handler answering with a file content."""
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        """Count the connection."""
+        super().setup()
+        self.server.connections.increment()
+
+    def do_GET(self):
+        """Answer with the file content."""
+        time.sleep(self.server.latency)
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def log_message(self, *args):
+        """Do not log the requests."""
+        pass
+
+
+class Server(ThreadingMixIn, HTTPServer):
+    """Threaded HTTP/1.1 server."""
+
+    daemon_threads = True
+
+    def __init__(self, latency):
+        """Constructor."""
+        super().__init__(('127.0.0.1', 0), Handler)
+        self.latency = latency
+        self.connections = Counter()
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def url(self):
+        """Return the URL of the file contents."""
+        return 'http://127.0.0.1:{}/api/projectfiles'.format(self.server_port)
+
+    def close(self):
+        """Stop the server."""
+        self.shutdown()
+        self.server_close()
+
+
+class H2Protocol(asyncio.Protocol):
+    """HTTP/2 connection answering each stream with a file content."""
+
+    def __init__(self, server):
+        """Constructor."""
+        import h2.config
+        import h2.connection
+        self.server = server
+        self.conn = h2.connection.H2Connection(
+            h2.config.H2Configuration(client_side=False)
+        )
+        self.transport = None
+        # bytes of the body left to send by stream, waiting for the window
+        self.pending = {}
+
+    def connection_made(self, transport):
+        """Send the settings of the server."""
+        self.server.connections.increment()
+        self.transport = transport
+        self.conn.initiate_connection()
+        transport.write(self.conn.data_to_send())
+
+    def data_received(self, data):
+        """Answer the requests after the latency."""
+        import h2.events
+        import h2.exceptions
+        try:
+            events = self.conn.receive_data(data)
+        except h2.exceptions.ProtocolError:
+            self.transport.write(self.conn.data_to_send())
+            self.transport.close()
+            return
+        for event in events:
+            if isinstance(event, h2.events.StreamEnded):
+                asyncio.get_event_loop().call_later(
+                    self.server.latency, self.respond, event.stream_id
+                )
+            elif isinstance(event, h2.events.WindowUpdated):
+                self.flush()
+            elif isinstance(event, h2.events.StreamReset):
+                self.pending.pop(event.stream_id, None)
+        self.transport.write(self.conn.data_to_send())
+
+    def respond(self, stream_id):
+        """Send the headers and the body of a response."""
+        if self.transport.is_closing():
+            return
+        self.conn.send_headers(stream_id, [
+            (':status', '200'),
+            ('content-type', 'application/json'),
+            ('content-length', str(len(BODY))),
+        ])
+        self.pending[stream_id] = BODY
+        self.flush()
+
+    def flush(self):
+        """Send the bodies as far as the flow control windows allow."""
+        for stream_id, data in list(self.pending.items()):
+            window = min(
+                self.conn.local_flow_control_window(stream_id),
+                self.conn.max_outbound_frame_size,
+            )
+            while data and window > 0:
+                chunk, data = data[:window], data[window:]
+                self.conn.send_data(stream_id, chunk)
+                window = min(
+                    self.conn.local_flow_control_window(stream_id),
+                    self.conn.max_outbound_frame_size,
+                )
+            if data:
+                self.pending[stream_id] = data
+            else:
+                del self.pending[stream_id]
+                self.conn.end_stream(stream_id)
+        self.transport.write(self.conn.data_to_send())
+
+
+class H2Server:
+    """HTTP/2 server without TLS running in its own event loop."""
+
+    def __init__(self, latency):
+        """Constructor."""
+        self.latency = latency
+        self.connections = Counter()
+        self.loop = asyncio.new_event_loop()
+        self.server = self.loop.run_until_complete(self.loop.create_server(
+            lambda: H2Protocol(self), '127.0.0.1', 0
+        ))
+        self.port = self.server.sockets[0].getsockname()[1]
+        threading.Thread(target=self.loop.run_forever, daemon=True).start()
+
+    @property
+    def url(self):
+        """Return the URL of the file contents."""
+        return 'http://127.0.0.1:{}/api/projectfiles'.format(self.port)
+
+    def close(self):
+        """Stop the server."""
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+
+def http2_transport():
+    """Return an HTTP/2 transport speaking HTTP/2 without TLS."""
+    import httpx
+    return HTTP2Transport(httpx.Client(http1=False, http2=True))
+
+
+def transports():
+    """Return the name, a factory and the server of each transport."""
+    yield 'requests', RequestsTransport, Server
+    yield 'requests session', lambda: RequestsTransport(
+        requests.Session()
+    ), Server
+    yield 'urllib3', Urllib3Transport, Server
+    yield 'httpx http2', http2_transport, H2Server
+
+
+def fetch(client, url):
+    """Send a request to the absolute url and decode the response."""
+    return client._request('GET', url, {'accept': 'application/json'}).json()
+
+
+def run(client, url, number, threads):
+    """Return the requests per second of the client."""
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as executor:
+        for _ in executor.map(fetch, [client] * number, [url] * number):
+            pass
+    return number / (time.perf_counter() - start)
+
+
+def main(number=2000, threads=8, latency_ms=0):
+    """Print the requests per second of each transport."""
+    for name, factory, server_class in transports():
+        try:
+            transport = factory()
+            server = server_class(latency_ms / 1000)
+        except ImportError as e:
+            print('{:>20}: skipped, {}'.format(name, e))
+            continue
+        client = TextUnitedClient('123', 'abc', transport=transport)
+        run(client, server.url, 50, threads)
+        rate = run(client, server.url, number, threads)
+        print('{:>20}: {:8.0f} requests/s {:4} connections'.format(
+            name, rate, server.connections.value
+        ))
+        transport.close()
+        server.close()
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
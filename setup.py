@@ -69,5 +69,7 @@ setup(
         # eg:
         #   'rst': ['docutils>=0.11'],
         #   ':python_version=="2.6"': ['argparse'],
+        'http2': ['httpx[http2]'],
+        'tracing': ['opentelemetry-api'],
     },
 )
@@ -1,7 +1,48 @@
 """Text United Client in python."""
+import importlib
+import sys
+import types
+
 __version__ = "0.1.1"
 
-from .client import TextUnitedClient  # noqa:F401,F403
-from .file import FileUpload  # noqa:F401,F403
-from .language import Language  # noqa:F401,F403
-from .project import ProjectRequest  # noqa:F401,F403
+# public names and the submodule defining them, submodules are imported on
+# first access so that `import textunited` does not import requests
+_LAZY_ATTRIBUTES = {
+    'TextUnitedClient': 'client',
+    'FileUpload': 'file',
+    'HedgingPolicy': 'hedging',
+    'Language': 'language',
+    'ProjectRequest': 'project',
+    'RequestScheduler': 'scheduler',
+}
+
+__all__ = sorted(_LAZY_ATTRIBUTES)
+
+
+class _LazyModule(types.ModuleType):
+    """Module importing the submodule defining a name on first access.
+
+    A module level `__getattr__` needs Python 3.7, the class of the module
+    is replaced instead, which works since Python 3.5.
+    """
+
+    def __getattr__(self, name):
+        """Import the submodule defining `name` on first access."""
+        try:
+            module_name = _LAZY_ATTRIBUTES[name]
+        except KeyError:
+            raise AttributeError(
+                "module {!r} has no attribute {!r}".format(__name__, name)
+            )
+        value = getattr(
+            importlib.import_module('.' + module_name, __name__), name
+        )
+        setattr(self, name, value)
+        return value
+
+    def __dir__(self):
+        """List the module attributes including the lazy ones."""
+        return sorted(set(self.__dict__) | set(_LAZY_ATTRIBUTES))
+
+
+sys.modules[__name__].__class__ = _LazyModule
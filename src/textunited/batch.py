@@ -0,0 +1,194 @@
+"""Deferred batch of requests for synchronous callers."""
+import contextlib
+import functools
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from .file import SOURCE, TRANSLATED
+
+
+def _fetch_content(files, content_type):
+    """Download a content once and save it in all the files."""
+    file = files[0]
+    if content_type == TRANSLATED:
+        file.get_translated_content()
+        content = file.translated_content
+    else:
+        file.get_source_content()
+        content = file.source_content
+    for other in files[1:]:
+        other._set_content(content_type, content)
+    return content
+
+
+class Batch:
+    """Class representing a batch of deferred calls to Text United.
+
+    The calls return :class:`concurrent.futures.Future` objects and are not
+    sent until the batch runs, when the batch context exits or
+    :func:`run` is called. Then all the calls run concurrently in a thread
+    pool sharing the transport of the client. A requests transport without a
+    session gets one, so the calls reuse the connections. Duplicate calls in
+    a batch are merged and return the same future.
+
+    The futures are resolved when the batch has run, waiting for one inside
+    the batch context blocks forever.
+    """
+
+    logger = logging.getLogger(__name__)
+
+    def __init__(self, client, max_workers=8):
+        """Constructor.
+
+        :param client: the client sending the requests
+        :param max_workers: maximum number of calls running at once
+        :type client: TextUnitedClient
+        :type max_workers: int
+        """
+        self.client = client
+        self.max_workers = max_workers
+        self.merged = 0
+        client.transport.pool_connections()
+        self._calls = {}
+        self._files = {}
+        self._lock = threading.Lock()
+        self._done = False
+
+    def __enter__(self):
+        """Return the batch."""
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Run the batch, or cancel it when the context raised."""
+        if exc_type is None:
+            self.run()
+        else:
+            self.cancel()
+
+    def __len__(self):
+        """Return the number of calls in the batch."""
+        return len(self._calls)
+
+    def get_project(self, project_id):
+        """Get a project.
+
+        :param project_id: Project id in Text United system.
+        :return: a future of the Project
+        :rtype: concurrent.futures.Future
+        """
+        return self._add(
+            ('project', project_id),
+            functools.partial(self.client.get_project, project_id),
+        )
+
+    def get_files(self, project, download_translations=True,
+                  download_sources=False):
+        """Get the files of a project, see :func:`Project.get_files`.
+
+        :param project: the project of the files
+        :param download_translations: a boolean to select to download the
+        translated file content of the translated files.
+        :param download_sources: a boolean to select to download the source
+        file content.
+        :type project: Project
+        :return: a future of the list of File
+        :rtype: concurrent.futures.Future
+        """
+        return self._add(
+            ('files', project.id_, download_translations, download_sources),
+            functools.partial(
+                project.get_files,
+                download_translations=download_translations,
+                download_sources=download_sources,
+            ),
+        )
+
+    def get_translated_content(self, file):
+        """Get and save inside the file its translated content.
+
+        :param file: the file to download
+        :type file: File
+        :return: a future of the content
+        :rtype: concurrent.futures.Future
+        """
+        return self._add_content(file, TRANSLATED)
+
+    def get_source_content(self, file):
+        """Get and save inside the file its source content.
+
+        :param file: the file to download
+        :type file: File
+        :return: a future of the content
+        :rtype: concurrent.futures.Future
+        """
+        return self._add_content(file, SOURCE)
+
+    def run(self):
+        """Run all the calls of the batch and wait for them.
+
+        Errors of the calls are set in their futures, they are not raised.
+        """
+        with self._lock:
+            if self._done:
+                return
+            self._done = True
+            calls = list(self._calls.values())
+        if not calls:
+            return
+
+        self.logger.info(
+            "Running batch of %s calls (%s merged)", len(calls), self.merged
+        )
+        # the priority context is thread local, pass it to the workers
+        priority = getattr(self.client._local, 'priority', None)
+        max_workers = min(self.max_workers, len(calls))
+        with ThreadPoolExecutor(max_workers) as executor:
+            for future, func in calls:
+                executor.submit(self._run_call, future, func, priority)
+
+    def cancel(self):
+        """Cancel all the calls of the batch that have not run."""
+        with self._lock:
+            self._done = True
+            calls = list(self._calls.values())
+        for future, _ in calls:
+            future.cancel()
+
+    def _add(self, key, func):
+        """Add a call to the batch, merging it with an equal one."""
+        with self._lock:
+            if self._done:
+                raise RuntimeError('The batch has already run')
+            call = self._calls.get(key)
+            if call is not None:
+                self.merged += 1
+                return call[0]
+            future = Future()
+            self._calls[key] = (future, func)
+            return future
+
+    def _add_content(self, file, content_type):
+        """Add the download of a content saved in all the equal files."""
+        key = (content_type, file.project_id, file.id_)
+        with self._lock:
+            files = self._files.setdefault(key, [])
+            files.append(file)
+        return self._add(
+            key, functools.partial(_fetch_content, files, content_type)
+        )
+
+    def _run_call(self, future, func, priority):
+        """Run a call setting its result in the future."""
+        if not future.set_running_or_notify_cancel():
+            return
+        context = contextlib.ExitStack()
+        if priority is not None:
+            context.enter_context(self.client.priority(priority))
+        try:
+            with context:
+                result = func()
+        except Exception as e:
+            future.set_exception(e)
+        else:
+            future.set_result(result)
@@ -0,0 +1,241 @@
+"""Circuit breaker failing fast while Text United is unavailable."""
+import collections
+import contextlib
+import logging
+import sys
+import threading
+import time
+
+import requests
+import urllib3
+
+from .exceptions import CircuitOpen, ResourceUnavailable
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+def endpoint_group(uri_path):
+    """Return the endpoint group of a request path.
+
+    The group is the first segment of the path, e.g. `projects` for
+    `/projects/123` or `projectfiles` for `/projectfiles?projectId=1`.
+
+    :param uri_path: path to the resource
+    :rtype: str
+    """
+    return uri_path.lstrip('/').split('?', 1)[0].split('/', 1)[0]
+
+
+def is_failure(exception):
+    """Check if an exception means that the server is unavailable.
+
+    Connection errors, timeouts and 5xx answers are failures. Other errors,
+    like a missing resource, are answers of a healthy server.
+
+    :param exception: the exception raised by the request, or None
+    :rtype: bool
+    """
+    if isinstance(exception, ResourceUnavailable):
+        return exception.status_code >= 500
+    httpx = sys.modules.get('httpx')
+    if httpx is not None and isinstance(exception, httpx.TransportError):
+        return True
+    return isinstance(exception, (
+        requests.RequestException, urllib3.exceptions.HTTPError, OSError
+    ))
+
+
+class _Circuit:
+    """State of the circuit of an endpoint group."""
+
+    def __init__(self, window):
+        self.state = CLOSED
+        self.results = collections.deque(maxlen=window)
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.probes = 0
+        self.probe_successes = 0
+        self.rejected = 0
+
+
+class CircuitBreaker:
+    """Class representing a circuit breaker by endpoint group.
+
+    The circuit of a group opens after `failure_threshold` consecutive
+    failures, or when the failure rate of the last `window` calls reaches
+    `error_rate`. While it is open, calls fail immediately with
+    :class:`CircuitOpen`. After `recovery_timeout` seconds the circuit is
+    half open: at most `half_open_probes` calls are sent and, if all of them
+    succeed, the circuit closes again. A failed probe opens it again.
+    """
+
+    logger = logging.getLogger(__name__)
+
+    def __init__(self, failure_threshold=5, error_rate=0.5, window=20,
+                 min_calls=10, recovery_timeout=30, half_open_probes=1,
+                 on_state_change=None, clock=time.monotonic):
+        """Constructor.
+
+        :param failure_threshold: consecutive failures opening the circuit
+        :param error_rate: failure rate of the window opening the circuit
+        :param window: number of latest calls used to compute the rate
+        :param min_calls: minimum calls in the window to use the rate
+        :param recovery_timeout: seconds the circuit stays open
+        :param half_open_probes: calls sent while the circuit is half open
+        :param on_state_change: optional callable receiving the group, the
+        old and the new state, e.g. to update metrics. It is called while
+        the breaker is locked, from the thread of the call.
+        :param clock: function returning the current time in seconds
+        """
+        self.failure_threshold = failure_threshold
+        self.error_rate = error_rate
+        self.window = window
+        self.min_calls = min_calls
+        self.recovery_timeout = recovery_timeout
+        self.half_open_probes = half_open_probes
+        self.on_state_change = on_state_change
+        self._clock = clock
+        self._circuits = {}
+        self._lock = threading.RLock()
+
+    def clone(self):
+        """Return a breaker with the same settings and closed circuits.
+
+        :rtype: CircuitBreaker
+        """
+        return type(self)(
+            failure_threshold=self.failure_threshold,
+            error_rate=self.error_rate,
+            window=self.window,
+            min_calls=self.min_calls,
+            recovery_timeout=self.recovery_timeout,
+            half_open_probes=self.half_open_probes,
+            on_state_change=self.on_state_change,
+            clock=self._clock,
+        )
+
+    @contextlib.contextmanager
+    def guard(self, group):
+        """Run the context if the circuit of the group allows it.
+
+        :param group: the endpoint group
+        :raises: CircuitOpen: the circuit is open
+        """
+        self.before(group)
+        try:
+            yield
+        except Exception as e:
+            self.record(group, e)
+            raise
+        self.record(group, None)
+
+    def before(self, group):
+        """Check that a call to the group can be sent.
+
+        :param group: the endpoint group
+        :raises: CircuitOpen: the circuit is open
+        """
+        with self._lock:
+            circuit = self._circuit(group)
+            if circuit.state == OPEN:
+                elapsed = self._clock() - circuit.opened_at
+                if elapsed >= self.recovery_timeout:
+                    self._set_state(group, circuit, HALF_OPEN)
+                else:
+                    circuit.rejected += 1
+                    raise CircuitOpen(group, self.recovery_timeout - elapsed)
+            if circuit.state == HALF_OPEN:
+                if circuit.probes >= self.half_open_probes:
+                    circuit.rejected += 1
+                    raise CircuitOpen(group, 0)
+                circuit.probes += 1
+
+    def record(self, group, exception):
+        """Record the result of a call.
+
+        :param group: the endpoint group
+        :param exception: the exception raised by the call, None on success
+        """
+        failed = is_failure(exception)
+        with self._lock:
+            circuit = self._circuit(group)
+            if circuit.state == HALF_OPEN:
+                circuit.probes -= 1
+                if failed:
+                    self._open(group, circuit)
+                else:
+                    circuit.probe_successes += 1
+                    if circuit.probe_successes >= self.half_open_probes:
+                        self._set_state(group, circuit, CLOSED)
+                return
+            if circuit.state == OPEN:
+                return
+
+            circuit.results.append(failed)
+            if not failed:
+                circuit.consecutive_failures = 0
+                return
+            circuit.consecutive_failures += 1
+            failures = sum(circuit.results)
+            if circuit.consecutive_failures >= self.failure_threshold or (
+                    len(circuit.results) >= self.min_calls and
+                    failures / len(circuit.results) >= self.error_rate):
+                self._open(group, circuit)
+
+    def state(self, group):
+        """Return the state of the circuit of a group.
+
+        :param group: the endpoint group
+        :return: 'closed', 'open' or 'half_open'
+        """
+        with self._lock:
+            return self._circuit(group).state
+
+    def snapshot(self):
+        """Return the state and counters of every circuit.
+
+        :rtype: dict
+        """
+        with self._lock:
+            return {
+                group: {
+                    'state': circuit.state,
+                    'consecutive_failures': circuit.consecutive_failures,
+                    'failure_rate': (
+                        sum(circuit.results) / len(circuit.results)
+                        if circuit.results else 0.0
+                    ),
+                    'rejected': circuit.rejected,
+                }
+                for group, circuit in self._circuits.items()
+            }
+
+    def _circuit(self, group):
+        """Return the circuit of the group, creating it if needed."""
+        circuit = self._circuits.get(group)
+        if circuit is None:
+            circuit = self._circuits[group] = _Circuit(self.window)
+        return circuit
+
+    def _open(self, group, circuit):
+        """Open the circuit."""
+        circuit.opened_at = self._clock()
+        self._set_state(group, circuit, OPEN)
+
+    def _set_state(self, group, circuit, state):
+        """Change the state of the circuit resetting its counters."""
+        old_state = circuit.state
+        circuit.state = state
+        circuit.results.clear()
+        circuit.consecutive_failures = 0
+        circuit.probes = 0
+        circuit.probe_successes = 0
+        if old_state == state:
+            return
+        self.logger.warning(
+            "Circuit of %s changed from %s to %s", group, old_state, state
+        )
+        if self.on_state_change is not None:
+            self.on_state_change(group, old_state, state)
@@ -0,0 +1,229 @@
+"""Pool of reusable buffers for the base64 decoding and encoding.
+
+Decoding a file content with :func:`base64.b64decode` allocates an ASCII
+copy of the payload and a new `bytes` object of the size of the content for
+each download. A :class:`BufferPool` decodes the payload chunk by chunk into
+a preallocated `bytearray` taken from the pool, and the caller reads the
+content through a `memoryview` of it, without copies. When the caller
+releases the buffer it goes back to the pool for the next download.
+
+Encoding writes the base64 chunks into a pooled buffer and builds the string
+sent in the request from it, skipping the intermediate `bytes` payload.
+"""
+import binascii
+import logging
+import threading
+
+# sizes of the chunks, multiples of 4 for the base64 payloads and of 3 for
+# the contents, so each chunk is decoded or encoded independently
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+
+class Buffer:
+    """Class representing a buffer leased from a :class:`BufferPool`.
+
+    The content is read through :attr:`view`, a `memoryview` of the pooled
+    `bytearray`. The view is released with the buffer, views derived from it
+    must not be used after :func:`release` since the memory is reused::
+
+        with pool.decode(payload) as buffer:
+            f.write(buffer.view)
+    """
+
+    __slots__ = ('pool', 'data', 'view')
+
+    def __init__(self, pool, data, size):
+        """Constructor.
+
+        :param pool: the pool the buffer is returned to
+        :param data: the pooled bytearray
+        :param size: the bytes of data used by the content
+        :type pool: BufferPool
+        :type data: bytearray
+        """
+        self.pool = pool
+        self.data = data
+        self.view = memoryview(data)[:size]
+
+    def __len__(self):
+        """Return the size of the content."""
+        return len(self.view)
+
+    def __bytes__(self):
+        """Return a copy of the content."""
+        return self.view.tobytes()
+
+    def __enter__(self):
+        """Return the buffer."""
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Release the buffer."""
+        self.release()
+
+    def release(self):
+        """Return the buffer to the pool, its view can not be used anymore."""
+        data, self.data = self.data, None
+        if data is None:
+            return
+        self.view.release()
+        self.pool._release(data)
+
+
+class BufferPool:
+    """Class representing a pool of reusable buffers.
+
+    Buffers are kept by size class, powers of two from `min_size`, so a
+    released buffer is reused by any later content of a similar size. At
+    most `max_bytes` of idle buffers are kept, and buffers bigger than
+    `max_buffer_size` are not pooled.
+    """
+
+    logger = logging.getLogger(__name__)
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, min_size=64 * 1024,
+                 max_buffer_size=32 * 1024 * 1024,
+                 chunk_size=DEFAULT_CHUNK_SIZE):
+        """Constructor.
+
+        :param max_bytes: maximum bytes of the idle buffers kept
+        :param min_size: size of the smallest buffer
+        :param max_buffer_size: size of the biggest buffer pooled
+        :param chunk_size: bytes decoded or encoded at once, rounded to a
+        multiple of 12.
+        :type max_bytes: int
+        :type min_size: int
+        :type max_buffer_size: int
+        :type chunk_size: int
+        """
+        self.max_bytes = max_bytes
+        self.min_size = min_size
+        self.max_buffer_size = max_buffer_size
+        self.chunk_size = max(12, chunk_size - chunk_size % 12)
+        self.allocations = 0
+        self.reuses = 0
+        self._idle = {}
+        self._idle_bytes = 0
+        self._lock = threading.Lock()
+
+    def acquire(self, size):
+        """Lease a buffer of at least `size` bytes.
+
+        :param size: bytes needed
+        :rtype: Buffer
+        """
+        capacity = self._capacity(size)
+        data = None
+        with self._lock:
+            idle = self._idle.get(capacity)
+            if idle:
+                data = idle.pop()
+                self._idle_bytes -= capacity
+                self.reuses += 1
+            else:
+                self.allocations += 1
+        if data is None:
+            data = bytearray(capacity)
+        return Buffer(self, data, size)
+
+    def decode(self, payload):
+        """Decode a base64 payload into a pooled buffer.
+
+        :param payload: the base64 content, without line breaks
+        :type payload: str or bytes
+        :rtype: Buffer
+        :raises: binascii.Error: the payload is not valid base64
+        """
+        size = decoded_size(payload)
+        buffer = self.acquire(size)
+        data = buffer.data
+        chunk_size = self.chunk_size
+        position = 0
+        try:
+            for start in range(0, len(payload), chunk_size):
+                chunk = binascii.a2b_base64(payload[start:start + chunk_size])
+                data[position:position + len(chunk)] = chunk
+                position += len(chunk)
+        except Exception:
+            buffer.release()
+            raise
+        if position != size:
+            buffer.release()
+            raise binascii.Error('Not valid base64 payload')
+        return buffer
+
+    def encode(self, content):
+        """Encode a content in base64 through a pooled buffer.
+
+        :param content: the content to encode
+        :type content: bytes or bytearray or memoryview
+        :return: the base64 payload
+        :rtype: str
+        """
+        content = memoryview(content)
+        with self.acquire((len(content) + 2) // 3 * 4) as buffer:
+            data = buffer.data
+            chunk_size = self.chunk_size
+            position = 0
+            for start in range(0, len(content), chunk_size):
+                chunk = binascii.b2a_base64(
+                    content[start:start + chunk_size], newline=False
+                )
+                data[position:position + len(chunk)] = chunk
+                position += len(chunk)
+            return str(buffer.view, 'ascii')
+
+    def stats(self):
+        """Return the buffers allocated and reused and the idle bytes.
+
+        :rtype: dict
+        """
+        with self._lock:
+            return {
+                'allocations': self.allocations,
+                'reuses': self.reuses,
+                'idle_bytes': self._idle_bytes,
+            }
+
+    def clear(self):
+        """Drop the idle buffers."""
+        with self._lock:
+            self._idle.clear()
+            self._idle_bytes = 0
+
+    def _capacity(self, size):
+        """Return the size class of a buffer of `size` bytes."""
+        if size > self.max_buffer_size:
+            return size
+        capacity = self.min_size
+        while capacity < size:
+            capacity *= 2
+        return capacity
+
+    def _release(self, data):
+        """Keep a released buffer if it fits in the pool."""
+        capacity = len(data)
+        if capacity > self.max_buffer_size:
+            return
+        with self._lock:
+            if self._idle_bytes + capacity > self.max_bytes:
+                return
+            self._idle.setdefault(capacity, []).append(data)
+            self._idle_bytes += capacity
+
+
+def decoded_size(payload):
+    """Return the size of the content of a base64 payload.
+
+    :type payload: str or bytes
+    :rtype: int
+    """
+    padding = 0
+    if payload[-2:] in ('==', b'=='):
+        padding = 2
+    elif payload[-1:] in ('=', b'='):
+        padding = 1
+    return len(payload) // 4 * 3 - padding
+
+
+default_pool = BufferPool()
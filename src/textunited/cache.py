@@ -0,0 +1,500 @@
+"""Caches used by the client."""
+import collections
+import contextlib
+import getpass
+import hashlib
+import logging
+import os
+import stat
+import struct
+import tempfile
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    # Windows, the shared cache works without single-flight between
+    # processes
+    fcntl = None
+
+# expiration time, as seconds since the epoch, at the start of each file of
+# the shared cache
+_EXPIRATION = struct.Struct('>d')
+
+
+class NegativeCache:
+    """Class representing a cache of resources that do not exist.
+
+    Each miss is remembered for `ttl` seconds, so repeated lookups of the
+    same missing project or account fail without sending any request. The
+    oldest entries are evicted when the cache has `maxsize` entries.
+    """
+
+    def __init__(self, ttl=30, maxsize=1024, clock=time.monotonic):
+        """Constructor.
+
+        :param ttl: seconds each miss is remembered
+        :param maxsize: maximum number of entries
+        :param clock: function returning the current time in seconds
+        :type ttl: float
+        :type maxsize: int
+        """
+        if maxsize < 1:
+            raise ValueError('maxsize should be at least 1')
+
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._clock = clock
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        """Return the number of entries, including the expired ones."""
+        return len(self._entries)
+
+    def add(self, kind, key):
+        """Remember a missing resource.
+
+        :param kind: the type of the resource, e.g. 'project'
+        :param key: the identifier of the resource
+        """
+        with self._lock:
+            self._entries.pop((kind, key), None)
+            self._entries[(kind, key)] = self._clock() + self.ttl
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def contains(self, kind, key):
+        """Check if a resource is known to be missing.
+
+        :param kind: the type of the resource
+        :param key: the identifier of the resource
+        :rtype: bool
+        """
+        with self._lock:
+            expiration = self._entries.get((kind, key))
+            if expiration is not None and expiration <= self._clock():
+                del self._entries[(kind, key)]
+                expiration = None
+            if expiration is None:
+                self.misses += 1
+                return False
+            self.hits += 1
+            return True
+
+    def invalidate(self, kind=None, key=None):
+        """Forget missing resources.
+
+        :param kind: only forget the resources of this type, by default all
+        :param key: only forget the resource with this identifier
+        """
+        with self._lock:
+            if kind is None:
+                self._entries.clear()
+            elif key is not None:
+                self._entries.pop((kind, key), None)
+            else:
+                for entry in [e for e in self._entries if e[0] == kind]:
+                    del self._entries[entry]
+
+    def stats(self):
+        """Return the hits, misses and size of the cache.
+
+        :rtype: dict
+        """
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self)}
+
+
+class MemoryCache:
+    """Class representing a cache of responses in the process memory.
+
+    Concurrent loads of the same key in the process are merged, so only one
+    request is sent. The least recently used responses are evicted when the
+    cache has `maxsize` entries or `max_bytes` of responses, a response
+    bigger than `max_bytes` is not cached.
+    """
+
+    def __init__(self, ttl=30, maxsize=1024, max_bytes=64 * 1024 * 1024,
+                 clock=time.monotonic):
+        """Constructor.
+
+        :param ttl: default seconds each response is kept
+        :param maxsize: maximum number of entries
+        :param max_bytes: maximum bytes of the cached responses
+        :param clock: function returning the current time in seconds
+        :type ttl: float
+        :type maxsize: int
+        :type max_bytes: int
+        """
+        if maxsize < 1:
+            raise ValueError('maxsize should be at least 1')
+
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._bytes = 0
+        self._clock = clock
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._loading = collections.defaultdict(threading.Lock)
+
+    def __len__(self):
+        """Return the number of entries, including the expired ones."""
+        return len(self._entries)
+
+    def get(self, key):
+        """Return a response, None if it is not cached or it expired.
+
+        :param key: the key of the response
+        :rtype: bytes
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= self._clock():
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, ttl=None):
+        """Cache a response.
+
+        :param key: the key of the response
+        :param value: the body of the response
+        :param ttl: seconds the response is kept, by default the ttl of the
+        cache.
+        :type value: bytes
+        """
+        ttl = self.ttl if ttl is None else ttl
+        with self._lock:
+            self._pop(key)
+            if len(value) > self.max_bytes:
+                return
+            self._entries[key] = (self._clock() + ttl, value)
+            self._bytes += len(value)
+            while (len(self._entries) > self.maxsize or
+                   self._bytes > self.max_bytes):
+                self._pop(next(iter(self._entries)))
+
+    def delete(self, key):
+        """Remove a response from the cache."""
+        with self._lock:
+            self._pop(key)
+
+    def get_or_load(self, key, loader, ttl=None):
+        """Return a response, loading and caching it if needed.
+
+        :param key: the key of the response
+        :param loader: callable returning the body of the response
+        :param ttl: seconds the response is kept
+        :rtype: bytes
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+        with self._lock:
+            lock = self._loading[key]
+        with lock:
+            value = self.get(key)
+            if value is None:
+                value = loader()
+                self.set(key, value, ttl)
+        with self._lock:
+            self._loading.pop(key, None)
+        return value
+
+    def clear(self):
+        """Remove all the responses."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """Return the hits, misses, size and bytes of the cache.
+
+        :rtype: dict
+        """
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._entries),
+                'bytes': self._bytes,
+            }
+
+    def _pop(self, key):
+        """Remove an entry, with the lock held."""
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= len(entry[1])
+
+
+def _default_directory():
+    """Return the directory of the shared cache of the current user.
+
+    It is in memory if possible, the name includes the user so the caches
+    of the users are not shared.
+    """
+    base = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+    if hasattr(os, 'getuid'):
+        user = os.getuid()
+    else:  # pragma: no cover
+        user = getpass.getuser()
+    return os.path.join(base, 'textunited-cache-{}'.format(user))
+
+
+def _private_directory(directory):
+    """Create a directory only the current user can access.
+
+    :raises: PermissionError: the directory exists and it is not owned by
+    the current user or other users can write to it
+    """
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    if not hasattr(os, 'getuid'):  # pragma: no cover
+        return
+    st = os.lstat(directory)
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid() or \
+            st.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+        raise PermissionError(
+            'The cache directory {} should be a directory owned by the '
+            'current user and not writable by others'.format(directory)
+        )
+
+
+class SharedFileCache:
+    """Class representing a cache of responses shared by the processes.
+
+    Each response is a file in `directory`, by default in `/dev/shm` so it
+    is kept in memory. Files are written to a temporary file and renamed, so
+    reads never see a partial file and take no lock. Loads of the same key
+    are serialized with a lock file, so when many processes miss at the same
+    time only one sends the request and the others read its response.
+
+    When the files exceed `max_bytes` after a write, the expired responses
+    and then the oldest ones are removed. A response bigger than `max_bytes`
+    is not cached.
+    """
+
+    logger = logging.getLogger(__name__)
+
+    def __init__(self, directory=None, ttl=30, max_bytes=64 * 1024 * 1024,
+                 clock=time.time):
+        """Constructor.
+
+        :param directory: directory of the cache files, created if needed
+        with access only for the current user. All the processes sharing
+        the cache should use the same directory. By default a directory of
+        the current user in `/dev/shm`.
+        :param ttl: default seconds each response is kept
+        :param max_bytes: maximum bytes of the files of the cache, shared by
+        all the processes.
+        :param clock: function returning the time since the epoch, shared by
+        all the processes.
+        :type directory: str
+        :type ttl: float
+        :type max_bytes: int
+        :raises: PermissionError: the directory is not owned by the current
+        user or other users can write to it
+        """
+        self.directory = directory or _default_directory()
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._clock = clock
+        self._counters_lock = threading.Lock()
+        _private_directory(self.directory)
+
+    def get(self, key):
+        """Return a response, None if it is not cached or it expired.
+
+        :param key: the key of the response
+        :rtype: bytes
+        """
+        try:
+            with open(self._path(key), 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            data = b''
+        if len(data) < _EXPIRATION.size or \
+                _EXPIRATION.unpack_from(data)[0] <= self._clock():
+            with self._counters_lock:
+                self.misses += 1
+            return None
+        with self._counters_lock:
+            self.hits += 1
+        return data[_EXPIRATION.size:]
+
+    def set(self, key, value, ttl=None):
+        """Cache a response.
+
+        :param key: the key of the response
+        :param value: the body of the response
+        :param ttl: seconds the response is kept, by default the ttl of the
+        cache.
+        :type value: bytes
+        """
+        ttl = self.ttl if ttl is None else ttl
+        if _EXPIRATION.size + len(value) > self.max_bytes:
+            self.delete(key)
+            return
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(_EXPIRATION.pack(self._clock() + ttl))
+                f.write(value)
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        self._shrink()
+
+    def delete(self, key):
+        """Remove a response from the cache."""
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(self._path(key))
+
+    def get_or_load(self, key, loader, ttl=None):
+        """Return a response, loading and caching it if needed.
+
+        Only one process or thread loads a key at a time, the others wait
+        and read the cached response.
+
+        :param key: the key of the response
+        :param loader: callable returning the body of the response
+        :param ttl: seconds the response is kept
+        :rtype: bytes
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+        with self._lock(key):
+            value = self.get(key)
+            if value is None:
+                value = loader()
+                self.set(key, value, ttl)
+        return value
+
+    def purge(self):
+        """Remove the expired responses.
+
+        :return: the number of removed responses
+        :rtype: int
+        """
+        removed = 0
+        now = self._clock()
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.endswith('.lock'):
+                self._remove_lock(path)
+                continue
+            if name.endswith('.tmp'):
+                continue
+            with contextlib.suppress(FileNotFoundError):
+                with open(path, 'rb') as f:
+                    header = f.read(_EXPIRATION.size)
+                if len(header) < _EXPIRATION.size or \
+                        _EXPIRATION.unpack(header)[0] <= now:
+                    os.remove(path)
+                    removed += 1
+        return removed
+
+    def clear(self):
+        """Remove all the responses."""
+        for name in os.listdir(self.directory):
+            if not name.endswith(('.tmp', '.lock')):
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(os.path.join(self.directory, name))
+
+    def stats(self):
+        """Return the hits and misses of this process.
+
+        :rtype: dict
+        """
+        with self._counters_lock:
+            return {'hits': self.hits, 'misses': self.misses}
+
+    def _files(self):
+        """Return the modification time, size and path of the responses."""
+        files = []
+        for name in os.listdir(self.directory):
+            if name.endswith(('.tmp', '.lock')):
+                continue
+            path = os.path.join(self.directory, name)
+            with contextlib.suppress(FileNotFoundError):
+                st = os.stat(path)
+                files.append((st.st_mtime, st.st_size, path))
+        return files
+
+    def _shrink(self):
+        """Remove responses until the files fit in max_bytes."""
+        files = self._files()
+        if sum(size for _, size, _ in files) <= self.max_bytes:
+            return
+        self.purge()
+        files = sorted(self._files())
+        total = sum(size for _, size, _ in files)
+        for _, size, path in files:
+            if total <= self.max_bytes:
+                break
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(path)
+            total -= size
+
+    def _path(self, key):
+        """Return the path of the file of a key."""
+        return os.path.join(
+            self.directory, hashlib.sha256(key.encode('utf-8')).hexdigest()
+        )
+
+    @contextlib.contextmanager
+    def _lock(self, key):
+        """Hold the lock file of a key."""
+        if fcntl is None:  # pragma: no cover
+            yield
+            return
+        path = self._path(key) + '.lock'
+        while True:
+            f = open(path, 'ab')
+            fcntl.flock(f, fcntl.LOCK_EX)
+            if _same_file(f, path):
+                break
+            # removed by its previous holder while waiting for it
+            f.close()
+        try:
+            yield
+        finally:
+            # removed before it is unlocked, so no other process holds the
+            # lock of a removed file
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(path)
+            f.close()
+
+    @staticmethod
+    def _remove_lock(path):
+        """Remove a lock file left behind if it is not held."""
+        if fcntl is None:  # pragma: no cover
+            return
+        with contextlib.suppress(FileNotFoundError), open(path, 'ab') as f:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return
+            if _same_file(f, path):
+                os.remove(path)
+
+
+def _same_file(f, path):
+    """Return True if the open file f is the file at path."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return False
+    fst = os.fstat(f.fileno())
+    return (fst.st_dev, fst.st_ino) == (st.st_dev, st.st_ino)
@@ -1,16 +1,42 @@
 """Text United client."""
+import contextlib
+import functools
+import hashlib
+import json
 import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 import requests
 
 from .account import Account
+from .batch import Batch
+from .breaker import endpoint_group, is_failure
+from .endpoints import EndpointSelector, normalize_base_url
 from .exceptions import (
     AccountNotFound,
     ProjectNotFound,
     ResourceUnavailable,
+    SplitProjectFailed,
     Unauthorized,
 )
+from .profiling import BASE64, CONSTRUCT, IO, JSON, phase
 from .project import Project, ProjectRequest
+from .scheduler import default_priority
+from .split import split_request
+from .tracing import NOOP_SPAN, NOOP_TRACER, traced
+from .transport import RequestsTransport
+
+DEFAULT_BASE_URL = 'https://www.textunited.com/api/'
+CONDITIONAL_HEADERS = {'If-None-Match', 'If-Modified-Since'}
+# statuses of a request to a resource that does not exist
+MISSING_STATUSES = {400, 404}
+
+
+def _project_attributes(client, project_id):
+    """Return the span attributes of :func:`TextUnitedClient.get_project`."""
+    return {'textunited.project_id': project_id}
 
 
 class TextUnitedClient:
@@ -18,15 +44,113 @@ class TextUnitedClient:
 
     logger = logging.getLogger(__name__)
 
-    def __init__(self, company_id, api_key):
+    def __init__(self, company_id, api_key, hedging=None, scheduler=None,
+                 transport=None, negative_cache=None, breaker=None,
+                 upload_index=None, base_url=DEFAULT_BASE_URL, tracer=None,
+                 profiler=None, response_cache=None, prefetcher=None):
         """Constructor.
 
         It creates a client object
         :param company_id: Company id given by Text United
         :param api_key: Api Key generated in Text United web
+        :param hedging: optional policy to hedge the GET requests sent by
+        :func:`fetch_json`. By default requests are not hedged.
+        :param scheduler: optional scheduler shared by all the requests sent
+        by :func:`fetch_json`. By default requests are not limited.
+        :param transport: the HTTP transport sending the requests, see
+        :mod:`textunited.transport`. By default requests are sent with
+        `requests.request`.
+        :param negative_cache: optional cache of the missing projects and
+        accounts, repeated lookups of them fail without sending requests.
+        :param breaker: optional circuit breaker, calls to an unavailable
+        endpoint group fail immediately with CircuitOpen.
+        :param upload_index: optional index of the uploaded contents, each
+        distinct content is encoded once and recorded when a project is
+        created with it.
+        :param base_url: the base URL of the API, for example a local
+        stand-in. A list of equivalent endpoints or an EndpointSelector
+        sends each request to the fastest healthy endpoint, GET requests
+        fail over to the next endpoint when one is unavailable.
+        :param tracer: optional tracer of the operations and requests, see
+        :mod:`textunited.tracing`. By default nothing is traced.
+        :param profiler: optional profiler splitting the time of the
+        operations in I/O, JSON, base64 and object construction, see
+        :mod:`textunited.profiling`.
+        :param response_cache: optional cache of the GET responses of
+        :func:`fetch_json`, shared by the clients of the same company, for
+        example a SharedFileCache shared by all the processes of the host.
+        :param prefetcher: optional prefetcher downloading into the response
+        cache the files of the listed projects likely to be opened next. It
+        needs a response cache.
+        :type hedging: HedgingPolicy
+        :type scheduler: RequestScheduler
+        :type transport: Transport
+        :type negative_cache: NegativeCache
+        :type breaker: CircuitBreaker
+        :type upload_index: UploadIndex
+        :type base_url: str, list of str or EndpointSelector
+        :type tracer: Tracer or OpenTelemetryTracer
+        :type profiler: Profiler
+        :type response_cache: MemoryCache or SharedFileCache
+        :type prefetcher: Prefetcher
         """
+        if prefetcher is not None and response_cache is None:
+            raise ValueError('A prefetcher needs a response_cache')
+
         self.auth = requests.auth.HTTPBasicAuth(company_id, api_key)
+        self.hedging = hedging
+        self.scheduler = scheduler
+        self.transport = transport or RequestsTransport()
+        self.negative_cache = negative_cache
+        self.breaker = breaker
+        self.upload_index = upload_index
+        if isinstance(base_url, str):
+            self.base_url = normalize_base_url(base_url)
+            self.endpoints = None
+        else:
+            if not isinstance(base_url, EndpointSelector):
+                base_url = EndpointSelector(base_url)
+            self.base_url = base_url.base_urls[0]
+            self.endpoints = base_url
+        self.tracer = tracer or NOOP_TRACER
+        self.profiler = profiler
+        self.response_cache = response_cache
+        self.prefetcher = prefetcher
+        self._local = threading.local()
+
+    @contextlib.contextmanager
+    def priority(self, priority):
+        """Tag the requests sent inside the context with a priority.
+
+        Requests without an explicit priority are interactive, except the
+        downloads of file content that are bulk.
+
+        :param priority: one of the priority classes of the scheduler
+        """
+        previous = getattr(self._local, 'priority', None)
+        self._local.priority = priority
+        try:
+            yield
+        finally:
+            self._local.priority = previous
+
+    def batch(self, max_workers=8):
+        """Return a batch of deferred calls sent concurrently.
+
+        The calls return futures and are sent when the batch context exits,
+        duplicate calls are merged::
+
+            with client.batch() as batch:
+                project = batch.get_project(123)
+                other = batch.get_project(456)
+            project.result()
+
+        :param max_workers: maximum number of calls running at once
+        :rtype: Batch
+        """
+        return Batch(self, max_workers=max_workers)
 
+    @traced('textunited.list_projects')
     def list_projects(self):
         """List with all projects in Text United.
 
@@ -35,13 +159,17 @@ class TextUnitedClient:
         """
         self.logger.info("Retrieving all projects")
         json_obj = self.fetch_json('/projects')
-        list_projects = [
-            Project.from_json(client=self, json_obj=obj)
-            for obj in json_obj
-        ]
+        with phase(self, CONSTRUCT):
+            list_projects = [
+                Project.from_json(client=self, json_obj=obj)
+                for obj in json_obj
+            ]
         self.logger.info("%s projects retrieved", len(list_projects))
+        if self.prefetcher is not None:
+            self.prefetcher.watch(list_projects)
         return list_projects
 
+    @traced('textunited.get_project', _project_attributes)
     def get_project(self, project_id):
         """Get a project.
 
@@ -52,32 +180,72 @@ class TextUnitedClient:
         available or could not been found
         """
         self.logger.info("Retrieving project with id %s", project_id)
+        cache = self.negative_cache
+        if cache is not None and cache.contains('project', project_id):
+            raise ProjectNotFound(
+                'Could not find the project with id {}'.format(project_id)
+            )
         try:
             json_obj = self.fetch_json('/projects/{}'.format(project_id))
-        except ResourceUnavailable:
+        except ResourceUnavailable as e:
+            if cache is not None and e.status_code in MISSING_STATUSES:
+                cache.add('project', project_id)
             raise ProjectNotFound(
                 'Could not find the project with id {}'.format(project_id)
             )
-        project = Project.from_json(client=self, json_obj=json_obj)
+        with phase(self, CONSTRUCT):
+            project = Project.from_json(client=self, json_obj=json_obj)
         self.logger.info("Project with id %s retrieved", project_id)
+        if self.prefetcher is not None:
+            self.prefetcher.watch([project])
         return project
 
-    def add_project(self, project_obj):
+    @traced('textunited.add_project')
+    def add_project(self, project_obj, max_request_size=None, max_words=None,
+                    max_workers=4):
         """Add a new project in Text United system.
 
+        With `max_request_size` or `max_words` the project is split: its
+        files are packed in groups under the limits and each group is
+        created concurrently as a project, see :mod:`textunited.split`.
+
         :param project_obj: An object with all the attributes needed for
         creating a new Project
+        :param max_request_size: maximum bytes of the body of each request
+        :param max_words: maximum words of the files of each project
+        :param max_workers: maximum number of projects created at once
         :type project_obj: ProjectRequest
-        :return: id of the new created project
+        :return: id of the new created project. When the project is split, a
+        dict with the request of each part by the id of its project.
+        :raises: SplitProjectFailed: some parts of a split project could not
+        be created
         """
         if not isinstance(project_obj, ProjectRequest):
             raise TypeError(
                 "Could not create Project. `project_obj must be "
                 "ProjectRequest type."
             )
+        if max_request_size is not None or max_words is not None:
+            parts = split_request(project_obj, max_request_size, max_words)
+            if len(parts) > 1:
+                self.logger.info(
+                    "Project %s split in %s parts", project_obj, len(parts)
+                )
+            return self._add_parts(parts, max_workers)
+
         self.logger.info("Creating project '%s' ", project_obj)
-        data = project_obj.to_json()
+        with phase(self, BASE64):
+            if self.upload_index is None:
+                data = project_obj.to_json()
+            else:
+                data = project_obj.to_json(upload_index=self.upload_index)
         project_id = self.fetch_json('/fastproject', 'POST', data=data)
+        if self.negative_cache is not None:
+            self.negative_cache.invalidate('project')
+        if self.response_cache is not None:
+            self.response_cache.delete(self.cache_key('/projects'))
+        if self.upload_index is not None:
+            self.upload_index.record(project_obj.files, project_id)
         self.logger.info(
             "Project %s created with id '%s'",
             project_obj,
@@ -85,6 +253,34 @@ class TextUnitedClient:
         )
         return project_id
 
+    def _add_parts(self, parts, max_workers):
+        """Create the projects of the parts of a split request."""
+        # the priority context is thread local, pass it to the workers
+        priority = getattr(self._local, 'priority', None)
+
+        def add_part(part):
+            with contextlib.ExitStack() as context:
+                if priority is not None:
+                    context.enter_context(self.priority(priority))
+                return self.add_project(part)
+
+        with ThreadPoolExecutor(max_workers) as executor:
+            futures = [executor.submit(add_part, part) for part in parts]
+        created = {}
+        errors = {}
+        for part, future in zip(parts, futures):
+            try:
+                created[future.result()] = part
+            except Exception as e:
+                self.logger.error(
+                    "Could not create part %s: %s", part.name, e
+                )
+                errors[part.name] = e
+        if errors:
+            raise SplitProjectFailed(created, errors)
+        return created
+
+    @traced('textunited.list_accounts')
     def list_accounts(self):
         """List with all accounts in Text United system.
 
@@ -93,10 +289,12 @@ class TextUnitedClient:
         """
         self.logger.info("Retrieving all accounts")
         json_obj = self.fetch_json('/employees')
-        list_accounts = [Account.from_json(obj) for obj in json_obj]
+        with phase(self, CONSTRUCT):
+            list_accounts = [Account.from_json(obj) for obj in json_obj]
         self.logger.info("%s accounts retrieved", len(list_accounts))
         return list_accounts
 
+    @traced('textunited.get_account')
     def get_account(self, email):
         """List with all accounts in Text United system.
 
@@ -106,6 +304,11 @@ class TextUnitedClient:
         available or could not been found
         """
         self.logger.info("Getting account with email %s", email)
+        cache = self.negative_cache
+        if cache is not None and cache.contains('account', email):
+            raise AccountNotFound(
+                "Could not find an account with email {}".format(email)
+            )
         list_account = self.list_accounts()
 
         if not list_account:
@@ -116,32 +319,201 @@ class TextUnitedClient:
                 self.logger.info("Account with email %s found")
                 return account
 
+        if cache is not None:
+            cache.add('account', email)
         raise AccountNotFound(
             "Could not find an account with email {}".format(email)
         )
 
-    def fetch_json(self, uri_path, http_method='GET', data=None):
+    def fetch_json(self, uri_path, http_method='GET', data=None,
+                   priority=None):
         """Perform a request to Text United Server.
 
         :param uri_path: path to the resource it can be in '/performance' or
         'performance'
         :param http_method: http request type
         :param data: In the case of a POST or a PUT
+        :param priority: priority of the request in the scheduler. By default
+        the priority of the context set with :func:`priority` is used.
         :return: request json
         :raises: ResourceUnavailable, Unauthorized
         """
+        if self.response_cache is not None and http_method == 'GET':
+            content = self.response_cache.get_or_load(
+                self.cache_key(uri_path),
+                functools.partial(self._fetch_content, uri_path, priority),
+            )
+            with phase(self, JSON):
+                return json.loads(content.decode('utf-8'))
+
+        response = self.fetch_response(
+            uri_path, http_method, data=data, priority=priority
+        )
+        with phase(self, JSON):
+            return response.json()
+
+    def cache_key(self, uri_path):
+        """Return the key of a response in the response cache.
+
+        The key includes a hash of the company id and the api key, so only
+        clients with the same credentials share the responses.
+
+        :param uri_path: path to the resource
+        :rtype: str
+        """
+        credentials = hashlib.sha256('{}:{}'.format(
+            self.auth.username, self.auth.password
+        ).encode('utf-8')).hexdigest()
+        return '{}:{}:{}'.format(
+            self.auth.username, credentials, uri_path.lstrip('/')
+        )
+
+    def _fetch_content(self, uri_path, priority):
+        """Return the body of the response to a GET request."""
+        return self.fetch_response(uri_path, priority=priority).content
+
+    def fetch_response(self, uri_path, http_method='GET', data=None,
+                       priority=None, headers=None):
+        """Perform a request to Text United Server and return the response.
+
+        A response with status 304 Not Modified is returned when the request
+        is conditional, any other status different than 200 raises.
+
+        :param uri_path: path to the resource it can be in '/performance' or
+        'performance'
+        :param http_method: http request type
+        :param data: In the case of a POST or a PUT
+        :param priority: priority of the request in the scheduler.
+        :param headers: extra headers, for example `If-None-Match`
+        :return: the http response
+        :rtype: requests.Response
+        :raises: ResourceUnavailable, Unauthorized, CircuitOpen
+        """
         # set content type and accept headers to handle JSON
-        headers = {
+        request_headers = {
             'accept': 'application/json',
             'content-type': 'application/json',
         }
+        if headers:
+            request_headers.update(headers)
 
-        # construct the full URL without query parameters
+        # the path is appended to the base URL of the chosen endpoint
         if uri_path[0] == '/':
             uri_path = uri_path[1:]
-        url = 'https://www.textunited.com/api/{}'.format(uri_path)
 
-        response = requests.request(
+        with phase(self, IO):
+            if self.tracer is NOOP_TRACER:
+                return self._guard(
+                    uri_path, http_method, request_headers, data, priority
+                )
+            return self._trace(
+                uri_path, http_method, request_headers, data, priority
+            )
+
+    def _trace(self, uri_path, http_method, headers, data, priority):
+        """Send the request in a span with its endpoint and status."""
+        group = endpoint_group(uri_path)
+        attributes = {
+            'http.method': http_method,
+            'textunited.endpoint': group,
+            'textunited.path': uri_path,
+            'textunited.retries': 0,
+        }
+        with self.tracer.span('{} {}'.format(http_method, group),
+                              attributes) as span:
+            try:
+                response = self._guard(
+                    uri_path, http_method, headers, data, priority, span
+                )
+            except ResourceUnavailable as e:
+                span.set_attribute('http.status_code', e.status_code)
+                raise
+            span.set_attribute('http.status_code', response.status_code)
+            content = getattr(response, 'content', None)
+            if isinstance(content, bytes):
+                span.set_attribute(
+                    'http.response_content_length', len(content)
+                )
+            return response
+
+    def _guard(self, uri_path, http_method, headers, data, priority,
+               span=NOOP_SPAN):
+        """Send the request if the circuit breaker allows it."""
+        if self.breaker is None:
+            return self._send(
+                uri_path, http_method, headers, data, priority, span
+            )
+        with self.breaker.guard(endpoint_group(uri_path)):
+            return self._send(
+                uri_path, http_method, headers, data, priority, span
+            )
+
+    def _send(self, uri_path, http_method, headers, data, priority,
+              span=NOOP_SPAN):
+        """Send the request, hedging it when it is possible."""
+        if self.scheduler is not None:
+            # the priority context is thread local, it is resolved before
+            # the request is handed to the hedging threads
+            if priority is None:
+                priority = getattr(self._local, 'priority', None)
+            if priority is None:
+                priority = default_priority(uri_path)
+        if self.hedging is not None and http_method == 'GET':
+            # each hedged duplicate takes its own slot, so the scheduler
+            # caps all the requests in flight, and the time queued in the
+            # scheduler does not count in the hedging delay
+            slot = None
+            if self.scheduler is not None:
+                slot = functools.partial(self.scheduler.slot, priority)
+            return self.hedging.run(
+                self._route, http_method, uri_path, headers, data, span,
+                slot=slot,
+            )
+        if self.scheduler is None:
+            return self._route(http_method, uri_path, headers, data, span)
+        with self.scheduler.slot(priority):
+            return self._route(http_method, uri_path, headers, data, span)
+
+    def _route(self, http_method, uri_path, headers, data=None,
+               span=NOOP_SPAN):
+        """Send the request to the best endpoint, failing over on errors."""
+        if self.endpoints is None:
+            return self._request(
+                http_method, self.base_url + uri_path, headers, data
+            )
+
+        candidates = self.endpoints.candidates()
+        if http_method != 'GET':
+            # only idempotent requests are sent again
+            candidates = candidates[:1]
+        for i, base_url in enumerate(candidates):
+            span.set_attribute('textunited.retries', i)
+            span.set_attribute('textunited.base_url', base_url)
+            start = time.monotonic()
+            try:
+                response = self._request(
+                    http_method, base_url + uri_path, headers, data
+                )
+            except Exception as e:
+                failed = is_failure(e)
+                self.endpoints.record(
+                    base_url, time.monotonic() - start, failed=failed
+                )
+                if not failed or i == len(candidates) - 1:
+                    raise
+                self.logger.warning(
+                    "Request to %s failed, trying the next endpoint", base_url
+                )
+            else:
+                self.endpoints.record(base_url, time.monotonic() - start)
+                return response
+
+    def _request(self, http_method, url, headers, data=None):
+        """Send the request and return the response.
+
+        :raises: ResourceUnavailable, Unauthorized
+        """
+        response = self.transport.request(
             http_method,
             url,
             headers=headers,
@@ -150,10 +522,12 @@ class TextUnitedClient:
         )
         if response.status_code == 401:
             raise Unauthorized("{} at {}".format(response.text, url), response)
+        if response.status_code == 304 and CONDITIONAL_HEADERS & set(headers):
+            return response
         if response.status_code != 200:
             raise ResourceUnavailable(
                 "{} at {}".format(response.text, url),
                 response
             )
 
-        return response.json()
+        return response
@@ -0,0 +1,153 @@
+"""Base64 codec for the file contents.
+
+The base64 functions of the standard library hold the GIL while they run, so
+decoding a multi-hundred-MB file blocks every other thread of the process.
+When a size threshold is set, :class:`Codec` splits the bigger payloads in
+chunks and encodes or decodes them in a process pool. The calling thread
+waits for the chunks without holding the GIL.
+
+The process pool is opt-in. Its worker processes are started with the spawn
+method: forking a process whose other threads hold locks, e.g. the ones of
+the connection pools or of the logging handlers, can deadlock the children.
+Spawned processes import the main module again, so the scripts enabling the
+pool need the ``if __name__ == '__main__':`` guard. When the pool can not be
+started the payloads are processed in the calling thread.
+"""
+import atexit
+import base64
+import binascii
+import logging
+import threading
+
+WHITESPACE = b' \t\n\r\x0b\x0c'
+
+
+def _decode_chunk(chunk):
+    """Decode a base64 chunk, it runs in the worker processes."""
+    return binascii.a2b_base64(chunk)
+
+
+def _encode_chunk(chunk):
+    """Encode a chunk in base64, it runs in the worker processes."""
+    return binascii.b2a_base64(chunk, newline=False)
+
+
+class Codec:
+    """Class representing a base64 codec for large payloads.
+
+    Payloads smaller than the threshold, or all of them without a
+    threshold, are encoded and decoded in the calling thread. Bigger
+    payloads are split in chunks processed in parallel in a pool of spawned
+    processes.
+    """
+
+    logger = logging.getLogger(__name__)
+
+    def __init__(self, threshold=None, chunk_size=4 * 1024 * 1024,
+                 max_workers=None, pool=None):
+        """Constructor.
+
+        :param threshold: minimum size in bytes of the payloads processed in
+        the process pool, e.g. 32 MB. By default the process pool is not
+        used.
+        :param chunk_size: size in bytes of each chunk, rounded to a multiple
+        of 12 so that chunks are encoded and decoded independently.
+        :param max_workers: number of processes, by default the number of
+        CPUs.
+        :param pool: optional buffer pool encoding the payloads processed in
+        the calling thread, see :mod:`textunited.buffers`. By default no
+        buffers are kept.
+        :type threshold: int
+        :type chunk_size: int
+        :type pool: BufferPool
+        """
+        self.threshold = threshold
+        self.chunk_size = max(12, chunk_size - chunk_size % 12)
+        self.max_workers = max_workers
+        self.pool = pool
+        self._executor = None
+        self._failed = False
+        self._lock = threading.Lock()
+
+    def b64decode(self, data):
+        """Decode a base64 payload.
+
+        :param data: the base64 content, line breaks and other whitespace
+        are ignored.
+        :type data: str or bytes
+        :rtype: bytes
+        """
+        if isinstance(data, str):
+            data = data.encode('ascii')
+        if not self._parallel(data):
+            return base64.b64decode(data)
+        # whitespace would shift the chunks off the groups of 4 characters
+        data = data.translate(None, WHITESPACE)
+        return b''.join(self._map(_decode_chunk, data))
+
+    def b64encode(self, data):
+        """Encode a payload in base64.
+
+        :param data: the content to encode
+        :type data: bytes
+        :rtype: str
+        """
+        if not self._parallel(data):
+            if self.pool is not None:
+                return self.pool.encode(data)
+            return str(base64.b64encode(data), 'utf-8')
+        return str(b''.join(self._map(_encode_chunk, data)), 'utf-8')
+
+    def shutdown(self):
+        """Stop the worker processes."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.close()
+            executor.join()
+
+    def _parallel(self, data):
+        """Return True if data is processed in the process pool.
+
+        The pool is started on the first payload over the threshold.
+        """
+        if self.threshold is None or len(data) < self.threshold:
+            return False
+        with self._lock:
+            if self._executor is None and not self._failed:
+                # imported here because multiprocessing is slow to import
+                import multiprocessing
+                try:
+                    self._executor = multiprocessing.get_context(
+                        'spawn'
+                    ).Pool(self.max_workers)
+                except Exception:
+                    self.logger.warning(
+                        "Could not start the process pool, payloads are "
+                        "processed in the calling thread", exc_info=True
+                    )
+                    self._failed = True
+            return self._executor is not None
+
+    def _map(self, func, data):
+        """Apply func to each chunk of data in the process pool."""
+        view = memoryview(data)
+        chunks = [
+            view[start:start + self.chunk_size].tobytes()
+            for start in range(0, len(data), self.chunk_size)
+        ]
+        return self._executor.map(func, chunks)
+
+
+default_codec = Codec()
+atexit.register(default_codec.shutdown)
+
+
+def b64decode(data):
+    """Decode a base64 payload with the default codec."""
+    return default_codec.b64decode(data)
+
+
+def b64encode(data):
+    """Encode a payload in base64 with the default codec."""
+    return default_codec.b64encode(data)
@@ -0,0 +1,179 @@
+"""Index of the uploaded file contents by their hash.
+
+The same source files are often uploaded in many projects. An
+:class:`UploadIndex` given to the client encodes each distinct content only
+once and remembers the contents already uploaded, so callers can find the
+files that did not change since they were uploaded.
+"""
+import collections
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+
+from . import codec
+
+
+def content_digest(upload):
+    """Return the SHA-256 digest of the content of a file upload.
+
+    The digest is saved in the upload, its content is not hashed again.
+
+    :param upload: the file upload
+    :type upload: FileUpload
+    :rtype: str
+    """
+    digest = getattr(upload, '_digest', None)
+    if digest is None or digest[0] is not upload.content:
+        digest = (upload.content, hashlib.sha256(upload.content).hexdigest())
+        upload._digest = digest
+    return digest[1]
+
+
+class UploadIndex:
+    """Class representing an index of uploaded contents by their hash.
+
+    The base64 payloads of the encoded contents are kept in memory, up to
+    `max_payload_bytes`, and reused for identical contents. The hashes of
+    the uploaded contents, with their names and projects, are saved to
+    `path` by :func:`save` and loaded again when the index is created.
+    """
+
+    logger = logging.getLogger(__name__)
+
+    def __init__(self, path=None, max_payload_bytes=64 * 1024 * 1024):
+        """Constructor.
+
+        :param path: optional JSON file where the index is persisted. It is
+        loaded if it exists.
+        :param max_payload_bytes: maximum bytes of the encoded payloads kept
+        in memory.
+        :type path: str
+        :type max_payload_bytes: int
+        """
+        self.path = path
+        self.max_payload_bytes = max_payload_bytes
+        self.payload_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._uploads = {}
+        self._payloads = collections.OrderedDict()
+        self._lock = threading.Lock()
+        if path is not None and os.path.exists(path):
+            self.load()
+
+    def __len__(self):
+        """Return the number of uploaded contents in the index."""
+        return len(self._uploads)
+
+    def __contains__(self, upload):
+        """Check if the content of the upload was uploaded."""
+        return content_digest(upload) in self._uploads
+
+    def encode(self, upload):
+        """Return the base64 content of an upload, encoding it only once.
+
+        :param upload: the file upload
+        :type upload: FileUpload
+        :rtype: str
+        """
+        digest = content_digest(upload)
+        with self._lock:
+            payload = self._payloads.get(digest)
+            if payload is not None:
+                self._payloads.move_to_end(digest)
+                self.hits += 1
+                return payload
+            self.misses += 1
+
+        payload = codec.b64encode(upload.content)
+        with self._lock:
+            if len(payload) <= self.max_payload_bytes and \
+                    digest not in self._payloads:
+                self._payloads[digest] = payload
+                self.payload_bytes += len(payload)
+                while self.payload_bytes > self.max_payload_bytes:
+                    _, evicted = self._payloads.popitem(last=False)
+                    self.payload_bytes -= len(evicted)
+        return payload
+
+    def record(self, uploads, project_id=None):
+        """Record contents as uploaded.
+
+        :param uploads: the uploaded files
+        :param project_id: the project created with them
+        :type uploads: list of FileUpload
+        """
+        with self._lock:
+            for upload in uploads:
+                entry = self._uploads.setdefault(content_digest(upload), {
+                    'names': [], 'size': len(upload.content), 'projects': [],
+                })
+                if upload.name not in entry['names']:
+                    entry['names'].append(upload.name)
+                if project_id is not None and \
+                        project_id not in entry['projects']:
+                    entry['projects'].append(project_id)
+
+    def unchanged(self, uploads):
+        """Return the uploads whose content was uploaded before.
+
+        :param uploads: the files to upload
+        :type uploads: list of FileUpload
+        :rtype: list of FileUpload
+        """
+        return [upload for upload in uploads if upload in self]
+
+    def projects(self, upload):
+        """Return the ids of the projects created with the same content.
+
+        :param upload: the file upload
+        :type upload: FileUpload
+        :rtype: list
+        """
+        entry = self._uploads.get(content_digest(upload))
+        return list(entry['projects']) if entry else []
+
+    def stats(self):
+        """Return the counters of the index.
+
+        :rtype: dict
+        """
+        with self._lock:
+            return {
+                'uploads': len(self._uploads),
+                'payloads': len(self._payloads),
+                'payload_bytes': self.payload_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+    def load(self):
+        """Load the uploaded contents from the file of the index."""
+        with open(self.path) as f:
+            uploads = json.load(f)
+        with self._lock:
+            self._uploads.update(uploads)
+        self.logger.info("Loaded %s uploads from %s", len(uploads), self.path)
+
+    def save(self):
+        """Save the uploaded contents to the file of the index.
+
+        The file is replaced atomically, so a failed save keeps the previous
+        index.
+        """
+        if self.path is None:
+            raise ValueError('The index has no path')
+        with self._lock:
+            data = json.dumps(self._uploads, sort_keys=True)
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(data)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
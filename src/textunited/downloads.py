@@ -0,0 +1,182 @@
+"""Download scheduler limited by the bytes in flight."""
+import heapq
+import itertools
+import logging
+import threading
+from concurrent.futures import Future
+
+# bytes of the JSON document around the base64 content
+JSON_OVERHEAD = 256
+
+
+def estimate_memory(size):
+    """Return the peak memory needed to download a file.
+
+    The response body and the string decoded from the JSON document hold the
+    base64 content, 4/3 of the file size, and the decoded content is held
+    while they are still alive.
+
+    :param size: size of the file in bytes
+    :rtype: int
+    """
+    size = size or 0
+    encoded = 4 * ((size + 2) // 3)
+    return 2 * encoded + size + JSON_OVERHEAD
+
+
+class DownloadScheduler:
+    """Class representing a scheduler of file content downloads.
+
+    Downloads are admitted while the estimated memory of the downloads in
+    flight, computed from :attr:`File.size`, fits in the byte budget. A file
+    bigger than the whole budget is downloaded alone.
+
+    By default downloads are admitted in submission order, with
+    `small_first` the smallest waiting file goes first.
+    """
+
+    logger = logging.getLogger(__name__)
+
+    def __init__(self, byte_budget=256 * 1024 * 1024, max_workers=8,
+                 small_first=False):
+        """Constructor.
+
+        :param byte_budget: maximum estimated bytes of the downloads in
+        flight.
+        :param max_workers: maximum number of downloads in flight.
+        :param small_first: a boolean to select to download the smallest
+        files first.
+        :type byte_budget: int
+        :type max_workers: int
+        :type small_first: bool
+        """
+        if byte_budget <= 0:
+            raise ValueError('byte_budget should be positive')
+
+        self.byte_budget = byte_budget
+        self.max_workers = max_workers
+        self.small_first = small_first
+        self.bytes_in_flight = 0
+        self.in_flight = 0
+        self._queue = []
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        self._threads = []
+        self._shutdown = False
+
+    @property
+    def queue_depth(self):
+        """Return the number of downloads waiting to be admitted."""
+        return len(self._queue)
+
+    @property
+    def budget_used(self):
+        """Return the fraction of the byte budget in use."""
+        return self.bytes_in_flight / self.byte_budget
+
+    def stats(self):
+        """Return queue depth and budget use.
+
+        :rtype: dict
+        """
+        with self._condition:
+            return {
+                'queue_depth': self.queue_depth,
+                'in_flight': self.in_flight,
+                'bytes_in_flight': self.bytes_in_flight,
+                'byte_budget': self.byte_budget,
+                'budget_used': self.budget_used,
+            }
+
+    def submit(self, file, source=False):
+        """Schedule the download of the content of a file.
+
+        :param file: the file to download
+        :param source: a boolean to select to download the source content
+        instead of the translated content.
+        :type file: File
+        :return: a future with the downloaded content
+        :rtype: concurrent.futures.Future
+        """
+        cost = estimate_memory(file.size)
+        future = Future()
+        sequence = next(self._counter)
+        key = (cost, sequence) if self.small_first else (sequence,)
+        with self._condition:
+            if self._shutdown:
+                raise RuntimeError('Cannot schedule after shutdown')
+            heapq.heappush(self._queue, (key, cost, file, source, future))
+            if len(self._threads) < self.max_workers:
+                thread = threading.Thread(
+                    target=self._work,
+                    name='textunited-download',
+                    daemon=True,
+                )
+                self._threads.append(thread)
+                thread.start()
+            self._condition.notify_all()
+        return future
+
+    def map(self, files, source=False):
+        """Download the content of all the files.
+
+        :param files: the files to download
+        :param source: a boolean to select to download the source content
+        :return: the contents in the order of `files`
+        :rtype: list of bytes
+        """
+        futures = [self.submit(file, source) for file in files]
+        return [future.result() for future in futures]
+
+    def shutdown(self, wait=True):
+        """Stop the workers once the queue is empty.
+
+        :param wait: a boolean to select to wait for the workers
+        """
+        with self._condition:
+            self._shutdown = True
+            self._condition.notify_all()
+            threads = list(self._threads)
+        if wait:
+            for thread in threads:
+                thread.join()
+
+    def _admissible(self):
+        """Check if the first download in the queue fits in the budget."""
+        cost = self._queue[0][1]
+        return (
+            self.in_flight == 0 or
+            self.bytes_in_flight + cost <= self.byte_budget
+        )
+
+    def _work(self):
+        """Admit and run downloads until shutdown."""
+        while True:
+            with self._condition:
+                while not (self._queue and self._admissible()):
+                    if self._shutdown and not self._queue:
+                        return
+                    self._condition.wait()
+                _, cost, file, source, future = heapq.heappop(self._queue)
+                self.in_flight += 1
+                self.bytes_in_flight += cost
+
+            try:
+                if future.set_running_or_notify_cancel():
+                    future.set_result(self._download(file, source))
+            except Exception as e:
+                future.set_exception(e)
+            finally:
+                with self._condition:
+                    self.in_flight -= 1
+                    self.bytes_in_flight -= cost
+                    self._condition.notify_all()
+
+    @staticmethod
+    def _download(file, source):
+        """Download the content of the file and return it."""
+        if source:
+            file.get_source_content()
+            return file.source_content
+        file.get_translated_content()
+        return file.translated_content
@@ -0,0 +1,138 @@
+"""Selection of the Text United API endpoint by latency and health."""
+import logging
+import threading
+import time
+
+
+def normalize_base_url(base_url):
+    """Return the base URL ending with a slash.
+
+    :param base_url: URL of the API, e.g. `https://www.textunited.com/api`
+    :rtype: str
+    """
+    if not base_url.endswith('/'):
+        base_url += '/'
+    return base_url
+
+
+class _Endpoint:
+    """Measures of an endpoint."""
+
+    def __init__(self):
+        self.latency = None
+        self.down_until = 0
+        self.last_used = None
+        self.requests = 0
+        self.failures = 0
+
+
+class EndpointSelector:
+    """Class representing equivalent API endpoints, like regional gateways.
+
+    Requests go to the healthy endpoint with the lowest latency, measured as
+    an exponentially weighted moving average. Endpoints never measured, or
+    not used for `probe_interval` seconds, are tried first so their latency
+    is known. An endpoint that fails is skipped for `cooldown` seconds.
+    """
+
+    logger = logging.getLogger(__name__)
+
+    def __init__(self, base_urls, alpha=0.3, cooldown=30, probe_interval=60,
+                 clock=time.monotonic):
+        """Constructor.
+
+        :param base_urls: the base URLs of the endpoints, the first one is
+        preferred when there are no measures.
+        :param alpha: weight of the latest latency in the average
+        :param cooldown: seconds a failed endpoint is skipped
+        :param probe_interval: seconds after which an unused endpoint is
+        measured again.
+        :param clock: function returning the current time in seconds
+        :type base_urls: list of str
+        """
+        self.base_urls = tuple(normalize_base_url(url) for url in base_urls)
+        if not self.base_urls:
+            raise ValueError('At least one endpoint is needed')
+
+        self.alpha = alpha
+        self.cooldown = cooldown
+        self.probe_interval = probe_interval
+        self._clock = clock
+        self._endpoints = {url: _Endpoint() for url in self.base_urls}
+        self._lock = threading.Lock()
+
+    def candidates(self):
+        """Return the base URLs in the order they should be tried.
+
+        Healthy endpoints come first, sorted by latency, followed by the
+        failed ones in the order they recover.
+
+        :rtype: list of str
+        """
+        now = self._clock()
+        with self._lock:
+            endpoints = self._endpoints
+
+            def order(url):
+                endpoint = endpoints[url]
+                if endpoint.down_until > now:
+                    return (2, endpoint.down_until)
+                if endpoint.latency is None or (
+                        now - endpoint.last_used >= self.probe_interval):
+                    return (0, 0)
+                return (1, endpoint.latency)
+
+            return sorted(self.base_urls, key=order)
+
+    def choose(self):
+        """Return the base URL of the next request.
+
+        :rtype: str
+        """
+        return self.candidates()[0]
+
+    def record(self, base_url, latency=None, failed=False):
+        """Record the result of a request.
+
+        :param base_url: the base URL of the endpoint used
+        :param latency: seconds the request took
+        :param failed: a boolean, True if the endpoint is unavailable
+        """
+        now = self._clock()
+        with self._lock:
+            endpoint = self._endpoints[base_url]
+            endpoint.requests += 1
+            endpoint.last_used = now
+            if failed:
+                endpoint.failures += 1
+                endpoint.down_until = now + self.cooldown
+                self.logger.warning(
+                    "Endpoint %s failed, skipping it for %ss",
+                    base_url, self.cooldown
+                )
+                return
+            endpoint.down_until = 0
+            if latency is not None:
+                if endpoint.latency is None:
+                    endpoint.latency = latency
+                else:
+                    endpoint.latency += self.alpha * (
+                        latency - endpoint.latency
+                    )
+
+    def stats(self):
+        """Return the latency and health of each endpoint.
+
+        :rtype: dict
+        """
+        now = self._clock()
+        with self._lock:
+            return {
+                url: {
+                    'latency': endpoint.latency,
+                    'healthy': endpoint.down_until <= now,
+                    'requests': endpoint.requests,
+                    'failures': endpoint.failures,
+                }
+                for url, endpoint in self._endpoints.items()
+            }
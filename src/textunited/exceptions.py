@@ -15,6 +15,11 @@ class ResourceUnavailable(Exception):
         self._msg = msg
         self._status = http_response.status_code
 
+    @property
+    def status_code(self):
+        """Return the HTTP status of the failed request."""
+        return self._status
+
     def __str__(self):
         """Get string representation of the object."""
         return "{} (HTTP status: {})".format(self._msg, self._status)
@@ -36,3 +41,49 @@ class AccountNotFound(Exception):
     """Exception representing account not found."""
 
     pass
+
+
+class CircuitOpen(Exception):
+    """Exception representing a call rejected by an open circuit breaker."""
+
+    def __init__(self, group, retry_after):
+        """Constructor.
+
+        :param group: the endpoint group of the rejected call
+        :param retry_after: seconds until the circuit is half open
+        """
+        Exception.__init__(self)
+        self.group = group
+        self.retry_after = retry_after
+
+    def __str__(self):
+        """Get string representation of the object."""
+        return "Circuit of {} is open, retry after {:.1f} seconds".format(
+            self.group, self.retry_after
+        )
+
+
+class SplitProjectFailed(Exception):
+    """Exception representing parts of a split project not created."""
+
+    def __init__(self, created, errors):
+        """Constructor.
+
+        :param created: dict with the request of each created part by the
+        id of its project.
+        :param errors: dict with the exception of each failed part by its
+        name.
+        :type created: dict
+        :type errors: dict
+        """
+        Exception.__init__(self)
+        self.created = created
+        self.errors = errors
+
+    def __str__(self):
+        """Get string representation of the object."""
+        return "Could not create {} of {} parts: {}".format(
+            len(self.errors),
+            len(self.errors) + len(self.created),
+            ', '.join(self.errors),
+        )
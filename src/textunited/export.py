@@ -0,0 +1,193 @@
+"""Streaming export of the translated files of a project to an archive."""
+import collections
+import io
+import posixpath
+import tarfile
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+from .file import SOURCE, TRANSLATED
+
+FORMATS = ('zip', 'tar', 'tar.gz')
+
+
+def archive_name(file):
+    """Return the path of a file inside the archive.
+
+    The subdir sent by Text United may use backslash separators. Empty, `.`
+    and `..` components are dropped, so files cannot be written outside the
+    directory where the archive is extracted. A file without any name
+    left is named by its id.
+
+    :param file: the file
+    :type file: File
+    :rtype: str
+    """
+    parts = (file.subdir or '').replace('\\', '/').split('/')
+    parts.append(file.name.replace('\\', '/'))
+    parts = [
+        part for part in '/'.join(parts).split('/')
+        if part not in ('', '.', '..')
+    ]
+    if not parts:
+        return str(file.id_)
+    return posixpath.join(*parts)
+
+
+class _ZipWriter:
+    """Write the files to a ZIP stream."""
+
+    def __init__(self, fileobj):
+        # zipfile writes data descriptors when the stream is not seekable
+        self.archive = zipfile.ZipFile(fileobj, 'w', zipfile.ZIP_DEFLATED)
+
+    def add(self, name, content):
+        info = zipfile.ZipInfo(name, time.localtime()[:6])
+        info.compress_type = zipfile.ZIP_DEFLATED
+        self.archive.writestr(info, content)
+
+    def close(self):
+        self.archive.close()
+
+    def abort(self):
+        # without its stream the archive never writes the central
+        # directory, not even when it is collected
+        self.archive.fp = None
+
+
+class _TarWriter:
+    """Write the files to a TAR stream."""
+
+    def __init__(self, fileobj, compression=''):
+        self.archive = tarfile.open(
+            fileobj=fileobj, mode='w|' + compression
+        )
+
+    def add(self, name, content):
+        info = tarfile.TarInfo(name)
+        info.size = len(content)
+        info.mtime = time.time()
+        self.archive.addfile(info, io.BytesIO(content))
+
+    def close(self):
+        self.archive.close()
+
+    def abort(self):
+        # neither the end of the archive nor the gzip trailer are written
+        self.archive.fileobj.closed = True
+        self.archive.closed = True
+
+
+def _writer(fileobj, format):
+    """Return the writer of an archive format."""
+    if format == 'zip':
+        return _ZipWriter(fileobj)
+    if format == 'tar':
+        return _TarWriter(fileobj)
+    return _TarWriter(fileobj, 'gz')
+
+
+def export_project(project, fileobj, format='zip', files=None, source=False,
+                   max_workers=4, byte_budget=64 * 1024 * 1024):
+    """Write the translated files of a project to an archive stream.
+
+    Contents are downloaded concurrently and written in the order of the
+    files, each one laid out by its subdir and name. Only the contents of
+    the files downloaded and not written yet are kept in memory: downloads
+    are started while their sizes fit in `byte_budget`, and at most
+    `2 * max_workers` are pending. The downloaded contents are not saved in
+    the File objects.
+
+    The stream only needs a `write` method, so it can be a file or an HTTP
+    response. When the export fails the archive is not finished, so it can
+    not be mistaken for a complete one, and a seekable stream is truncated
+    back to where the archive started.
+
+    :param project: the project to export
+    :param fileobj: the stream where the archive is written, it is not
+    closed.
+    :param format: 'zip', 'tar' or 'tar.gz'
+    :param files: the files to export, by default the translated files of
+    the project.
+    :param source: a boolean to select to export the source contents instead
+    of the translations.
+    :param max_workers: maximum number of concurrent downloads
+    :param byte_budget: maximum bytes, from the file sizes, of the contents
+    pending to be written. A bigger file is downloaded alone.
+    :type project: Project
+    :return: the names of the files written in the archive
+    :rtype: list of str
+    """
+    if format not in FORMATS:
+        raise ValueError(
+            'Unknown format {}, it should be one of {}'.format(
+                format, ', '.join(FORMATS)
+            )
+        )
+    if files is None:
+        files = [
+            f for f in project.get_files(download_translations=False)
+            if source or f.status == 'Translated'
+        ]
+    content_type = SOURCE if source else TRANSLATED
+    max_pending = 2 * max_workers
+    logger = project.client.logger
+    logger.info(
+        "Exporting %s files of project %s to %s", len(files), project.id_,
+        format
+    )
+
+    start = fileobj.tell() if _seekable(fileobj) else None
+    writer = _writer(fileobj, format)
+    names = []
+    pending = collections.deque()
+    pending_bytes = 0
+    remaining = iter(files)
+    next_file = next(remaining, None)
+    try:
+        with ThreadPoolExecutor(max_workers) as executor:
+            try:
+                while next_file is not None or pending:
+                    # start downloads while they fit in the window
+                    while next_file is not None and \
+                            len(pending) < max_pending:
+                        size = next_file.size or 0
+                        if pending and pending_bytes + size > byte_budget:
+                            break
+                        future = executor.submit(
+                            next_file._fetch_content, content_type
+                        )
+                        pending.append((next_file, size, future))
+                        pending_bytes += size
+                        next_file = next(remaining, None)
+
+                    file, size, future = pending.popleft()
+                    content = future.result()
+                    pending_bytes -= size
+                    name = archive_name(file)
+                    writer.add(name, content)
+                    names.append(name)
+                    del content, future
+            except BaseException:
+                # do not wait for the downloads not started
+                for _, _, future in pending:
+                    future.cancel()
+                raise
+    except BaseException:
+        writer.abort()
+        if start is not None:
+            fileobj.seek(start)
+            fileobj.truncate()
+        raise
+    writer.close()
+    logger.info("Exported %s files of project %s", len(names), project.id_)
+    return names
+
+
+def _seekable(fileobj):
+    """Return True if the stream can be truncated."""
+    try:
+        return fileobj.seekable() and hasattr(fileobj, 'truncate')
+    except AttributeError:
+        return False
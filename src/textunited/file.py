@@ -1,5 +1,57 @@
 """File related classes."""
-import base64
+import functools
+import itertools
+import weakref
+
+from . import buffers, codec, process, store
+from .profiling import BASE64, phase
+from .tracing import traced
+
+TRANSLATED = 'translated'
+SOURCE = 'source'
+
+_content_keys = itertools.count()
+
+
+def content_path(project_id, file_id, content_type):
+    """Return the path of the resource with the content of a file.
+
+    :param project_id: Project Id in Text United system
+    :param file_id: File Id in Text United system
+    :param content_type: TRANSLATED or SOURCE
+    :rtype: str
+    """
+    return (
+        '/projectfiles?projectId={project_id}&fileId={file_id}'
+        '&type={content_type}'
+    ).format(
+        project_id=project_id,
+        file_id=file_id,
+        content_type=content_type,
+    )
+
+
+def _load_content(file_ref, content_type):
+    """Download again a content dropped by the content store."""
+    file = file_ref()
+    if file is None or file.client is None:
+        return None
+    return file._fetch_content(content_type)
+
+
+def _file_attributes(file):
+    """Return the span attributes of a content download."""
+    return {
+        'textunited.project_id': file.project_id,
+        'textunited.file_id': file.id_,
+        'textunited.file_size': file.size,
+    }
+
+
+def _discard_contents(content_store, key):
+    """Remove the contents of a file garbage collected."""
+    content_store.discard((key, TRANSLATED))
+    content_store.discard((key, SOURCE))
 
 
 class File:
@@ -10,9 +62,15 @@ class File:
 
     The translated_content and the source_content, both bytes, are get with
     :func:`get_translated_content` and :func:`get_source_content` and saved in
-    the object attributes.
+    the object attributes. When a content store is installed, see
+    :mod:`textunited.store`, the contents are kept in the store.
     """
 
+    # attributes serialized by :func:`to_record` besides the content
+    FIELDS = (
+        'project_id', 'id_', 'name', 'subdir', 'size', 'words', 'status',
+    )
+
     def __init__(self, client, project_id, id_, name, subdir, size, words,
                  status):
         """Constructor.
@@ -36,36 +94,117 @@ class File:
         self.size = size
         self.words = words
         self.status = status
-        self.translated_content = None
-        self.source_content = None
+        self._contents = {}
+        self._content_key = None
+
+    @property
+    def translated_content(self):
+        """Return the translated content, None if not downloaded."""
+        return self._get_content(TRANSLATED)
+
+    @translated_content.setter
+    def translated_content(self, value):
+        """Set the translated content."""
+        self._set_content(TRANSLATED, value)
 
+    @property
+    def source_content(self):
+        """Return the source content, None if not downloaded."""
+        return self._get_content(SOURCE)
+
+    @source_content.setter
+    def source_content(self, value):
+        """Set the source content."""
+        self._set_content(SOURCE, value)
+
+    @traced('textunited.get_translated_content', _file_attributes)
     def get_translated_content(self):
         """Get and save inside the object the translated file content."""
         self.client.logger.info(
             "Retrieving translated content of file %s",
             self
         )
-
-        url = (
-            '/projectfiles?projectId={project_id}&fileId={file_id}'
-            '&type=translated'
-        ).format(project_id=self.project_id, file_id=self.id_)
-
-        json_obj = self.client.fetch_json(url)
-        self.translated_content = base64.b64decode(json_obj['Content'])
+        self.translated_content = self._fetch_content(TRANSLATED)
         self.client.logger.info("Retrieved translated content of file %s", self)
 
+    @traced('textunited.get_source_content', _file_attributes)
     def get_source_content(self):
         """Get and save inside the object the source file content."""
         self.client.logger.info("Retrieving source content of file %s", self)
-        url = (
-            '/projectfiles?projectId={project_id}&fileId={file_id}&type=source'
-        ).format(project_id=self.project_id, file_id=self.id_)
-
-        json_obj = self.client.fetch_json(url)
-        self.source_content = base64.b64decode(json_obj['Content'])
+        self.source_content = self._fetch_content(SOURCE)
         self.client.logger.info("Retrieved source content of file %s", self)
 
+    @traced('textunited.get_content_buffer', _file_attributes)
+    def get_content_buffer(self, content_type=TRANSLATED, pool=None):
+        """Download a content into a pooled buffer without saving it.
+
+        The content is decoded into a buffer reused by later downloads and
+        read through its `view`, so it must be released once it is used::
+
+            with file.get_content_buffer() as buffer:
+                f.write(buffer.view)
+
+        :param content_type: TRANSLATED or SOURCE
+        :param pool: the buffer pool, by default the pool of the module
+        :mod:`textunited.buffers`.
+        :type pool: BufferPool
+        :rtype: Buffer
+        """
+        json_obj = self.client.fetch_json(
+            content_path(self.project_id, self.id_, content_type)
+        )
+        pool = buffers.default_pool if pool is None else pool
+        with phase(self.client, BASE64):
+            return pool.decode(json_obj['Content'])
+
+    def _fetch_content(self, content_type):
+        """Download and decode the content of the given type."""
+        json_obj = self.client.fetch_json(
+            content_path(self.project_id, self.id_, content_type)
+        )
+        with phase(self.client, BASE64):
+            return codec.b64decode(json_obj['Content'])
+
+    def _get_content(self, content_type):
+        """Return the content from the object or the content store."""
+        if content_type in self._contents or self._content_key is None:
+            return self._contents.get(content_type)
+        content_store = store.get_store()
+        if content_store is None:
+            return None
+        return content_store.get((self._content_key, content_type))
+
+    def _peek_content(self, content_type):
+        """Return the content without downloading it again."""
+        if content_type in self._contents or self._content_key is None:
+            return self._contents.get(content_type)
+        content_store = store.get_store()
+        if content_store is None:
+            return None
+        return content_store.peek((self._content_key, content_type))
+
+    def _set_content(self, content_type, value):
+        """Save the content in the content store if there is one."""
+        content_store = store.get_store()
+        if content_store is None:
+            self._contents[content_type] = value
+            return
+        self._contents.pop(content_type, None)
+        if self._content_key is None:
+            if value is None:
+                return
+            self._content_key = next(_content_keys)
+            weakref.finalize(
+                self, _discard_contents, content_store, self._content_key
+            )
+        content_store.put(
+            (self._content_key, content_type),
+            value,
+            loader=functools.partial(
+                _load_content, weakref.ref(self), content_type
+            ),
+        )
+
     @classmethod
     def from_json(cls, client, project_id, json_obj,
                   download_translations=True, download_sources=False):
@@ -100,6 +239,53 @@ class File:
             obj.get_source_content()
         return obj
 
+    def to_record(self, content=True):
+        """Serialize the file to a dict of python primitives.
+
+        The client is not included, so the record can be sent to another
+        process.
+
+        :param content: a boolean to select to include the downloaded
+        contents. Contents dropped by the content store are not downloaded
+        again, they are not included.
+        :rtype: dict
+        """
+        record = {field: getattr(self, field) for field in self.FIELDS}
+        if content:
+            record['translated_content'] = self._peek_content(TRANSLATED)
+            record['source_content'] = self._peek_content(SOURCE)
+        return record
+
+    @classmethod
+    def from_record(cls, record, client=None):
+        """Deserialize a record created with :func:`to_record`.
+
+        :param record: the record of the file
+        :param client: the client bound to the file, by default the client
+        of the current process, see :mod:`textunited.process`.
+        :rtype: File
+        """
+        obj = cls(
+            client=client or process.get_client(),
+            **{field: record[field] for field in cls.FIELDS}
+        )
+        obj.translated_content = record.get('translated_content')
+        obj.source_content = record.get('source_content')
+        return obj
+
+    def bind(self, client):
+        """Bind the file to a client.
+
+        :param client: the client used to download the content
+        :return: the file itself
+        """
+        self.client = client
+        return self
+
+    def __reduce__(self):
+        """Pickle the file as a record without the client."""
+        return (type(self).from_record, (self.to_record(),))
+
     def __repr__(self):
         """Get string representation of the object."""
         return 'id#{} "{}" at project {} ({})'.format(
@@ -127,30 +313,41 @@ class FileUpload:
     time.
     """
 
-    def __init__(self, name, content):
+    def __init__(self, name, content, words=None):
         """Constructor.
 
         :param name: File name
         :param content: The file content to be uploaded
+        :param words: optional number of words of the file, used to split
+        large projects by words.
         :type name: str
         :type content: bytes
+        :type words: int
         """
         if not isinstance(content, bytes):
             raise TypeError('content attribute should be bytes type')
 
         self.name = name
         self.content = content
+        self.words = words
 
-    def to_json(self):
+    def to_json(self, upload_index=None):
         """Serialize FileUpload request in Text United API format.
 
+        :param upload_index: optional index reusing the payload of an
+        identical content encoded before.
+        :type upload_index: UploadIndex
         :return: a JSON Object matching Text United file representation format
         with the content encoded in base64.
         :rtype: a JSON Object
         """
+        if upload_index is None:
+            content = codec.b64encode(self.content)
+        else:
+            content = upload_index.encode(self)
         json_obj = {
             'Filename': self.name,
-            'Content': str(base64.b64encode(self.content), 'utf-8'),
+            'Content': content,
         }
 
         return json_obj
@@ -0,0 +1,245 @@
+"""Hedged requests to reduce tail latency."""
+import collections
+import contextlib
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+
+
+class _WorkerPool:
+    """Threads running the requests, started when all of them are busy.
+
+    Unlike a ThreadPoolExecutor, the number of threads follows the requests
+    in flight, so the pool does not cap the concurrency of the callers.
+    Threads idle for `idle_timeout` seconds exit.
+    """
+
+    def __init__(self, max_workers=None, idle_timeout=60):
+        self.max_workers = max_workers
+        self.idle_timeout = idle_timeout
+        self._tasks = queue.Queue()
+        self._threads = 0
+        self._idle = 0
+        self._shutdown = False
+        self._lock = threading.Lock()
+
+    def submit(self, func, *args, **kwargs):
+        future = Future()
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError('The pool is shut down')
+            # the queued tasks will be taken by the idle threads
+            start = self._idle <= self._tasks.qsize() and (
+                self.max_workers is None or self._threads < self.max_workers
+            )
+            if start:
+                self._threads += 1
+            self._tasks.put((future, func, args, kwargs))
+        if start:
+            threading.Thread(
+                target=self._work, name='textunited-hedge', daemon=True
+            ).start()
+        return future
+
+    def shutdown(self):
+        with self._lock:
+            self._shutdown = True
+            for _ in range(self._threads):
+                self._tasks.put(None)
+
+    def _work(self):
+        while True:
+            with self._lock:
+                self._idle += 1
+            try:
+                task = self._tasks.get(timeout=self.idle_timeout)
+            except queue.Empty:
+                with self._lock:
+                    if self._tasks.qsize():
+                        # a task was submitted counting on this thread
+                        self._idle -= 1
+                        continue
+                    self._idle -= 1
+                    self._threads -= 1
+                return
+            with self._lock:
+                self._idle -= 1
+            if task is None:
+                return
+            future, func, args, kwargs = task
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(func(*args, **kwargs))
+                except BaseException as e:
+                    future.set_exception(e)
+
+
+class HedgingPolicy:
+    """Class representing the hedging policy for idempotent requests.
+
+    A request is sent and, if no response arrives within the delay given by
+    the configured percentile of the observed latencies, a duplicate request
+    is sent. The first response wins and the other one is cancelled, or
+    ignored when it is already on the wire.
+
+    The number of hedged requests is capped by the budget, a fraction of all
+    the requests sent through the policy.
+    """
+
+    logger = logging.getLogger(__name__)
+
+    def __init__(self, percentile=95, initial_delay=0.5, min_delay=0.01,
+                 max_delay=5.0, budget=0.05, window=1000, min_samples=20,
+                 max_workers=None):
+        """Constructor.
+
+        :param percentile: percentile of the observed latencies used as
+        hedging delay.
+        :param initial_delay: delay in seconds used until `min_samples`
+        latencies have been observed.
+        :param min_delay: lower bound of the hedging delay in seconds.
+        :param max_delay: upper bound of the hedging delay in seconds.
+        :param budget: maximum fraction of extra requests, 0.05 means that at
+        most 5% of the requests are hedged.
+        :param window: number of latest latencies kept to compute the delay.
+        :param min_samples: number of latencies needed before using the
+        percentile.
+        :param max_workers: optional maximum number of threads sending
+        requests. By default there is a thread per request in flight, so
+        hedging does not limit the concurrency of the callers.
+        :type percentile: float
+        :type budget: float
+        """
+        if not 0 < percentile < 100:
+            raise ValueError('percentile should be between 0 and 100')
+        if budget < 0:
+            raise ValueError('budget should not be negative')
+
+        self.percentile = percentile
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.budget = budget
+        self.min_samples = min_samples
+        self.max_workers = max_workers
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self._latencies = collections.deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._executor = None
+
+    @property
+    def delay(self):
+        """Return the current hedging delay in seconds."""
+        with self._lock:
+            latencies = sorted(self._latencies)
+        if len(latencies) < self.min_samples:
+            return self.initial_delay
+        index = int(len(latencies) * self.percentile / 100)
+        delay = latencies[min(index, len(latencies) - 1)]
+        return min(max(delay, self.min_delay), self.max_delay)
+
+    @property
+    def win_rate(self):
+        """Return the fraction of hedged requests won by the duplicate."""
+        if not self.hedges:
+            return 0.0
+        return self.hedge_wins / self.hedges
+
+    def stats(self):
+        """Return a dict with the counters of the policy.
+
+        :return: requests, hedges, hedge_wins, win_rate and current delay
+        :rtype: dict
+        """
+        return {
+            'requests': self.requests,
+            'hedges': self.hedges,
+            'hedge_wins': self.hedge_wins,
+            'win_rate': self.win_rate,
+            'delay': self.delay,
+        }
+
+    def run(self, func, *args, slot=None, **kwargs):
+        """Call `func` hedging it when it is slower than the delay.
+
+        :param func: a callable sending an idempotent request
+        :param slot: optional callable returning a context manager entered
+        by each call before it starts, e.g. the slot of a scheduler. The
+        time waiting for it is not counted in the delay nor the latencies.
+        :return: the result of the first call to finish
+        """
+        delay = self.delay
+        with self._lock:
+            self.requests += 1
+            if self._executor is None:
+                self._executor = _WorkerPool(self.max_workers)
+
+        started = threading.Event()
+        primary = self._executor.submit(
+            self._timed, func, *args, _started=started, _slot=slot, **kwargs
+        )
+        # the delay counts from the start of the request, not while it is
+        # queued waiting for a thread or for its slot
+        started.wait()
+        done, _ = wait([primary], timeout=delay)
+        if done or not self._acquire_hedge():
+            return primary.result()
+
+        self.logger.debug("Hedging request after %.3f seconds", delay)
+        hedge = self._executor.submit(
+            self._timed, func, *args, _slot=slot, **kwargs
+        )
+        done, pending = wait([primary, hedge], return_when=FIRST_COMPLETED)
+        # a successful call wins, the primary if both finished
+        succeeded = [
+            future for future in (primary, hedge)
+            if future in done and future.exception() is None
+        ]
+        if succeeded:
+            winner = succeeded[0]
+        elif pending:
+            # the first one to finish failed, give a chance to the other one
+            winner = pending.pop()
+        else:
+            winner = primary
+        for future in (primary, hedge):
+            if future is not winner:
+                future.cancel()
+
+        if winner is hedge:
+            with self._lock:
+                self.hedge_wins += 1
+        return winner.result()
+
+    def shutdown(self):
+        """Release the threads used to send the requests."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown()
+
+    def _acquire_hedge(self):
+        """Reserve a hedge if the budget allows it."""
+        with self._lock:
+            if self.hedges + 1 > self.budget * self.requests:
+                return False
+            self.hedges += 1
+            return True
+
+    def _timed(self, func, *args, _started=None, _slot=None, **kwargs):
+        """Call func and record its latency when it succeeds."""
+        with contextlib.ExitStack() as stack:
+            if _slot is not None:
+                stack.enter_context(_slot())
+            if _started is not None:
+                _started.set()
+            start = time.monotonic()
+            result = func(*args, **kwargs)
+            latency = time.monotonic() - start
+        with self._lock:
+            self._latencies.append(latency)
+        return result
@@ -1,24 +1,40 @@
 """Language Classes."""
+import collections
 import enum
+import json
+import logging
+import pkgutil
+import threading
+
+
+def _normalize_code(code):
+    """Return a BCP 47 code in lower case with `-` separators."""
+    return code.strip().lower().replace('_', '-')
 
 
 class MetaLanguage(enum.EnumMeta):
     """Custom EnumMeta for Language."""
 
+    def __new__(mcs, *args, **kwargs):
+        """Create the enum with an index of the normalized member names."""
+        enum_class = super().__new__(mcs, *args, **kwargs)
+        enum_class._name_index = {
+            _normalize_code(name): member
+            for name, member in enum_class.__members__.items()
+        }
+        return enum_class
+
     def __getitem__(self, name):
         """Override __getitem to allow to find en-gb or en_gb."""
-        name = name.lower()
-        try:
-            return super().__getitem__(name)
-        except KeyError:
-            return super().__getitem__(name.replace('-', '_'))
+        return self._name_index[_normalize_code(name)]
 
 
 class Language(enum.IntEnum, metaclass=MetaLanguage):
     """Supported languages in BCP 47 format.
 
     It is possible to access to an specific language with `Language['en_gb']`
-    or with `Language['en-gb']`.
+    or with `Language['en-gb']`. Languages not in this enum are found in the
+    :class:`LanguageCatalog`.
     """
 
     ar_ae = 21  # Arabic (United Arab Emirates)
@@ -34,3 +50,178 @@ class Language(enum.IntEnum, metaclass=MetaLanguage):
     pt_br = 94  # Portuguese (Brazil)
     zh_hant = 33  # Chinese (Traditional)
     zn_hans = 32  # Chinese (Simplified)
+
+
+class LanguageInfo(collections.namedtuple('LanguageInfo', 'id code name')):
+    """Class representing a language of the catalog.
+
+    Like :class:`Language`, its `value` is the Text United id, so it can be
+    used to create a :class:`textunited.project.ProjectRequest`.
+    """
+
+    __slots__ = ()
+
+    @property
+    def value(self):
+        """Return the Text United id of the language."""
+        return self.id
+
+    @property
+    def language(self):
+        """Return the member of the Language enum, None if there is not."""
+        return Language._value2member_map_.get(self.id)
+
+    def __str__(self):
+        """Get string representation of the object."""
+        return '{} ({})'.format(self.name or self.code, self.id)
+
+
+class LanguageCatalog:
+    """Class representing the languages supported by Text United.
+
+    The catalog is loaded from the bundled data file, from the API or from
+    a list of records. Languages are indexed by id, by BCP 47 code in any
+    case and with `-` or `_` separators, and by name in any case, so
+    lookups are dict accesses::
+
+        catalog = get_catalog()
+        catalog['en_gb'] == catalog['EN-GB'] == catalog[40]
+    """
+
+    logger = logging.getLogger(__name__)
+
+    def __init__(self, languages=()):
+        """Constructor.
+
+        :param languages: the languages of the catalog
+        :type languages: list of LanguageInfo
+        """
+        self._by_id = {}
+        self._by_key = {}
+        self._lock = threading.Lock()
+        for language in languages:
+            self.add(*language)
+
+    @classmethod
+    def from_records(cls, records):
+        """Create a catalog from a list of dicts.
+
+        :param records: dicts with the id, code and name of the languages,
+        with the keys in lower case or capitalized as in the API.
+        :rtype: LanguageCatalog
+        """
+        catalog = cls()
+        for record in records:
+            catalog.add(
+                record.get('id', record.get('Id')),
+                record.get('code', record.get('Code')),
+                record.get('name', record.get('Name')),
+            )
+        return catalog
+
+    @classmethod
+    def from_file(cls, path=None):
+        """Create a catalog from a JSON file.
+
+        :param path: path to the file, by default the file bundled with the
+        package.
+        :rtype: LanguageCatalog
+        """
+        if path is None:
+            data = pkgutil.get_data(__name__.rpartition('.')[0],
+                                    'data/languages.json')
+        else:
+            with open(path, 'rb') as f:
+                data = f.read()
+        return cls.from_records(json.loads(data.decode('utf-8')))
+
+    @classmethod
+    def from_api(cls, client, uri_path='/languages'):
+        """Create a catalog with the languages returned by the API.
+
+        :param client: the client sending the request
+        :param uri_path: path of the resource listing the languages
+        :type client: TextUnitedClient
+        :rtype: LanguageCatalog
+        """
+        catalog = cls.from_records(client.fetch_json(uri_path))
+        cls.logger.info("%s languages retrieved", len(catalog))
+        return catalog
+
+    def __len__(self):
+        """Return the number of languages."""
+        return len(self._by_id)
+
+    def __iter__(self):
+        """Iterate over the languages sorted by id."""
+        return iter(sorted(self._by_id.values()))
+
+    def __contains__(self, key):
+        """Check if a language is in the catalog."""
+        return self.get(key) is not None
+
+    def __getitem__(self, key):
+        """Return a language by id, code or name.
+
+        :raises: KeyError: the language is not in the catalog
+        """
+        language = self.get(key)
+        if language is None:
+            raise KeyError(key)
+        return language
+
+    def get(self, key, default=None):
+        """Return a language by id, code or name.
+
+        :param key: the id, the BCP 47 code, the name or a Language
+        :param default: returned if the language is not in the catalog
+        :rtype: LanguageInfo
+        """
+        if isinstance(key, int):
+            return self._by_id.get(int(key), default)
+        if isinstance(key, str):
+            return self._by_key.get(_normalize_code(key), default)
+        return default
+
+    def add(self, id_, code, name=None):
+        """Add a language to the catalog, replacing the one with its id.
+
+        :param id_: the Text United id
+        :param code: the BCP 47 code
+        :param name: the English name
+        :rtype: LanguageInfo
+        """
+        language = LanguageInfo(int(id_), code, name)
+        keys = [code, name]
+        if language.language is not None:
+            keys.append(language.language.name)
+        with self._lock:
+            self._by_id[language.id] = language
+            for key in keys:
+                if key:
+                    self._by_key[_normalize_code(key)] = language
+        return language
+
+
+_catalog = None
+
+
+def set_catalog(catalog):
+    """Install the catalog used to find the languages of the projects.
+
+    :param catalog: the language catalog, None to use the bundled one
+    :type catalog: LanguageCatalog
+    """
+    global _catalog
+    _catalog = catalog
+
+
+def get_catalog():
+    """Return the installed catalog, loading the bundled one if needed.
+
+    :rtype: LanguageCatalog
+    """
+    global _catalog
+    if _catalog is None:
+        _catalog = LanguageCatalog.from_file()
+    return _catalog
@@ -0,0 +1,329 @@
+"""Local SQLite mirror of projects, files and accounts."""
+import logging
+import sqlite3
+import threading
+from datetime import datetime
+
+from .account import Account
+from .exceptions import AccountNotFound, ProjectNotFound
+from .file import File
+from .project import Project
+
+DATETIME_FORMAT = '%Y-%m-%dT%H:%M:%S.%f'
+
+PROJECT_COLUMNS = Project.FIELDS
+FILE_COLUMNS = File.FIELDS
+ACCOUNT_COLUMNS = (
+    'id_', 'email', 'first_name', 'last_name', 'phone', 'position',
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS projects (
+    id_ INTEGER PRIMARY KEY,
+    name TEXT,
+    description TEXT,
+    creation_date_utc TEXT,
+    source_language_id INTEGER,
+    target_language_id INTEGER,
+    source_language_code TEXT,
+    target_language_code TEXT,
+    start_date_utc TEXT,
+    end_date_utc TEXT,
+    status TEXT,
+    owner_id INTEGER,
+    owner_name TEXT,
+    manager_id INTEGER,
+    manager_name TEXT,
+    progress INTEGER,
+    translation_progress INTEGER,
+    proofreading_progress INTEGER,
+    reference_number TEXT
+);
+CREATE INDEX IF NOT EXISTS projects_status ON projects (status);
+CREATE INDEX IF NOT EXISTS projects_owner_id ON projects (owner_id);
+CREATE INDEX IF NOT EXISTS projects_manager_id ON projects (manager_id);
+CREATE INDEX IF NOT EXISTS projects_end_date_utc ON projects (end_date_utc);
+CREATE TABLE IF NOT EXISTS files (
+    project_id INTEGER NOT NULL,
+    id_ INTEGER NOT NULL,
+    name TEXT,
+    subdir TEXT,
+    size INTEGER,
+    words INTEGER,
+    status TEXT,
+    PRIMARY KEY (project_id, id_)
+);
+CREATE INDEX IF NOT EXISTS files_status ON files (status);
+CREATE TABLE IF NOT EXISTS accounts (
+    id_ INTEGER PRIMARY KEY,
+    email TEXT,
+    first_name TEXT,
+    last_name TEXT,
+    phone TEXT,
+    position TEXT
+);
+CREATE INDEX IF NOT EXISTS accounts_email ON accounts (email);
+"""
+
+
+def _to_db(value):
+    """Convert datetime to the text stored in the database."""
+    if isinstance(value, datetime):
+        return value.strftime(DATETIME_FORMAT)
+    return value
+
+
+def _from_db(value):
+    """Convert the text stored in the database to datetime."""
+    if value is None:
+        return None
+    return datetime.strptime(value, DATETIME_FORMAT)
+
+
+class Mirror:
+    """Class representing a local copy of the Text United data.
+
+    Projects, file metadata and accounts are stored in a SQLite database.
+    :func:`sync` updates the copy and the query methods return Project,
+    File and Account objects without sending any request. File content is
+    not stored.
+    """
+
+    logger = logging.getLogger(__name__)
+
+    def __init__(self, client, path=':memory:'):
+        """Constructor.
+
+        :param client: the client used to sync the mirror and bound to the
+        returned Project and File objects.
+        :param path: path to the SQLite database. By default the database is
+        kept in memory.
+        :type client: TextUnitedClient
+        """
+        self.client = client
+        self.path = path
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript(SCHEMA)
+
+    def close(self):
+        """Close the database."""
+        with self._lock:
+            self._db.close()
+
+    def sync(self, accounts=True):
+        """Update the mirror with the changes in Text United.
+
+        The list of projects is always retrieved. The files are only
+        retrieved for new projects and for the projects whose status or
+        progress changed since the last sync.
+
+        :param accounts: a boolean to select to sync the accounts too.
+        :return: dict with the ids of the added, changed and removed projects
+        and the number of added, changed and removed files.
+        :rtype: dict
+        """
+        self.logger.info("Syncing mirror %s", self.path)
+        projects = self.client.list_projects()
+        with self._lock:
+            known = {
+                row[0]: row[1:] for row in self._db.execute(
+                    'SELECT id_, status, progress FROM projects'
+                )
+            }
+        result = {
+            'projects_added': [],
+            'projects_changed': [],
+            'projects_removed': [],
+            'files_added': 0,
+            'files_changed': 0,
+            'files_removed': 0,
+        }
+
+        outdated = []
+        for project in projects:
+            state = known.pop(project.id_, None)
+            if state is None:
+                result['projects_added'].append(project.id_)
+                outdated.append(project)
+            elif state != (project.status, project.progress):
+                result['projects_changed'].append(project.id_)
+                outdated.append(project)
+        result['projects_removed'] = list(known)
+
+        files = {
+            project.id_: project.get_files(download_translations=False)
+            for project in outdated
+        }
+        account_list = self.client.list_accounts() if accounts else None
+
+        with self._lock, self._db:
+            self._db.executemany(
+                'INSERT OR REPLACE INTO projects ({}) VALUES ({})'.format(
+                    ', '.join(PROJECT_COLUMNS),
+                    ', '.join('?' * len(PROJECT_COLUMNS)),
+                ),
+                [self._project_row(project) for project in projects],
+            )
+            for project_id in result['projects_removed']:
+                self._db.execute(
+                    'DELETE FROM projects WHERE id_ = ?', (project_id,)
+                )
+                self._db.execute(
+                    'DELETE FROM files WHERE project_id = ?', (project_id,)
+                )
+            for project_id, file_list in files.items():
+                self._sync_files(project_id, file_list, result)
+            if account_list is not None:
+                self._db.execute('DELETE FROM accounts')
+                self._db.executemany(
+                    'INSERT INTO accounts ({}) VALUES ({})'.format(
+                        ', '.join(ACCOUNT_COLUMNS),
+                        ', '.join('?' * len(ACCOUNT_COLUMNS)),
+                    ),
+                    [
+                        tuple(getattr(account, c) for c in ACCOUNT_COLUMNS)
+                        for account in account_list
+                    ],
+                )
+
+        self.logger.info(
+            "Mirror synced: %s projects added, %s changed, %s removed",
+            len(result['projects_added']),
+            len(result['projects_changed']),
+            len(result['projects_removed']),
+        )
+        return result
+
+    def list_projects(self, status=None, owner_id=None, manager_id=None):
+        """List the projects in the mirror.
+
+        :param status: only return the projects with this status
+        :param owner_id: only return the projects of this owner
+        :param manager_id: only return the projects of this manager
+        :rtype: list of Project
+        """
+        conditions = []
+        params = []
+        for column, value in (('status', status), ('owner_id', owner_id),
+                              ('manager_id', manager_id)):
+            if value is not None:
+                conditions.append('{} = ?'.format(column))
+                params.append(value)
+        return self._select_projects(conditions, params)
+
+    def overdue_projects(self, now=None):
+        """List the projects not finished after their end date.
+
+        :param now: the current UTC datetime, by default `datetime.utcnow()`
+        :rtype: list of Project
+        """
+        now = now or datetime.utcnow()
+        return self._select_projects(
+            ['end_date_utc < ?', 'progress < 100'], [_to_db(now)]
+        )
+
+    def get_project(self, project_id):
+        """Get a project from the mirror.
+
+        :param project_id: Project id in Text United system.
+        :rtype: Project
+        :raises: ProjectNotFound: the project is not in the mirror
+        """
+        projects = self._select_projects(['id_ = ?'], [project_id])
+        if not projects:
+            raise ProjectNotFound(
+                'Could not find the project with id {}'.format(project_id)
+            )
+        return projects[0]
+
+    def get_files(self, project_id=None, status=None):
+        """List the files in the mirror.
+
+        :param project_id: only return the files of this project
+        :param status: only return the files with this status
+        :rtype: list of File
+        """
+        conditions = []
+        params = []
+        for column, value in (('project_id', project_id), ('status', status)):
+            if value is not None:
+                conditions.append('{} = ?'.format(column))
+                params.append(value)
+        rows = self._select('files', FILE_COLUMNS, conditions, params)
+        return [
+            File(self.client, **dict(zip(FILE_COLUMNS, row))) for row in rows
+        ]
+
+    def list_accounts(self):
+        """List the accounts in the mirror.
+
+        :rtype: list of Account
+        """
+        rows = self._select('accounts', ACCOUNT_COLUMNS, [], [])
+        return [Account(*row) for row in rows]
+
+    def get_account(self, email):
+        """Get an account from the mirror.
+
+        :param email: the email of the account
+        :rtype: Account
+        :raises: AccountNotFound: the account is not in the mirror
+        """
+        rows = self._select('accounts', ACCOUNT_COLUMNS, ['email = ?'], [email])
+        if not rows:
+            raise AccountNotFound(
+                "Could not find an account with email {}".format(email)
+            )
+        return Account(*rows[0])
+
+    def _sync_files(self, project_id, file_list, result):
+        """Replace the files of a project counting the changes."""
+        known = {
+            row[0]: row[1:] for row in self._db.execute(
+                'SELECT id_, status, size FROM files WHERE project_id = ?',
+                (project_id,)
+            )
+        }
+        for file in file_list:
+            state = known.pop(file.id_, None)
+            if state is None:
+                result['files_added'] += 1
+            elif state != (file.status, file.size):
+                result['files_changed'] += 1
+        result['files_removed'] += len(known)
+
+        self._db.execute(
+            'DELETE FROM files WHERE project_id = ?', (project_id,)
+        )
+        self._db.executemany(
+            'INSERT INTO files ({}) VALUES ({})'.format(
+                ', '.join(FILE_COLUMNS), ', '.join('?' * len(FILE_COLUMNS)),
+            ),
+            [tuple(getattr(f, c) for c in FILE_COLUMNS) for f in file_list],
+        )
+
+    def _select(self, table, columns, conditions, params):
+        """Select the columns of the rows matching all the conditions."""
+        query = 'SELECT {} FROM {}'.format(', '.join(columns), table)
+        if conditions:
+            query += ' WHERE ' + ' AND '.join(conditions)
+        query += ' ORDER BY id_'
+        with self._lock:
+            return self._db.execute(query, params).fetchall()
+
+    def _select_projects(self, conditions, params):
+        """Select the projects matching all the conditions."""
+        rows = self._select('projects', PROJECT_COLUMNS, conditions, params)
+        projects = []
+        for row in rows:
+            kwargs = dict(zip(PROJECT_COLUMNS, row))
+            for column in Project.DATETIME_FIELDS:
+                kwargs[column] = _from_db(kwargs[column])
+            projects.append(Project(client=self.client, **kwargs))
+        return projects
+
+    @staticmethod
+    def _project_row(project):
+        """Return the values of the project in the order of the columns."""
+        return tuple(_to_db(getattr(project, c)) for c in PROJECT_COLUMNS)
@@ -0,0 +1,218 @@
+"""Speculative prefetch of the files of the projects likely to be opened."""
+import collections
+import heapq
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .downloads import JSON_OVERHEAD
+from .file import TRANSLATED, content_path
+from .scheduler import PRIORITY_BULK
+
+COMPLETED = 'Completed'
+
+
+def is_completed(project):
+    """Return True if the project is completed.
+
+    :type project: Project
+    :rtype: bool
+    """
+    return project.status == COMPLETED
+
+
+class Prefetcher:
+    """Class representing a prefetcher of file listings and contents.
+
+    Installed in a client, it watches the projects returned by
+    :func:`TextUnitedClient.list_projects` and
+    :func:`TextUnitedClient.get_project`. The first time a project is seen
+    only its status is recorded. When it is seen again with a new status
+    matching the predicate, e.g. once it is completed, its file listing and
+    the contents of its translated files are downloaded in background
+    threads into the response cache of the client, so a later
+    :func:`Project.get_files` is answered from the cache.
+
+    Prefetch requests are sent with a low priority. The contents kept in the
+    cache by the prefetcher, counted with the size of their base64 JSON
+    bodies until they expire, never exceed `byte_budget`; the downloads that
+    do not fit are skipped.
+    The statuses of the last `max_projects` projects seen are kept, a project
+    forgotten is recorded again without prefetch.
+    """
+
+    logger = logging.getLogger(__name__)
+
+    def __init__(self, predicate=is_completed, max_workers=2,
+                 byte_budget=64 * 1024 * 1024, download_translations=True,
+                 priority=PRIORITY_BULK, max_projects=10000,
+                 clock=time.monotonic):
+        """Constructor.
+
+        :param predicate: function returning True for the projects to
+        prefetch, by default the completed projects.
+        :param max_workers: maximum number of prefetch requests at once
+        :param byte_budget: maximum bytes of prefetched contents in the
+        cache.
+        :param download_translations: a boolean to select to prefetch the
+        translated contents, not only the file listings.
+        :param priority: priority of the prefetch requests in the scheduler
+        :param max_projects: maximum number of project statuses kept
+        :param clock: function returning the current time in seconds
+        :type max_workers: int
+        :type byte_budget: int
+        :type max_projects: int
+        """
+        self.predicate = predicate
+        self.max_workers = max_workers
+        self.byte_budget = byte_budget
+        self.download_translations = download_translations
+        self.priority = priority
+        self.max_projects = max_projects
+        self._clock = clock
+        self._executor = ThreadPoolExecutor(
+            max_workers, thread_name_prefix='textunited-prefetch'
+        )
+        # last status of the watched projects, the least recently seen first
+        self._statuses = collections.OrderedDict()
+        # expiration time and size of the prefetched contents
+        self._spent = []
+        self._spent_bytes = 0
+        self._counters = collections.Counter()
+        self._lock = threading.Lock()
+
+    def watch(self, projects):
+        """Queue the prefetch of the projects matching the predicate.
+
+        It returns immediately, the files are downloaded in the background.
+
+        :param projects: the projects returned to the user
+        :type projects: list of Project
+        :return: the number of projects queued
+        :rtype: int
+        """
+        queued = []
+        with self._lock:
+            for project in projects:
+                key = (project.client.auth.username, project.id_)
+                status = self._statuses.pop(key, project.status)
+                self._statuses[key] = project.status
+                if status != project.status and self.predicate(project):
+                    queued.append(project)
+            while len(self._statuses) > self.max_projects:
+                self._statuses.popitem(last=False)
+        for project in queued:
+            self.logger.debug("Prefetching files of project %s", project.id_)
+            self._executor.submit(self._prefetch, project)
+        with self._lock:
+            self._counters['queued'] += len(queued)
+        return len(queued)
+
+    def stats(self):
+        """Return the counters of the prefetcher.
+
+        :return: dict with the projects queued and prefetched, the files and
+        bytes prefetched, the downloads skipped by the budget, the errors and
+        the bytes of the budget in use.
+        :rtype: dict
+        """
+        with self._lock:
+            self._expire()
+            stats = dict.fromkeys(
+                ('queued', 'projects', 'files', 'bytes', 'skipped', 'errors'),
+                0,
+            )
+            stats.update(self._counters)
+            stats['budget_used'] = self._spent_bytes
+            return stats
+
+    def close(self, wait=True):
+        """Stop the prefetch threads.
+
+        :param wait: a boolean to select to wait for the queued prefetches
+        """
+        self._executor.shutdown(wait=wait)
+
+    def _prefetch(self, project):
+        """Download the file listing and the contents of a project.
+
+        An error downloading a content does not stop the prefetch of the
+        other ones.
+        """
+        client = project.client
+        with client.priority(self.priority):
+            try:
+                files = client.fetch_json(
+                    '/projectfiles?projectId={}'.format(project.id_)
+                )
+            except Exception:
+                self._failed(
+                    "Could not prefetch the files of project %s", project.id_
+                )
+                return
+            if self.download_translations:
+                ttl = client.response_cache.ttl
+                for obj in files:
+                    if obj['Status'] != 'Translated':
+                        continue
+                    try:
+                        self._prefetch_content(client, project, obj, ttl)
+                    except Exception:
+                        self._failed(
+                            "Could not prefetch file %s of project %s",
+                            obj['FileId'], project.id_
+                        )
+        with self._lock:
+            self._counters['projects'] += 1
+
+    def _prefetch_content(self, client, project, obj, ttl):
+        """Download a translated content if it fits in the budget.
+
+        The response body is cached as it is, without decoding it.
+        """
+        # the cached body holds the base64 content
+        size = 4 * (((obj['FileSize'] or 0) + 2) // 3) + JSON_OVERHEAD
+        path = content_path(project.id_, obj['FileId'], TRANSLATED)
+        key = client.cache_key(path)
+        if client.response_cache.get(key) is not None:
+            return
+        with self._lock:
+            self._expire()
+            if self._spent_bytes + size > self.byte_budget:
+                self._counters['skipped'] += 1
+                self.logger.debug(
+                    "Skipping prefetch of file %s, over the budget",
+                    obj['FileId']
+                )
+                return
+            spent = (self._clock() + ttl, size)
+            heapq.heappush(self._spent, spent)
+            self._spent_bytes += size
+        try:
+            content = client.response_cache.get_or_load(
+                key, lambda: client.fetch_response(path).content
+            )
+        except Exception:
+            with self._lock:
+                if spent in self._spent:
+                    self._spent.remove(spent)
+                    heapq.heapify(self._spent)
+                    self._spent_bytes -= size
+            raise
+        with self._lock:
+            self._counters['files'] += 1
+            self._counters['bytes'] += len(content)
+
+    def _failed(self, msg, *args):
+        """Log and count a prefetch error."""
+        self.logger.warning(msg, *args, exc_info=True)
+        with self._lock:
+            self._counters['errors'] += 1
+
+    def _expire(self):
+        """Release the budget of the contents expired from the cache."""
+        now = self._clock()
+        while self._spent and self._spent[0][0] <= now:
+            _, size = heapq.heappop(self._spent)
+            self._spent_bytes -= size
@@ -0,0 +1,39 @@
+"""Per process client for the model objects sent to other processes.
+
+Project and File objects are pickled without their client. When they are
+unpickled in a process where a client has been installed with
+:func:`set_client` or :func:`initializer`, they are bound to that client.
+"""
+_client = None
+
+
+def set_client(client):
+    """Install the client of the current process.
+
+    :param client: the client bound to the unpickled objects
+    :type client: TextUnitedClient
+    """
+    global _client
+    _client = client
+
+
+def get_client():
+    """Return the client of the current process, None if not installed.
+
+    :rtype: TextUnitedClient
+    """
+    return _client
+
+
+def initializer(company_id, api_key, **kwargs):
+    """Create the client of a worker process.
+
+    It is meant to be used as `initializer` of a ProcessPoolExecutor:
+    `ProcessPoolExecutor(initializer=initializer, initargs=(id_, key))`.
+
+    :param company_id: Company id given by Text United
+    :param api_key: Api Key generated in Text United web
+    :param kwargs: other arguments of TextUnitedClient
+    """
+    from .client import TextUnitedClient
+    set_client(TextUnitedClient(company_id, api_key, **kwargs))
@@ -0,0 +1,281 @@
+"""Profiling of the time spent by the client operations.
+
+A :class:`Profiler` set in the client splits the wall time of each public
+operation in phases:
+
+- `io`: sending the requests and waiting for the responses, including the
+  time waiting for the scheduler.
+- `json`: decoding the JSON responses.
+- `base64`: decoding and encoding the file contents.
+- `construct`: creating the Project, File and Account objects, including
+  parsing the dates.
+- `other`: the rest of the time of the operation.
+
+Phases and operations nest, each one only counts its own time, e.g. the
+download of a translated file inside :func:`Project.get_files` is counted in
+the download operation.
+"""
+import collections
+import logging
+import os
+import sys
+import threading
+import time
+
+IO = 'io'
+JSON = 'json'
+BASE64 = 'base64'
+CONSTRUCT = 'construct'
+OTHER = 'other'
+
+PHASES = (IO, JSON, BASE64, CONSTRUCT)
+
+# operation of the phases run outside of any operation
+NO_OPERATION = '(no operation)'
+
+
+class _NoopPhase:
+    """Context doing nothing when the client is not profiled."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+
+_NOOP_PHASE = _NoopPhase()
+
+
+def phase(client, name):
+    """Return a context measuring a phase if the client is profiled.
+
+    :param client: the client running the phase
+    :param name: the name of the phase
+    :type client: TextUnitedClient
+    """
+    profiler = client.profiler
+    if profiler is None:
+        return _NOOP_PHASE
+    return profiler.phase(name)
+
+
+class _Frame:
+    """An operation or a phase running in a thread."""
+
+    __slots__ = (
+        'kind', 'name', 'operation', 'start', 'child_time',
+        'operations_time',
+    )
+
+    def __init__(self, kind, name, operation):
+        self.kind = kind
+        self.name = name
+        self.operation = operation
+        self.start = time.perf_counter()
+        # time of the direct children
+        self.child_time = 0.0
+        # time of the nested operations, for the operation frames
+        self.operations_time = 0.0
+
+
+class _Measure:
+    """Context pushing a frame while it runs."""
+
+    __slots__ = ('profiler', 'kind', 'name')
+
+    def __init__(self, profiler, kind, name):
+        self.profiler = profiler
+        self.kind = kind
+        self.name = name
+
+    def __enter__(self):
+        self.profiler._push(self.kind, self.name)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.profiler._pop()
+
+
+class _OperationStats:
+    """Times of an operation."""
+
+    def __init__(self):
+        self.calls = 0
+        self.wall = 0.0
+        self.self_time = 0.0
+        self.phases = dict.fromkeys(PHASES, 0.0)
+        self.samples = collections.Counter()
+
+
+class Profiler:
+    """Class representing a profiler of the client operations.
+
+    With `sample_interval`, a thread samples the stacks of the threads
+    running an operation, so the report shows the functions where the local
+    work of each operation is spent.
+    """
+
+    logger = logging.getLogger(__name__)
+
+    def __init__(self, sample_interval=None):
+        """Constructor.
+
+        :param sample_interval: optional seconds between stack samples. By
+        default stacks are not sampled.
+        :type sample_interval: float
+        """
+        self.sample_interval = sample_interval
+        self._stats = collections.defaultdict(_OperationStats)
+        self._stacks = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._sampler = None
+        self._stop = threading.Event()
+        if sample_interval:
+            self.start_sampling()
+
+    def operation(self, name):
+        """Return a context measuring an operation.
+
+        :param name: the name of the operation
+        """
+        return _Measure(self, 'operation', name)
+
+    def phase(self, name):
+        """Return a context measuring a phase of the current operation.
+
+        :param name: one of the phases, see :data:`PHASES`
+        """
+        return _Measure(self, 'phase', name)
+
+    def stats(self):
+        """Return the times of each operation in seconds.
+
+        :return: dict by operation with the calls, the wall time, the time
+        of each phase and the most sampled functions.
+        :rtype: dict
+        """
+        with self._lock:
+            result = {}
+            for name, stats in self._stats.items():
+                phases = dict(stats.phases)
+                phases[OTHER] = max(
+                    0.0, stats.self_time - sum(stats.phases.values())
+                )
+                result[name] = {
+                    'calls': stats.calls,
+                    'wall': stats.wall,
+                    'phases': phases,
+                    'samples': stats.samples.most_common(10),
+                }
+            return result
+
+    def report(self):
+        """Return a summary table of the operations.
+
+        :rtype: str
+        """
+        stats = self.stats()
+        columns = PHASES + (OTHER,)
+        lines = [
+            '{:<32} {:>6} {:>9} '.format('operation', 'calls', 'wall') +
+            ' '.join('{:>9}'.format(c) for c in columns)
+        ]
+        for name, stat in sorted(stats.items(), key=lambda i: -i[1]['wall']):
+            lines.append(
+                '{:<32} {:>6} {:>9.3f} '.format(
+                    name, stat['calls'], stat['wall']
+                ) +
+                ' '.join(
+                    '{:>9.3f}'.format(stat['phases'][c]) for c in columns
+                )
+            )
+            for function, count in stat['samples']:
+                lines.append('    {:>6} {}'.format(count, function))
+        return '\n'.join(lines)
+
+    def reset(self):
+        """Forget the measured times."""
+        with self._lock:
+            self._stats.clear()
+
+    def start_sampling(self):
+        """Start the thread sampling the stacks."""
+        if self._sampler is not None:
+            return
+        self._stop.clear()
+        self._sampler = threading.Thread(
+            target=self._sample, name='textunited-profiler', daemon=True
+        )
+        self._sampler.start()
+
+    def stop_sampling(self):
+        """Stop the thread sampling the stacks."""
+        sampler, self._sampler = self._sampler, None
+        if sampler is not None:
+            self._stop.set()
+            sampler.join()
+
+    def _push(self, kind, name):
+        """Start a frame in the current thread."""
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+            with self._lock:
+                self._stacks[threading.get_ident()] = stack
+        if kind == 'operation':
+            operation = name
+        elif stack:
+            operation = stack[-1].operation
+        else:
+            operation = NO_OPERATION
+        stack.append(_Frame(kind, name, operation))
+
+    def _pop(self):
+        """End the frame of the current thread and count its time."""
+        stack = self._local.stack
+        frame = stack.pop()
+        elapsed = time.perf_counter() - frame.start
+        if stack:
+            stack[-1].child_time += elapsed
+        own_time = elapsed - frame.child_time
+        if frame.kind == 'operation':
+            for parent in reversed(stack):
+                if parent.kind == 'operation':
+                    parent.operations_time += elapsed
+                    break
+        with self._lock:
+            stats = self._stats[frame.operation]
+            if frame.kind == 'operation':
+                stats.calls += 1
+                stats.wall += elapsed
+                # phases are part of the time of the operation
+                stats.self_time += elapsed - frame.operations_time
+            else:
+                stats.phases[frame.name] += own_time
+                if frame.operation == NO_OPERATION:
+                    stats.self_time += own_time
+
+    def _sample(self):
+        """Sample the stacks of the threads running an operation."""
+        while not self._stop.wait(self.sample_interval):
+            frames = sys._current_frames()
+            with self._lock:
+                for ident, stack in self._stacks.items():
+                    if ident not in frames:
+                        continue
+                    try:
+                        operation = stack[-1].operation
+                    except IndexError:
+                        # the thread is not running an operation
+                        continue
+                    code = frames[ident].f_code
+                    function = '{} ({}:{})'.format(
+                        code.co_name,
+                        os.path.basename(code.co_filename),
+                        frames[ident].f_lineno,
+                    )
+                    self._stats[operation].samples[function] += 1
@@ -1,8 +1,12 @@
 """Project related classes."""
 from datetime import datetime
 
+from . import process
+from .exceptions import ProjectNotFound, ResourceUnavailable
 from .file import File, FileUpload
-from .language import Language
+from .language import Language, LanguageInfo, get_catalog
+from .profiling import CONSTRUCT, JSON, phase
+from .tracing import traced
 
 
 def parse_datetime(value):
@@ -16,12 +20,85 @@ def parse_datetime(value):
     return dt
 
 
+def find_language(language_id, language_code=None):
+    """Return the language with an id.
+
+    :param language_id: the Text United id of the language
+    :param language_code: the BCP 47 code sent with the id by the API, used
+    when the language is not in the catalog.
+    :rtype: Language or LanguageInfo
+    :raises: NotImplementedError: the language is unknown
+    """
+    language = get_catalog().get(language_id)
+    if language is None:
+        if not language_code or language_id is None:
+            raise NotImplementedError(
+                'Language with id {} is not implemented'.format(language_id)
+            )
+        language = LanguageInfo(language_id, language_code, None)
+    return language.language or language
+
+
+def _project_attributes(project, *args, **kwargs):
+    """Return the span attributes of an operation of a project."""
+    return {'textunited.project_id': project.id_}
+
+
+def _request_language(language):
+    """Return the language of a project request, None if not valid."""
+    if isinstance(language, (Language, LanguageInfo)):
+        return language
+    language = get_catalog().get(language)
+    if language is None:
+        return None
+    return language.language or language
+
+
+def _language_label(language):
+    """Return the name of a language of a project request, or its code."""
+    if isinstance(language, Language):
+        return language.name
+    return language.name or language.code
+
+
 class Project:
     """Class representing a Text United Project.
 
     All attributes are stored as python primitives type.
     """
 
+    # attributes serialized by :func:`to_record`
+    FIELDS = (
+        'id_', 'name', 'description', 'creation_date_utc',
+        'source_language_id', 'target_language_id', 'source_language_code',
+        'target_language_code', 'start_date_utc', 'end_date_utc', 'status',
+        'owner_id', 'owner_name', 'manager_id', 'manager_name', 'progress',
+        'translation_progress', 'proofreading_progress', 'reference_number',
+    )
+
+    # attributes updated by :func:`update_from_json` and their JSON keys
+    JSON_KEYS = (
+        ('name', 'Name'),
+        ('description', 'Description'),
+        ('creation_date_utc', 'CreationDateUtc'),
+        ('source_language_id', 'SourceLanguageId'),
+        ('target_language_id', 'TargetLanguageId'),
+        ('source_language_code', 'SourceLanguageCode'),
+        ('target_language_code', 'TargetLanguageCode'),
+        ('start_date_utc', 'StartDateUtc'),
+        ('end_date_utc', 'EndDateUtc'),
+        ('status', 'State'),
+        ('owner_id', 'OwnerId'),
+        ('owner_name', 'OwnerName'),
+        ('manager_id', 'ManagerId'),
+        ('manager_name', 'ManagerName'),
+        ('progress', 'Progress'),
+        ('translation_progress', 'TranslationProgress'),
+        ('proofreading_progress', 'ProofreadingProgress'),
+        ('reference_number', 'ReferenceNumber'),
+    )
+    DATETIME_FIELDS = ('creation_date_utc', 'start_date_utc', 'end_date_utc')
+
     def __init__(self, client, id_, name, description, creation_date_utc,
                  source_language_id, target_language_id, source_language_code,
                  target_language_code, start_date_utc, end_date_utc, status,
@@ -75,40 +152,50 @@ class Project:
         self.translation_progress = translation_progress
         self.proofreading_progress = proofreading_progress
         self.reference_number = reference_number
+        # JSON values of the datetime attributes and validators of the last
+        # response, used to refresh the project
+        self._raw_dates = {}
+        self._etag = None
+        self._last_modified = None
+        # ETag of the project listing the project was last refreshed from
+        self._list_etag = None
 
     @property
     def source_language(self):
-        """Return a Language object with the source language."""
-        try:
-            source_language = Language(self.source_language_id)
-        except ValueError:
-            raise NotImplementedError(
-                'Language with id {} is not implemented'.format(
-                    self.source_language_id
-                )
-            )
-        return source_language
+        """Return the source language.
+
+        :return: the Language member of the language, or the entry of the
+        language catalog if it is not in the enum.
+        :rtype: Language or LanguageInfo
+        """
+        return find_language(
+            self.source_language_id, self.source_language_code
+        )
 
     @property
     def target_language(self):
-        """Return a Language object with the target language."""
-        try:
-            target_language = Language(self.target_language_id)
-        except ValueError:
-            raise NotImplementedError(
-                'Language with id {} is not implemented'.format(
-                    self.target_language_id
-                )
-            )
-        return target_language
+        """Return the target language.
+
+        :return: the Language member of the language, or the entry of the
+        language catalog if it is not in the enum.
+        :rtype: Language or LanguageInfo
+        """
+        return find_language(
+            self.target_language_id, self.target_language_code
+        )
 
-    def get_files(self):
+    @traced('textunited.get_files', _project_attributes)
+    def get_files(self, download_translations=True, download_sources=False):
         """Get a list with all the files that are in the project to translate.
 
         A project in Text United is composed by a list of files to translate.
         This list contains all files without filtering by status or any #
         attribute.
 
+        :param download_translations: a boolean to select to download the
+        translated file content of the translated files.
+        :param download_sources: a boolean to select to download the source
+        file content.
         :return: a list with an object of each file in the project
         :rtype: a List of File
         """
@@ -117,13 +204,16 @@ class Project:
             '/projectfiles?projectId={}'.format(self.id_)
         )
 
-        file_list = [
-            File.from_json(
-                client=self.client,
-                project_id=self.id_,
-                json_obj=file)
-            for file in files
-        ]
+        with phase(self.client, CONSTRUCT):
+            file_list = [
+                File.from_json(
+                    client=self.client,
+                    project_id=self.id_,
+                    json_obj=file,
+                    download_translations=download_translations,
+                    download_sources=download_sources)
+                for file in files
+            ]
         self.client.logger.info(
             "%s files for project %s",
             len(file_list),
@@ -164,8 +254,114 @@ class Project:
             proofreading_progress=json_obj['ProofreadingProgress'],
             reference_number=json_obj['ReferenceNumber'],
         )
+        project._raw_dates = {
+            field: json_obj[key] for field, key in cls.JSON_KEYS
+            if field in cls.DATETIME_FIELDS
+        }
         return project
 
+    def update_from_json(self, json_obj):
+        """Update the project in place with a newer project JSON.
+
+        Datetime values are only parsed when their JSON value changed.
+
+        :param json_obj: the project json object
+        :return: dict with the old and the new value of each changed
+        attribute, e.g. `{'progress': (10, 20)}`
+        :rtype: dict
+        """
+        changes = {}
+        for field, key in self.JSON_KEYS:
+            value = json_obj[key]
+            if field in self.DATETIME_FIELDS:
+                # () is never a JSON value, so missing dates are parsed
+                if self._raw_dates.get(field, ()) == value:
+                    continue
+                self._raw_dates[field] = value
+                value = parse_datetime(value)
+            old = getattr(self, field)
+            if old != value:
+                setattr(self, field, value)
+                changes[field] = (old, value)
+        return changes
+
+    @traced('textunited.refresh_project', _project_attributes)
+    def refresh(self):
+        """Update the project in place with its current values.
+
+        The request is conditional when the server sent an ETag or a
+        Last-Modified header with the previous response, so nothing is
+        downloaded when the project did not change.
+
+        :return: dict with the old and the new value of each changed
+        attribute
+        :rtype: dict
+        :raises: ProjectNotFound: it is raised when the resource is not
+        available or could not been found
+        """
+        headers = {}
+        if self._etag:
+            headers['If-None-Match'] = self._etag
+        if self._last_modified:
+            headers['If-Modified-Since'] = self._last_modified
+
+        self.client.logger.info("Refreshing project %s", self.id_)
+        try:
+            response = self.client.fetch_response(
+                '/projects/{}'.format(self.id_), headers=headers
+            )
+        except ResourceUnavailable:
+            raise ProjectNotFound(
+                'Could not find the project with id {}'.format(self.id_)
+            )
+        if response.status_code == 304:
+            return {}
+
+        self._etag = response.headers.get('ETag')
+        self._last_modified = response.headers.get('Last-Modified')
+        with phase(self.client, JSON):
+            json_obj = response.json()
+        with phase(self.client, CONSTRUCT):
+            changes = self.update_from_json(json_obj)
+        self.client.logger.info(
+            "Project %s refreshed, changed: %s", self.id_, ', '.join(changes)
+        )
+        return changes
+
+    def to_record(self):
+        """Serialize the project to a dict of python primitives.
+
+        The client is not included, so the record can be sent to another
+        process.
+
+        :rtype: dict
+        """
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    @classmethod
+    def from_record(cls, record, client=None):
+        """Deserialize a record created with :func:`to_record`.
+
+        :param record: the record of the project
+        :param client: the client bound to the project, by default the client
+        of the current process, see :mod:`textunited.process`.
+        :rtype: Project
+        """
+        return cls(client=client or process.get_client(), **record)
+
+    def bind(self, client):
+        """Bind the project to a client.
+
+        :param client: the client used to get the files
+        :return: the project itself
+        """
+        self.client = client
+        return self
+
+    def __reduce__(self):
+        """Pickle the project as a record without the client."""
+        return (type(self).from_record, (self.to_record(),))
+
     def __str__(self):
         """Get string representation of the object."""
         value = (
@@ -181,6 +377,47 @@ class Project:
         return value
 
 
+def refresh_projects(projects):
+    """Update projects in place with a single request.
+
+    All the projects are listed once, bypassing the response cache of the
+    client, and each project is updated with :func:`Project.update_from_json`.
+    The request is conditional when all the projects were refreshed from the
+    same listing and the server sent an ETag with it, so nothing is
+    downloaded when the listing did not change.
+
+    :param projects: the projects to refresh, all bound to the same client
+    :type projects: list of Project
+    :return: dict with the changes of each project by project id, None for
+    the projects that are not listed anymore
+    :rtype: dict
+    """
+    if not projects:
+        return {}
+    client = projects[0].client
+    client.logger.info("Refreshing %s projects", len(projects))
+    headers = {}
+    etags = {project._list_etag for project in projects}
+    if len(etags) == 1 and None not in etags:
+        headers['If-None-Match'] = etags.pop()
+    response = client.fetch_response('/projects', headers=headers)
+    if response.status_code == 304:
+        return {project.id_: {} for project in projects}
+
+    etag = response.headers.get('ETag')
+    with phase(client, JSON):
+        json_objs = {json_obj['Id']: json_obj for json_obj in response.json()}
+    for project in projects:
+        project._list_etag = etag
+    return {
+        project.id_: (
+            project.update_from_json(json_objs[project.id_])
+            if project.id_ in json_objs else None
+        )
+        for project in projects
+    }
+
+
 class ProjectRequest:
     """Class representing a Text United Project Creation request data.
 
@@ -191,7 +428,8 @@ class ProjectRequest:
 
     def __init__(self, name, source_language, target_language,
                  description, files, translator_id, end_date=None,
-                 proofreader_id=None, in_country_reviewer_id=None):
+                 proofreader_id=None, in_country_reviewer_id=None,
+                 reference_number=None):
         """Constructor.
 
         :param name:
@@ -203,8 +441,11 @@ class ProjectRequest:
         :param end_date:
         :param proofreader_id:
         :param in_country_reviewer_id:
-        :type source_language: An instance of Language
-        :type target_language: An instance of Language
+        :param reference_number: optional reference number of the project
+        :type source_language: An instance of Language or LanguageInfo, or
+        the id or code of a language in the catalog
+        :type target_language: An instance of Language or LanguageInfo, or
+        the id or code of a language in the catalog
         """
         if not all(isinstance(f, FileUpload) for f in files):
             raise TypeError(
@@ -212,15 +453,17 @@ class ProjectRequest:
                 "must be FileUpload instance type."
             )
 
-        if not isinstance(source_language, Language):
+        source_language = _request_language(source_language)
+        if source_language is None:
             raise TypeError(
                 "Could not create ProjectRequest. source_language "
                 "should be instance of Language"
             )
 
-        if not isinstance(target_language, Language):
+        target_language = _request_language(target_language)
+        if target_language is None:
             raise TypeError(
-                "Could not create ProjectRequest. source_language "
+                "Could not create ProjectRequest. target_language "
                 "should be instance of Language"
             )
 
@@ -233,19 +476,23 @@ class ProjectRequest:
         self.end_date = end_date
         self.proofreader_id = proofreader_id
         self.in_country_reviewer_id = in_country_reviewer_id
+        self.reference_number = reference_number
 
     def __repr__(self):
         """Return the identifier of a project."""
         value = "'{}' {} to {}".format(
             self.name,
-            self.source_language.name,
-            self.target_language.name
+            _language_label(self.source_language),
+            _language_label(self.target_language)
         )
         return value
 
-    def to_json(self):
+    def to_json(self, upload_index=None):
         """Serialize Project request in Text United API format.
 
+        :param upload_index: optional index reusing the payloads of the
+        identical contents encoded before.
+        :type upload_index: UploadIndex
         :return: a JSON Object matching Text United creation format
         :rtype: a JSON Object
         """
@@ -254,10 +501,14 @@ class ProjectRequest:
             'SourceLanguageId': self.source_language.value,
             'TargetLanguageId': self.target_language.value,
             'Description': self.description,
-            'Files': [f.to_json() for f in self.files],
+            'Files': [
+                f.to_json(upload_index=upload_index) for f in self.files
+            ],
             'TranslatorId': self.translator_id,
             'EndDate': self.end_date.isoformat() if self.end_date else None,
             'ProofreaderId': self.proofreader_id,
             'InCountryReviewerId': self.in_country_reviewer_id
         }
+        if self.reference_number is not None:
+            json_obj['ReferenceNumber'] = self.reference_number
         return json_obj
@@ -0,0 +1,140 @@
+"""Priority aware scheduling of the requests sent by the client."""
+import collections
+import contextlib
+import threading
+
+PRIORITY_INTERACTIVE = 'interactive'
+PRIORITY_NORMAL = 'normal'
+PRIORITY_BULK = 'bulk'
+
+PRIORITIES = (PRIORITY_INTERACTIVE, PRIORITY_NORMAL, PRIORITY_BULK)
+
+
+def default_priority(uri_path):
+    """Return the priority of a request without an explicit priority.
+
+    Downloads of file content are bulk work, any other request is considered
+    interactive.
+
+    :param uri_path: path to the resource
+    :rtype: str
+    """
+    if 'projectfiles' in uri_path and 'type=' in uri_path:
+        return PRIORITY_BULK
+    return PRIORITY_INTERACTIVE
+
+
+class RequestScheduler:
+    """Class representing a scheduler of requests with priority classes.
+
+    The scheduler limits the number of requests in flight. Each priority
+    class can only use its share of that limit, so bulk work always leaves
+    room for interactive requests, and when a slot is released the waiting
+    request with the highest priority goes first.
+    """
+
+    def __init__(self, max_in_flight=8, shares=None, priorities=PRIORITIES):
+        """Constructor.
+
+        :param max_in_flight: maximum number of requests in flight.
+        :param shares: dict with the fraction of `max_in_flight` each
+        priority class can use. By default interactive requests can use all
+        the slots, normal requests 75% and bulk requests 50%.
+        :param priorities: priority classes from the highest to the lowest.
+        :type max_in_flight: int
+        :type shares: dict
+        """
+        if max_in_flight < 1:
+            raise ValueError('max_in_flight should be at least 1')
+        if shares is None:
+            shares = {
+                PRIORITY_INTERACTIVE: 1.0,
+                PRIORITY_NORMAL: 0.75,
+                PRIORITY_BULK: 0.5,
+            }
+
+        self.max_in_flight = max_in_flight
+        self.priorities = tuple(priorities)
+        self.limits = {
+            priority: max(1, int(max_in_flight * shares.get(priority, 1.0)))
+            for priority in self.priorities
+        }
+        self.in_flight = 0
+        self._in_flight = dict.fromkeys(self.priorities, 0)
+        self._waiting = {p: collections.deque() for p in self.priorities}
+        self._condition = threading.Condition()
+
+    @contextlib.contextmanager
+    def slot(self, priority=PRIORITY_NORMAL):
+        """Wait for a free slot and hold it while the context is running.
+
+        :param priority: the priority class of the request
+        """
+        self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release(priority)
+
+    def acquire(self, priority=PRIORITY_NORMAL):
+        """Wait until the request can be sent and take a slot.
+
+        :param priority: the priority class of the request
+        """
+        if priority not in self._waiting:
+            raise ValueError('Unknown priority {}'.format(priority))
+
+        ticket = object()
+        with self._condition:
+            queue = self._waiting[priority]
+            queue.append(ticket)
+            while not (queue[0] is ticket and self._is_next(priority)):
+                self._condition.wait()
+            queue.popleft()
+            self.in_flight += 1
+            self._in_flight[priority] += 1
+            # the next request in the queue may be able to run too
+            self._condition.notify_all()
+
+    def release(self, priority=PRIORITY_NORMAL):
+        """Release a slot taken with :func:`acquire`.
+
+        :param priority: the priority class of the request
+        """
+        with self._condition:
+            self.in_flight -= 1
+            self._in_flight[priority] -= 1
+            self._condition.notify_all()
+
+    def stats(self):
+        """Return the requests in flight and waiting by priority class.
+
+        :rtype: dict
+        """
+        with self._condition:
+            return {
+                priority: {
+                    'in_flight': self._in_flight[priority],
+                    'waiting': len(self._waiting[priority]),
+                    'limit': self.limits[priority],
+                }
+                for priority in self.priorities
+            }
+
+    def _can_run(self, priority):
+        """Check if there is a free slot for the priority class."""
+        return (
+            self.in_flight < self.max_in_flight and
+            self._in_flight[priority] < self.limits[priority]
+        )
+
+    def _is_next(self, priority):
+        """Check if no request with higher priority is ready to run."""
+        if not self._can_run(priority):
+            return False
+        for higher in self.priorities:
+            if higher == priority:
+                return True
+            if self._waiting[higher] and self._can_run(higher):
+                return False
+        return True
@@ -0,0 +1,179 @@
+"""Split of the project requests too large for a single upload.
+
+The files of a :class:`ProjectRequest` are sent base64 encoded in a single
+JSON body. :func:`split_request` packs the files in groups whose bodies stay
+under a maximum size, and optionally a maximum number of words, so each
+group is created as a project of its own.
+"""
+import copy
+import json
+
+# bytes of the JSON object of a file besides its name and content, the
+# quotes of the name are counted with the name
+FILE_OVERHEAD = len(json.dumps({'Filename': '', 'Content': ''})) - 2
+# bytes between the files in the list
+SEPARATOR = len(', ')
+
+
+def encoded_size(content):
+    """Return the length of the base64 encoding of a content.
+
+    :type content: bytes
+    :rtype: int
+    """
+    return (len(content) + 2) // 3 * 4
+
+
+def file_size(upload):
+    """Return the bytes a file upload adds to the body of a request.
+
+    :type upload: FileUpload
+    :rtype: int
+    """
+    return (
+        FILE_OVERHEAD + len(json.dumps(upload.name)) +
+        encoded_size(upload.content)
+    )
+
+
+def file_words(upload):
+    """Return the words of a file upload.
+
+    The words given to the upload are used, otherwise they are estimated by
+    splitting the content on whitespace.
+
+    :type upload: FileUpload
+    :rtype: int
+    """
+    if upload.words is not None:
+        return upload.words
+    return len(upload.content.split())
+
+
+def request_size(project_obj):
+    """Return the bytes of the JSON body of a project request.
+
+    :type project_obj: ProjectRequest
+    :rtype: int
+    """
+    files = project_obj.files
+    return (
+        _base_size(project_obj, 1) + sum(file_size(f) for f in files) +
+        SEPARATOR * max(len(files) - 1, 0)
+    )
+
+
+def _base_size(project_obj, parts):
+    """Return the bytes of the body of a part without its files."""
+    part = copy.copy(project_obj)
+    part.files = []
+    part.name, part.reference_number = part_names(project_obj, parts, parts)
+    return len(json.dumps(part.to_json()))
+
+
+def part_names(project_obj, index, parts):
+    """Return the name and the reference number of a part of a request.
+
+    The parts of a request split in several projects are named
+    `'<name> (part <index>/<parts>)'` and their reference numbers are
+    `'<reference_number>-<index>'`.
+
+    :param project_obj: the request split
+    :param index: the number of the part, starting at 1
+    :param parts: the number of parts
+    :type project_obj: ProjectRequest
+    :return: the name and the reference number
+    :rtype: tuple
+    """
+    if parts == 1:
+        return project_obj.name, project_obj.reference_number
+    name = '{} (part {}/{})'.format(project_obj.name, index, parts)
+    reference_number = project_obj.reference_number
+    if reference_number:
+        reference_number = '{}-{}'.format(reference_number, index)
+    return name, reference_number
+
+
+def _pack(files, max_size, max_words):
+    """Pack the files in bins with first fit decreasing.
+
+    :param files: list of (upload, size, words)
+    :return: the bins as lists of indexes in `files`
+    """
+    order = sorted(
+        range(len(files)), key=lambda i: (-files[i][1], -files[i][2], i)
+    )
+    bins = []
+    for i in order:
+        _, size, words = files[i]
+        for bin_ in bins:
+            if (bin_['size'] + size <= max_size and
+                    bin_['words'] + words <= max_words):
+                break
+        else:
+            bin_ = {'size': 0, 'words': 0, 'files': []}
+            bins.append(bin_)
+        bin_['size'] += size
+        bin_['words'] += words
+        bin_['files'].append(i)
+    return [sorted(bin_['files']) for bin_ in bins]
+
+
+def split_request(project_obj, max_request_size=None, max_words=None):
+    """Split a project request in requests under the limits.
+
+    Files are packed in as few parts as possible, keeping their order inside
+    each part. A file with more words than `max_words` is sent in a part
+    alone.
+
+    :param project_obj: the request to split
+    :param max_request_size: maximum bytes of the JSON body of each part
+    :param max_words: maximum words of the files of each part
+    :type project_obj: ProjectRequest
+    :return: the requests of the parts, a list with the same request if it
+    does not need to be split.
+    :rtype: list of ProjectRequest
+    :raises: ValueError: a single file does not fit in a request body
+    """
+    if max_request_size is None and max_words is None:
+        return [project_obj]
+
+    # each file is counted with the separator before it, the first one of
+    # each part has none
+    files = [
+        (
+            f,
+            file_size(f) + SEPARATOR,
+            file_words(f) if max_words is not None else 0,
+        )
+        for f in project_obj.files
+    ]
+    max_words = float('inf') if max_words is None else max_words
+    max_size = float('inf')
+    if max_request_size is not None:
+        # the base grows with the suffixes of the names, up to the one of
+        # the largest number of parts
+        max_size = max_request_size + SEPARATOR - _base_size(
+            project_obj, max(len(files), 1)
+        )
+        too_large = [f.name for f, size, _ in files if size > max_size]
+        if max_size <= 0 or too_large:
+            raise ValueError(
+                'Files do not fit in a request of {} bytes: {}'.format(
+                    max_request_size, ', '.join(too_large)
+                )
+            )
+    if (sum(size for _, size, _ in files) <= max_size and
+            sum(words for _, _, words in files) <= max_words):
+        return [project_obj]
+
+    bins = _pack(files, max_size, max_words)
+    parts = []
+    for index, bin_ in enumerate(bins, 1):
+        part = copy.copy(project_obj)
+        part.files = [files[i][0] for i in bin_]
+        part.name, part.reference_number = part_names(
+            project_obj, index, len(bins)
+        )
+        parts.append(part)
+    return parts
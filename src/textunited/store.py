@@ -0,0 +1,249 @@
+"""Memory bounded store for the contents of the files.
+
+By default the contents downloaded by :class:`textunited.file.File` are kept
+in the File objects. When a store is installed with :func:`set_store`, the
+contents of all the files are kept in the store, which keeps at most
+`max_bytes` in memory.
+"""
+import collections
+import logging
+import os
+import tempfile
+import threading
+
+_store = None
+
+
+def set_store(store):
+    """Install the store used by all the File objects.
+
+    Contents set before the store is installed are not moved.
+
+    :param store: the content store, None to keep contents in the files
+    :type store: ContentStore
+    """
+    global _store
+    _store = store
+
+
+def get_store():
+    """Return the installed store, None if not installed.
+
+    :rtype: ContentStore
+    """
+    return _store
+
+
+class _Entry:
+    """Content kept in the store."""
+
+    __slots__ = ('value', 'size', 'path', 'loader', 'loading')
+
+    def __init__(self, value, loader):
+        self.value = value
+        self.size = len(value)
+        self.path = None
+        self.loader = loader
+        # event set when the loader running for the entry ends
+        self.loading = None
+
+
+class ContentStore:
+    """Class representing a store of contents with a memory limit.
+
+    When the resident contents exceed `max_bytes` the least recently used
+    ones are evicted. Evicted contents are written to temporary files in
+    `spill_dir` and read again on access. Without `spill_dir` they are
+    dropped and the loader given with the content, if any, is called on
+    access.
+    """
+
+    logger = logging.getLogger(__name__)
+
+    def __init__(self, max_bytes, spill_dir=None):
+        """Constructor.
+
+        :param max_bytes: maximum bytes of the contents kept in memory.
+        :param spill_dir: directory of the temporary files of the evicted
+        contents. By default evicted contents are dropped.
+        :type max_bytes: int
+        :type spill_dir: str
+        """
+        if max_bytes < 0:
+            raise ValueError('max_bytes should not be negative')
+
+        self.max_bytes = max_bytes
+        self.spill_dir = spill_dir
+        self.resident_bytes = 0
+        self.evictions = 0
+        self.loads = 0
+        self._entries = {}
+        self._resident = collections.OrderedDict()
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        """Return the number of contents in the store."""
+        return len(self._entries)
+
+    def put(self, key, value, loader=None):
+        """Store a content.
+
+        :param key: the key of the content
+        :param value: the content, None removes the key
+        :param loader: optional callable returning the content again after
+        it has been dropped.
+        :type value: bytes
+        """
+        with self._lock:
+            self.discard(key)
+            if value is None:
+                return
+            entry = _Entry(value, loader)
+            self._entries[key] = entry
+            self._make_resident(key, entry)
+
+    def get(self, key):
+        """Return a content, loading it again when it was evicted.
+
+        The loader runs and the spilled contents are read without holding
+        the lock of the store, other threads reading the same content wait
+        for the loader.
+
+        :param key: the key of the content
+        :return: the content or None if it is not in the store
+        :rtype: bytes
+        """
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is None:
+                    return None
+                if entry.value is not None:
+                    self._resident.move_to_end(key)
+                    return entry.value
+                if entry.path is not None:
+                    # opened with the lock, the file can be read after the
+                    # entry is discarded
+                    spilled = open(entry.path, 'rb')
+                    break
+                if entry.loader is None:
+                    return None
+                loading = entry.loading
+                if loading is None:
+                    loading = entry.loading = threading.Event()
+                    spilled = None
+                    break
+            # another thread is loading the content
+            loading.wait()
+
+        if spilled is not None:
+            with spilled:
+                value = spilled.read()
+            with self._lock:
+                return self._reload(key, entry, value)
+
+        try:
+            value = entry.loader()
+        except BaseException:
+            with self._lock:
+                entry.loading = None
+            loading.set()
+            raise
+        # the value is stored before the waiting threads are woken up
+        with self._lock:
+            value = self._reload(key, entry, value)
+            entry.loading = None
+        loading.set()
+        return value
+
+    def peek(self, key):
+        """Return a content without loading it when it was dropped.
+
+        :param key: the key of the content
+        :return: the content or None if it is not in memory or spilled
+        :rtype: bytes
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.value is not None:
+                return entry.value
+            if entry.path is None:
+                return None
+            spilled = open(entry.path, 'rb')
+        with spilled:
+            return spilled.read()
+
+    def _reload(self, key, entry, value):
+        """Keep in memory a content read again, with the lock held."""
+        if self._entries.get(key) is not entry:
+            # the content was replaced or discarded meanwhile
+            return value
+        if entry.value is not None:
+            # read again by another thread meanwhile
+            self._resident.move_to_end(key)
+            return entry.value
+        if value is None:
+            return None
+        self.loads += 1
+        entry.value = value
+        entry.size = len(value)
+        self._make_resident(key, entry)
+        return value
+
+    def discard(self, key):
+        """Remove a content from the store.
+
+        :param key: the key of the content
+        """
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return
+            if self._resident.pop(key, None) is not None:
+                self.resident_bytes -= entry.size
+            if entry.path is not None:
+                os.remove(entry.path)
+
+    def clear(self):
+        """Remove all the contents and their temporary files."""
+        with self._lock:
+            for key in list(self._entries):
+                self.discard(key)
+
+    def stats(self):
+        """Return the resident bytes and the counters of the store.
+
+        :rtype: dict
+        """
+        with self._lock:
+            return {
+                'contents': len(self._entries),
+                'resident_contents': len(self._resident),
+                'resident_bytes': self.resident_bytes,
+                'max_bytes': self.max_bytes,
+                'evictions': self.evictions,
+                'loads': self.loads,
+            }
+
+    def _make_resident(self, key, entry):
+        """Keep the entry in memory evicting others if needed."""
+        self._resident[key] = entry
+        self.resident_bytes += entry.size
+        while self.resident_bytes > self.max_bytes and self._resident:
+            self._evict(*self._resident.popitem(last=False))
+
+    def _evict(self, key, entry):
+        """Spill or drop the value of an entry."""
+        self.resident_bytes -= entry.size
+        self.evictions += 1
+        if self.spill_dir is not None and entry.path is None:
+            fd, entry.path = tempfile.mkstemp(
+                prefix='textunited-', dir=self.spill_dir
+            )
+            with os.fdopen(fd, 'wb') as f:
+                f.write(entry.value)
+        elif self.spill_dir is None and entry.loader is None:
+            self.logger.warning("Dropping content %s without loader", key)
+        entry.value = None
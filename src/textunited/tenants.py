@@ -0,0 +1,289 @@
+"""Pool of clients of many companies sharing connections and limits."""
+import contextlib
+import http.cookiejar
+import logging
+import threading
+import time
+
+import requests
+
+from .client import TextUnitedClient
+from .scheduler import PRIORITY_NORMAL, RequestScheduler
+from .transport import RequestsTransport
+
+
+class TokenBucket:
+    """Class representing a token bucket limiting a request rate."""
+
+    def __init__(self, rate, burst=None, clock=time.monotonic,
+                 sleep=time.sleep):
+        """Constructor.
+
+        :param rate: requests per second
+        :param burst: maximum requests sent at once, by default the rate
+        :param clock: function returning the current time in seconds
+        :param sleep: function waiting a number of seconds
+        :type rate: float
+        :type burst: int
+        """
+        if rate <= 0:
+            raise ValueError('rate should be positive')
+
+        self.rate = rate
+        self.burst = burst or max(1, rate)
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = self.burst
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Wait until a request can be sent and take a token.
+
+        :return: the seconds waited
+        :rtype: float
+        """
+        waited = 0
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._tokens = min(
+                    self.burst,
+                    self._tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = (1 - self._tokens) / self.rate
+            self._sleep(delay)
+            waited += delay
+
+
+class TenantScheduler:
+    """Class representing the admission of the requests of a tenant.
+
+    It is the scheduler of the client of a tenant. A request first takes a
+    slot of the tenant quota, if any, then a slot of the scheduler shared by
+    all the tenants, and only then a token of the tenant and shared rates,
+    so no token is spent while the request waits in the queue.
+    """
+
+    def __init__(self, pool, tenant, max_in_flight=None, rate=None):
+        """Constructor.
+
+        :param pool: the pool of the tenant
+        :param tenant: the key of the tenant
+        :param max_in_flight: maximum requests of the tenant in flight
+        :param rate: maximum requests per second of the tenant
+        :type pool: ClientPool
+        """
+        self.pool = pool
+        self.tenant = tenant
+        self.max_in_flight = max_in_flight
+        self.bucket = TokenBucket(rate) if rate else None
+        self._quota = (
+            threading.BoundedSemaphore(max_in_flight)
+            if max_in_flight else None
+        )
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.wait_seconds = 0.0
+        self.busy_seconds = 0.0
+
+    @contextlib.contextmanager
+    def slot(self, priority=PRIORITY_NORMAL):
+        """Wait for the tenant and shared limits and hold a slot.
+
+        :param priority: the priority class of the request
+        """
+        start = time.monotonic()
+        with contextlib.ExitStack() as stack:
+            if self._quota is not None:
+                self._quota.acquire()
+                stack.callback(self._quota.release)
+            stack.enter_context(self.pool.scheduler.slot(priority))
+            if self.bucket is not None:
+                self.bucket.acquire()
+            if self.pool.bucket is not None:
+                self.pool.bucket.acquire()
+
+            admitted = time.monotonic()
+            with self._lock:
+                self.in_flight += 1
+                self.wait_seconds += admitted - start
+            failed = True
+            try:
+                yield
+                failed = False
+            finally:
+                with self._lock:
+                    self.in_flight -= 1
+                    self.requests += 1
+                    if failed:
+                        self.errors += 1
+                    self.busy_seconds += time.monotonic() - admitted
+
+    def stats(self):
+        """Return the counters of the tenant.
+
+        :rtype: dict
+        """
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'errors': self.errors,
+                'in_flight': self.in_flight,
+                'max_in_flight': self.max_in_flight,
+                'wait_seconds': self.wait_seconds,
+                'busy_seconds': self.busy_seconds,
+            }
+
+
+class ClientPool:
+    """Class representing the clients of many Text United companies.
+
+    All the clients share one transport, so one connection pool, and one
+    scheduler limiting the requests in flight of all the tenants. Each
+    tenant can only use `tenant_max_in_flight` of those slots, so a busy
+    tenant cannot starve the others.
+
+    Clients are created when the tenants are added, looking them up is a
+    dict access::
+
+        pool = ClientPool(max_in_flight=32, rate=50)
+        pool.add_tenant('acme', company_id='123', api_key='abc')
+        pool['acme'].list_projects()
+    """
+
+    logger = logging.getLogger(__name__)
+
+    def __init__(self, max_in_flight=16, tenant_max_in_flight=None,
+                 rate=None, burst=None, transport=None, scheduler=None,
+                 **client_kwargs):
+        """Constructor.
+
+        :param max_in_flight: maximum requests in flight of all the tenants
+        :param tenant_max_in_flight: default maximum requests in flight of a
+        tenant, by default half of `max_in_flight`.
+        :param rate: optional maximum requests per second of all the tenants
+        :param burst: maximum requests sent at once under the rate limit
+        :param transport: the transport shared by the clients, by default a
+        requests session with a connection per request in flight. The
+        session does not keep cookies, so they are not sent to the other
+        tenants.
+        :param scheduler: the scheduler shared by the clients, by default a
+        RequestScheduler with `max_in_flight` slots.
+        :param client_kwargs: other arguments of every TextUnitedClient, like
+        `hedging` or `breaker`. Each tenant gets its own clone of the
+        breaker, so the failures of a tenant do not open the circuit of the
+        others. Negative caches should not be shared, they are keyed by
+        project id.
+        :type transport: Transport
+        :type scheduler: RequestScheduler
+        """
+        if transport is None:
+            session = requests.Session()
+            # the session is shared by the tenants, cookies set for one
+            # company must not be sent with the requests of the others
+            session.cookies.set_policy(
+                http.cookiejar.DefaultCookiePolicy(allowed_domains=[])
+            )
+            adapter = requests.adapters.HTTPAdapter(
+                pool_maxsize=max_in_flight
+            )
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            transport = RequestsTransport(session)
+
+        self.transport = transport
+        self.scheduler = scheduler or RequestScheduler(max_in_flight)
+        self.tenant_max_in_flight = (
+            tenant_max_in_flight or max(1, max_in_flight // 2)
+        )
+        self.bucket = TokenBucket(rate, burst) if rate else None
+        self.client_kwargs = client_kwargs
+        self._clients = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, tenant):
+        """Return the client of a tenant.
+
+        :raises: KeyError: the tenant was not added
+        """
+        return self._clients[tenant]
+
+    def __contains__(self, tenant):
+        """Check if a tenant was added."""
+        return tenant in self._clients
+
+    def __len__(self):
+        """Return the number of tenants."""
+        return len(self._clients)
+
+    def add_tenant(self, tenant, company_id, api_key, max_in_flight=None,
+                   rate=None, **client_kwargs):
+        """Add a tenant and create its client.
+
+        :param tenant: the key of the tenant
+        :param company_id: Company id given by Text United
+        :param api_key: Api Key generated in Text United web
+        :param max_in_flight: maximum requests of the tenant in flight, by
+        default `tenant_max_in_flight` of the pool.
+        :param rate: optional maximum requests per second of the tenant
+        :param client_kwargs: arguments of the client of this tenant
+        :return: the client of the tenant
+        :rtype: TextUnitedClient
+        """
+        kwargs = dict(self.client_kwargs, **client_kwargs)
+        breaker = self.client_kwargs.get('breaker')
+        if breaker is not None and 'breaker' not in client_kwargs:
+            # the breaker of the pool is a template, a tenant failing must
+            # not open the circuit of the others
+            kwargs['breaker'] = breaker.clone()
+        client = TextUnitedClient(
+            company_id,
+            api_key,
+            transport=self.transport,
+            scheduler=TenantScheduler(
+                self, tenant, max_in_flight or self.tenant_max_in_flight, rate
+            ),
+            **kwargs
+        )
+        with self._lock:
+            self._clients[tenant] = client
+        self.logger.info("Added tenant %s", tenant)
+        return client
+
+    def remove_tenant(self, tenant):
+        """Remove a tenant.
+
+        :param tenant: the key of the tenant
+        """
+        with self._lock:
+            self._clients.pop(tenant, None)
+
+    def get(self, tenant, default=None):
+        """Return the client of a tenant, default if it was not added."""
+        return self._clients.get(tenant, default)
+
+    def stats(self):
+        """Return the counters of each tenant and the shared scheduler.
+
+        :rtype: dict
+        """
+        with self._lock:
+            clients = dict(self._clients)
+        return {
+            'tenants': {
+                tenant: client.scheduler.stats()
+                for tenant, client in clients.items()
+            },
+            'scheduler': self.scheduler.stats(),
+        }
+
+    def close(self):
+        """Close the connections of the shared transport."""
+        self.transport.close()
@@ -0,0 +1,292 @@
+"""Tracing of the client operations.
+
+Each public operation of the client, like :func:`list_projects` or
+:func:`Project.get_files`, opens a span and each request sent by
+:func:`fetch_json` is a child span with the endpoint, the bytes received,
+the status and the retries. By default the client uses :data:`NOOP_TRACER`,
+whose spans do nothing.
+
+The spans follow the interface of the OpenTelemetry spans, so
+:class:`OpenTelemetryTracer` sends them to OpenTelemetry and
+:class:`Tracer` with a :class:`FileExporter` writes them to a local file.
+"""
+import functools
+import json
+import logging
+import os
+import threading
+import time
+
+
+class NoopSpan:
+    """Class representing a span that records nothing."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        """Return the span."""
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Do nothing."""
+
+    def set_attribute(self, key, value):
+        """Do nothing."""
+
+    def record_exception(self, exception):
+        """Do nothing."""
+
+    def is_recording(self):
+        """Return False, the span does not record attributes."""
+        return False
+
+
+NOOP_SPAN = NoopSpan()
+
+
+class NoopTracer:
+    """Class representing a disabled tracer."""
+
+    def span(self, name, attributes=None):
+        """Return the no-op span."""
+        return NOOP_SPAN
+
+
+NOOP_TRACER = NoopTracer()
+
+
+def traced(name, attributes=None):
+    """Open a span around a method of the client, a project or a file.
+
+    The method is also measured as an operation when the client has a
+    profiler, see :mod:`textunited.profiling`.
+
+    :param name: the name of the span
+    :param attributes: optional function returning the attributes of the
+    span from the arguments of the method.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            client = self if hasattr(self, 'tracer') else self.client
+            tracer = client.tracer
+            if client.profiler is not None:
+                operation = client.profiler.operation(name)
+            else:
+                operation = NOOP_SPAN
+            if tracer is NOOP_TRACER:
+                with operation:
+                    return method(self, *args, **kwargs)
+            span_attributes = None
+            if attributes is not None:
+                span_attributes = attributes(self, *args, **kwargs)
+            with operation, tracer.span(name, span_attributes):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class Span:
+    """Class representing a span recorded by :class:`Tracer`."""
+
+    def __init__(self, tracer, name, parent, attributes):
+        """Constructor.
+
+        :param tracer: the tracer exporting the span
+        :param name: the name of the operation
+        :param parent: the parent span, None for a root span
+        :param attributes: dict with the initial attributes
+        :type tracer: Tracer
+        :type parent: Span
+        """
+        self.tracer = tracer
+        self.name = name
+        self.parent_id = parent.span_id if parent else None
+        self.trace_id = parent.trace_id if parent else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.attributes = dict(attributes or ())
+        self.status = 'OK'
+        self.error = None
+        self.start_time = None
+        self.end_time = None
+
+    @property
+    def duration(self):
+        """Return the seconds between the start and the end of the span."""
+        if self.end_time is None:
+            return None
+        return self.end_time - self.start_time
+
+    def __enter__(self):
+        """Start the span and make it the current one."""
+        self.start_time = time.time()
+        self.tracer._push(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """End and export the span."""
+        if exc_value is not None:
+            self.record_exception(exc_value)
+        self.end_time = time.time()
+        self.tracer._pop(self)
+        self.tracer.exporter.export(self)
+
+    def set_attribute(self, key, value):
+        """Set an attribute of the span."""
+        self.attributes[key] = value
+
+    def record_exception(self, exception):
+        """Mark the span as failed by the exception."""
+        self.status = 'ERROR'
+        self.error = '{}: {}'.format(type(exception).__name__, exception)
+
+    def is_recording(self):
+        """Return True, the span records attributes."""
+        return True
+
+    def to_dict(self):
+        """Serialize the span to a dict of python primitives.
+
+        :rtype: dict
+        """
+        return {
+            'name': self.name,
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'start_time': self.start_time,
+            'end_time': self.end_time,
+            'duration': self.duration,
+            'status': self.status,
+            'error': self.error,
+            'attributes': self.attributes,
+        }
+
+
+class Tracer:
+    """Class representing a tracer exporting its spans.
+
+    The spans opened while another span is open in the same thread are its
+    children.
+    """
+
+    def __init__(self, exporter):
+        """Constructor.
+
+        :param exporter: object with an `export(span)` method called when
+        each span ends.
+        :type exporter: FileExporter
+        """
+        self.exporter = exporter
+        self._local = threading.local()
+
+    def span(self, name, attributes=None):
+        """Return a new span, started when the context is entered.
+
+        :param name: the name of the operation
+        :param attributes: optional dict with the attributes of the span
+        :rtype: Span
+        """
+        return Span(self, name, self.current_span(), attributes)
+
+    def current_span(self):
+        """Return the innermost open span of the thread, None if there is not.
+
+        :rtype: Span
+        """
+        stack = getattr(self._local, 'stack', None)
+        return stack[-1] if stack else None
+
+    def _push(self, span):
+        """Make the span the current one of the thread."""
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        self._local.stack.append(span)
+
+    def _pop(self, span):
+        """Remove the span from the spans of the thread."""
+        self._local.stack.remove(span)
+
+
+class FileExporter:
+    """Class representing an exporter writing spans to a JSON lines file.
+
+    Each line of the file is a span serialized with :func:`Span.to_dict`.
+    """
+
+    logger = logging.getLogger(__name__)
+
+    def __init__(self, path):
+        """Constructor.
+
+        :param path: path to the file, new spans are appended to it
+        :type path: str
+        """
+        self.path = path
+        self._file = open(path, 'a', buffering=1)
+        self._lock = threading.Lock()
+
+    def export(self, span):
+        """Write a span to the file.
+
+        :type span: Span
+        """
+        line = json.dumps(span.to_dict(), default=str)
+        with self._lock:
+            self._file.write(line + '\n')
+
+    def close(self):
+        """Close the file."""
+        with self._lock:
+            self._file.close()
+
+
+def read_spans(path):
+    """Read the spans written by a :class:`FileExporter`.
+
+    :param path: path to the file
+    :return: the spans as dicts
+    :rtype: list of dict
+    """
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class OpenTelemetryTracer:
+    """Class representing a tracer sending the spans to OpenTelemetry.
+
+    It needs the `tracing` extra: `pip install python-textunited[tracing]`.
+    The exporters are configured with the OpenTelemetry SDK.
+    """
+
+    def __init__(self, tracer=None):
+        """Constructor.
+
+        :param tracer: optional OpenTelemetry tracer, by default the tracer
+        `textunited` of the global tracer provider.
+        :type tracer: opentelemetry.trace.Tracer
+        """
+        if tracer is None:
+            try:
+                from opentelemetry import trace
+            except ImportError:
+                raise ImportError(
+                    'OpenTelemetryTracer needs opentelemetry-api, install it '
+                    'with `pip install python-textunited[tracing]`'
+                )
+            tracer = trace.get_tracer('textunited')
+        self.tracer = tracer
+
+    def span(self, name, attributes=None):
+        """Return a context starting an OpenTelemetry span.
+
+        :param name: the name of the operation
+        :param attributes: optional dict with the attributes of the span
+        """
+        if attributes:
+            # OpenTelemetry does not accept None values
+            attributes = {
+                key: value for key, value in attributes.items()
+                if value is not None
+            }
+        return self.tracer.start_as_current_span(name, attributes=attributes)
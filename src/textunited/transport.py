@@ -0,0 +1,194 @@
+"""HTTP transports used by the client to send the requests.
+
+A transport sends a request and returns an object with the interface of
+:class:`requests.Response` used by the client: `status_code`, `text`,
+`headers` and `json()`.
+"""
+import json
+import threading
+
+import requests
+import urllib3
+
+
+def _basic_auth_header(auth):
+    """Return the Authorization header of a requests HTTPBasicAuth."""
+    if auth is None:
+        return {}
+    return urllib3.make_headers(
+        basic_auth='{}:{}'.format(auth.username, auth.password)
+    )
+
+
+class Transport:
+    """Base class of the HTTP transports."""
+
+    def request(self, method, url, headers, auth, json=None):
+        """Send a request.
+
+        :param method: http request type
+        :param url: the full URL
+        :param headers: dict with the request headers
+        :param auth: the credentials
+        :param json: the JSON body of the request
+        :type auth: requests.auth.HTTPBasicAuth
+        :return: the response
+        """
+        raise NotImplementedError
+
+    def pool_connections(self):
+        """Reuse the connections in the next requests.
+
+        The transports keep a connection pool by default, it does nothing.
+        """
+        pass
+
+    def close(self):
+        """Close the connections of the transport."""
+        pass
+
+
+class RequestsTransport(Transport):
+    """Transport using requests.
+
+    Without a session, each request is sent with :func:`requests.request`
+    until :func:`pool_connections` creates one.
+    """
+
+    def __init__(self, session=None, timeout=None):
+        """Constructor.
+
+        :param session: optional session whose connections are reused
+        :param timeout: timeout in seconds of each request
+        :type session: requests.Session
+        """
+        self.session = session
+        self.timeout = timeout
+        self._lock = threading.Lock()
+
+    def request(self, method, url, headers, auth, json=None):
+        """Send a request with requests."""
+        if self.session is None:
+            send = requests.request
+        else:
+            send = self.session.request
+        return send(method, url, headers=headers, auth=auth, json=json,
+                    timeout=self.timeout)
+
+    def pool_connections(self):
+        """Send the next requests with a session reusing the connections."""
+        with self._lock:
+            if self.session is None:
+                self.session = requests.Session()
+
+    def close(self):
+        """Close the session."""
+        if self.session is not None:
+            self.session.close()
+
+
+class Urllib3Response:
+    """Class representing a response of the urllib3 transport."""
+
+    def __init__(self, response):
+        """Constructor.
+
+        :param response: the urllib3 response
+        :type response: urllib3.HTTPResponse
+        """
+        self.status_code = response.status
+        self.headers = response.headers
+        self.content = response.data
+
+    @property
+    def text(self):
+        """Return the body as text."""
+        return self.content.decode('utf-8', 'replace')
+
+    def json(self):
+        """Return the decoded JSON body."""
+        return json.loads(self.content)
+
+
+class Urllib3Transport(Transport):
+    """Transport using a urllib3 pool manager.
+
+    It skips the session, hooks and adapters of requests, so each call has
+    less overhead.
+    """
+
+    def __init__(self, pool_manager=None, maxsize=10, timeout=None):
+        """Constructor.
+
+        :param pool_manager: optional pool manager whose connections are
+        reused.
+        :param maxsize: connections kept by host when no pool manager is
+        given.
+        :param timeout: timeout in seconds of each request
+        :type pool_manager: urllib3.PoolManager
+        """
+        self.pool_manager = pool_manager or urllib3.PoolManager(
+            maxsize=maxsize
+        )
+        self.timeout = timeout
+
+    def request(self, method, url, headers, auth, json=None):
+        """Send a request with urllib3."""
+        headers = dict(headers, **_basic_auth_header(auth))
+        body = None
+        if json is not None:
+            body = _dumps(json)
+        response = self.pool_manager.request(
+            method, url, body=body, headers=headers, timeout=self.timeout,
+            retries=False,
+        )
+        return Urllib3Response(response)
+
+    def close(self):
+        """Close the connections of the pool manager."""
+        self.pool_manager.clear()
+
+
+class HTTP2Transport(Transport):
+    """Transport using httpx with HTTP/2.
+
+    Concurrent requests to the same host are multiplexed over a single
+    connection when the server supports HTTP/2. It needs the `http2` extra:
+    `pip install python-textunited[http2]`.
+    """
+
+    def __init__(self, client=None, timeout=None):
+        """Constructor.
+
+        :param client: optional httpx client whose connections are reused
+        :param timeout: timeout in seconds of each request
+        :type client: httpx.Client
+        """
+        if client is None:
+            try:
+                import httpx
+            except ImportError:
+                raise ImportError(
+                    'HTTP2Transport needs httpx, install it with '
+                    '`pip install python-textunited[http2]`'
+                )
+            client = httpx.Client(http2=True, timeout=timeout)
+        self.client = client
+
+    def request(self, method, url, headers, auth, json=None):
+        """Send a request with httpx."""
+        headers = dict(headers, **_basic_auth_header(auth))
+        content = None
+        if json is not None:
+            content = _dumps(json)
+        return self.client.request(method, url, headers=headers,
+                                   content=content)
+
+    def close(self):
+        """Close the httpx client."""
+        self.client.close()
+
+
+def _dumps(obj):
+    """Encode the JSON body of a request."""
+    return json.dumps(obj).encode('utf-8')
@@ -0,0 +1,284 @@
+"""Watcher publishing the changes of projects and files."""
+import asyncio
+import logging
+import threading
+
+PROJECT_FIELDS = ('status', 'progress', 'translation_progress')
+
+
+class Event:
+    """Base class of the events published by the Watcher."""
+
+    def __repr__(self):
+        """Get string representation of the object."""
+        return '<{} {}>'.format(type(self).__name__, self)
+
+
+class ProjectAdded(Event):
+    """Event representing a new project."""
+
+    def __init__(self, project):
+        """Constructor.
+
+        :param project: the new project
+        :type project: Project
+        """
+        self.project = project
+
+    def __str__(self):
+        """Get string representation of the object."""
+        return str(self.project)
+
+
+class ProjectRemoved(Event):
+    """Event representing a project that is not listed anymore."""
+
+    def __init__(self, project_id):
+        """Constructor.
+
+        :param project_id: the id of the removed project
+        """
+        self.project_id = project_id
+
+    def __str__(self):
+        """Get string representation of the object."""
+        return 'id#{}'.format(self.project_id)
+
+
+class ProjectChanged(Event):
+    """Event representing a change in the status or progress of a project."""
+
+    def __init__(self, project, changes):
+        """Constructor.
+
+        :param project: the project with the new values
+        :param changes: dict with the old and the new value of each changed
+        field, e.g. `{'progress': (10, 20)}`
+        :type project: Project
+        :type changes: dict
+        """
+        self.project = project
+        self.changes = changes
+
+    def __str__(self):
+        """Get string representation of the object."""
+        return '{} {}'.format(self.project, self.changes)
+
+
+class FileChanged(Event):
+    """Event representing a change in the status of a file."""
+
+    def __init__(self, file, old_status):
+        """Constructor.
+
+        :param file: the file with the new status
+        :param old_status: the previous status of the file, None if the file
+        is new
+        :type file: File
+        """
+        self.file = file
+        self.old_status = old_status
+
+    def __str__(self):
+        """Get string representation of the object."""
+        return '{} (was {})'.format(self.file, self.old_status)
+
+
+class FileTranslated(FileChanged):
+    """Event representing a file that became Translated."""
+
+    pass
+
+
+class Watcher:
+    """Class representing a single polling loop shared by many consumers.
+
+    The watcher polls :func:`TextUnitedClient.list_projects` and, for the new
+    projects and the projects that changed, :func:`Project.get_files`. The
+    changes are published as events to the subscribed callbacks and to the
+    async iterators returned by :func:`events`.
+
+    Only the status and progress of each project and the status of each
+    file are kept between polls. The poll interval drops to `min_interval`
+    after a change and grows up to `max_interval` while nothing changes.
+    """
+
+    logger = logging.getLogger(__name__)
+
+    def __init__(self, client, min_interval=10, max_interval=600, backoff=2,
+                 watch_files=True):
+        """Constructor.
+
+        :param client: the client used to poll Text United
+        :param min_interval: seconds between polls after a change
+        :param max_interval: maximum seconds between polls
+        :param backoff: factor applied to the interval after each poll
+        without changes
+        :param watch_files: a boolean to select to watch the files too
+        :type client: TextUnitedClient
+        """
+        if not 0 < min_interval <= max_interval:
+            raise ValueError('min_interval should be between 0 and '
+                             'max_interval')
+
+        self.client = client
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.watch_files = watch_files
+        self.interval = min_interval
+        self._projects = None
+        self._files = {}
+        self._callbacks = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def subscribe(self, callback):
+        """Call `callback` with each published event.
+
+        Callbacks are called from the polling thread.
+
+        :param callback: a callable receiving an Event
+        :return: a callable to unsubscribe
+        """
+        with self._lock:
+            self._callbacks.append(callback)
+
+        def unsubscribe():
+            with self._lock:
+                if callback in self._callbacks:
+                    self._callbacks.remove(callback)
+
+        return unsubscribe
+
+    async def events(self):
+        """Iterate asynchronously over the published events.
+
+        It must be called from the event loop receiving the events.
+        """
+        loop = asyncio.get_event_loop()
+        queue = asyncio.Queue()
+        unsubscribe = self.subscribe(
+            lambda event: loop.call_soon_threadsafe(queue.put_nowait, event)
+        )
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            unsubscribe()
+
+    def poll(self):
+        """Poll Text United once and publish the changes.
+
+        The first poll only records the current state. Files are only
+        published as changed for projects that were already known. The state
+        is only saved when the whole poll succeeds, so a failed poll is
+        retried from the previous state.
+
+        :return: the published events
+        :rtype: list of Event
+        """
+        projects = self.client.list_projects()
+        baseline = self._projects is None
+        # the state is updated in copies, saved once the poll succeeds
+        known = dict(self._projects or {})
+        files = dict(self._files)
+        current = {}
+        events = []
+        for project in projects:
+            state = tuple(getattr(project, f) for f in PROJECT_FIELDS)
+            current[project.id_] = state
+            old_state = known.pop(project.id_, None)
+            if old_state == state:
+                continue
+            if old_state is None:
+                if not baseline:
+                    events.append(ProjectAdded(project))
+            else:
+                events.append(ProjectChanged(project, {
+                    field: (old, new)
+                    for field, old, new in zip(PROJECT_FIELDS, old_state, state)
+                    if old != new
+                }))
+            if self.watch_files:
+                # the files of a new project are its initial state
+                events.extend(self._poll_files(
+                    project, baseline or old_state is None, files
+                ))
+
+        for project_id in known:
+            files.pop(project_id, None)
+            events.append(ProjectRemoved(project_id))
+        self._projects = current
+        self._files = files
+
+        self._publish(events)
+        return events
+
+    def start(self):
+        """Start polling in a background thread."""
+        if self._thread is not None:
+            raise RuntimeError('Watcher already started')
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name='textunited-watcher', daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """Stop the background thread.
+
+        :param timeout: seconds to wait for the thread to finish
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _poll_files(self, project, baseline, files):
+        """Return the events of the files of a project.
+
+        The new status of the files is saved in `files`.
+        """
+        known = files.get(project.id_, {})
+        current = {}
+        events = []
+        for file in project.get_files(download_translations=False):
+            current[file.id_] = file.status
+            old_status = known.get(file.id_)
+            if baseline or old_status == file.status:
+                continue
+            if file.status == 'Translated':
+                events.append(FileTranslated(file, old_status))
+            else:
+                events.append(FileChanged(file, old_status))
+        files[project.id_] = current
+        return events
+
+    def _publish(self, events):
+        """Call the subscribed callbacks with each event."""
+        with self._lock:
+            callbacks = list(self._callbacks)
+        for event in events:
+            for callback in callbacks:
+                try:
+                    callback(event)
+                except Exception:
+                    self.logger.exception("Error publishing %r", event)
+
+    def _run(self):
+        """Poll until the watcher is stopped."""
+        while not self._stop.is_set():
+            try:
+                changed = bool(self.poll())
+            except Exception:
+                self.logger.exception("Error polling Text United")
+                changed = False
+            if changed:
+                self.interval = self.min_interval
+            else:
+                self.interval = min(
+                    self.interval * self.backoff, self.max_interval
+                )
+            self._stop.wait(self.interval)
@@ -2,6 +2,7 @@
 import pytest
 
 from textunited.client import TextUnitedClient
+from textunited.file import File
 
 
 @pytest.fixture
@@ -12,6 +13,30 @@ def mock_request(mocker):
     return request
 
 
+class FakeClock:
+    """Clock moved by hand or by the fake sleep."""
+
+    def __init__(self):
+        """Constructor."""
+        self.now = 0
+        self.sleeps = []
+
+    def __call__(self):
+        """Return the current time."""
+        return self.now
+
+    def sleep(self, seconds):
+        """Move the clock."""
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    """Return a fake clock, to pass as the clock of the tested objects."""
+    return FakeClock()
+
+
 @pytest.fixture
 def client_without_mock(mocker):
     """Return a TextUnitedClient instance without any patch."""
@@ -38,6 +63,16 @@ def b64message():
     return b'hello_world', 'aGVsbG9fd29ybGQ='
 
 
+@pytest.fixture
+def file_factory(client_mock, b64message):
+    """Return a file factory."""
+    fetch_json, client = client_mock
+    decoded, encoded = b64message
+    fetch_json.return_value = {'Content': encoded}
+    file = File(client, 123, 321, 'Test.txt', None, 12, 12, 'Translated')
+    return file, fetch_json, client, decoded
+
+
 @pytest.fixture
 def data_list_projects():
     """Return a JSON list valid project."""
@@ -0,0 +1,143 @@
+"""Test deferred batch."""
+import threading
+
+import pytest
+import requests
+
+from textunited.batch import Batch
+from textunited.exceptions import ProjectNotFound, ResourceUnavailable
+from textunited.file import File
+from textunited.project import Project
+from textunited.scheduler import PRIORITY_BULK
+
+
+def test_client_batch(client_mock):
+    """Test the client returns a batch bound to it."""
+    _, client = client_mock
+    batch = client.batch(max_workers=2)
+    assert isinstance(batch, Batch)
+    assert batch.client is client
+    assert batch.max_workers == 2
+
+
+def test_batch_get_project(client_mock, data_list_projects):
+    """Test projects are retrieved on exit and duplicates merged."""
+    fetch_json, client = client_mock
+    fetch_json.side_effect = lambda uri: {
+        '/projects/8766': data_list_projects[0],
+        '/projects/8767': data_list_projects[1],
+    }[uri]
+    with client.batch() as batch:
+        first = batch.get_project(8766)
+        second = batch.get_project(8767)
+        assert batch.get_project(8766) is first
+        assert not first.done()
+        fetch_json.assert_not_called()
+    assert len(batch) == 2
+    assert batch.merged == 1
+    assert isinstance(first.result(), Project)
+    assert first.result().id_ == 8766
+    assert second.result().id_ == 8767
+    assert fetch_json.call_count == 2
+
+
+def test_batch_error(client_mock, mocker):
+    """Test errors are set in the futures."""
+    fetch_json, client = client_mock
+    fetch_json.side_effect = ResourceUnavailable('error', mocker.Mock())
+    with client.batch() as batch:
+        future = batch.get_project(1)
+    with pytest.raises(ProjectNotFound):
+        future.result()
+
+
+def test_batch_get_files(client_mock, data_list_projects, data_list_files):
+    """Test files are retrieved with the given options."""
+    fetch_json, client = client_mock
+    project = Project.from_json(client, data_list_projects[0])
+    fetch_json.return_value = data_list_files
+    with client.batch() as batch:
+        future = batch.get_files(project, download_translations=False)
+        assert batch.get_files(project, False) is future
+        assert batch.get_files(project) is not future
+    assert [f.id_ for f in future.result()] == [156148, 156155]
+
+
+def test_batch_get_content(file_factory):
+    """Test a content is downloaded once and saved in equal files."""
+    file, fetch_json, client, decoded = file_factory
+    copy = File(client, 123, 321, 'Test.txt', None, 12, 12, 'Translated')
+    with client.batch() as batch:
+        translated = batch.get_translated_content(file)
+        assert batch.get_translated_content(copy) is translated
+        source = batch.get_source_content(file)
+    assert translated.result() == decoded
+    assert source.result() == decoded
+    assert file.translated_content == decoded
+    assert copy.translated_content == decoded
+    assert file.source_content == decoded
+    assert fetch_json.call_count == 2
+
+
+def test_batch_get_content_public_methods(file_factory, caplog):
+    """Test the downloads are logged as the ones of the files."""
+    file, _, client, _ = file_factory
+    caplog.set_level('INFO')
+    with client.batch() as batch:
+        batch.get_translated_content(file)
+        batch.get_source_content(file)
+    assert 'Retrieved translated content of file' in caplog.text
+    assert 'Retrieved source content of file' in caplog.text
+
+
+def test_batch_shares_connections(client_mock):
+    """Test the calls of a batch share a requests session."""
+    _, client = client_mock
+    assert client.transport.session is None
+    client.batch()
+    session = client.transport.session
+    assert isinstance(session, requests.Session)
+    client.batch()
+    assert client.transport.session is session
+
+
+def test_batch_runs_concurrently(client_mock, mocker):
+    """Test the calls of the batch run at the same time."""
+    fetch_json, client = client_mock
+    barrier = threading.Barrier(3, timeout=5)
+
+    def fetch(uri):
+        barrier.wait()
+        raise ResourceUnavailable('error', mocker.Mock())
+
+    fetch_json.side_effect = fetch
+    with client.batch(max_workers=3) as batch:
+        futures = [batch.get_project(i) for i in range(3)]
+    for future in futures:
+        assert isinstance(future.exception(), ProjectNotFound)
+
+
+def test_batch_priority(client_mock):
+    """Test the calls run with the priority of the caller."""
+    fetch_json, client = client_mock
+    priorities = []
+    fetch_json.side_effect = lambda uri: priorities.append(
+        client._local.priority
+    )
+    with client.priority(PRIORITY_BULK):
+        with client.batch() as batch:
+            batch.get_project(1)
+    assert priorities == [PRIORITY_BULK]
+
+
+def test_batch_cancel(client_mock):
+    """Test the batch is cancelled when the context raises."""
+    fetch_json, client = client_mock
+    with pytest.raises(KeyError):
+        with client.batch() as batch:
+            future = batch.get_project(1)
+            raise KeyError()
+    assert future.cancelled()
+    fetch_json.assert_not_called()
+    with pytest.raises(RuntimeError):
+        batch.get_project(2)
@@ -0,0 +1,111 @@
+"""Test circuit breaker."""
+import pytest
+import requests
+
+from textunited.breaker import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    endpoint_group,
+    is_failure,
+)
+from textunited.client import TextUnitedClient
+from textunited.exceptions import CircuitOpen, ResourceUnavailable
+
+
+@pytest.mark.parametrize('uri,expected', [
+    ('/projects', 'projects'),
+    ('projects/123', 'projects'),
+    ('/projectfiles?projectId=1&fileId=2', 'projectfiles'),
+])
+def test_endpoint_group(uri, expected):
+    """Test the group is the first segment of the path."""
+    assert endpoint_group(uri) == expected
+
+
+@pytest.mark.parametrize('status_code,expected', [(404, False), (503, True)])
+def test_is_failure(mocker, status_code, expected):
+    """Test only unavailability errors are failures."""
+    response = mocker.Mock(status_code=status_code)
+    assert is_failure(ResourceUnavailable('error', response)) is expected
+    assert is_failure(requests.ConnectionError())
+    assert not is_failure(None)
+    assert not is_failure(ValueError())
+
+
+def _fail(breaker, group='projects', times=1):
+    """Record failed calls."""
+    for _ in range(times):
+        with pytest.raises(requests.Timeout):
+            with breaker.guard(group):
+                raise requests.Timeout()
+
+
+def test_breaker_opens_after_consecutive_failures(mocker):
+    """Test the circuit opens and fails fast."""
+    on_state_change = mocker.Mock()
+    breaker = CircuitBreaker(
+        failure_threshold=3, on_state_change=on_state_change
+    )
+    _fail(breaker, times=2)
+    with breaker.guard('projects'):
+        pass
+    _fail(breaker, times=2)
+    assert breaker.state('projects') == CLOSED
+    _fail(breaker)
+    assert breaker.state('projects') == OPEN
+    assert breaker.state('employees') == CLOSED
+    with pytest.raises(CircuitOpen) as e:
+        breaker.before('projects')
+    assert 'projects' in str(e.value)
+    on_state_change.assert_called_once_with('projects', CLOSED, OPEN)
+    assert breaker.snapshot()['projects']['rejected'] == 1
+
+
+def test_breaker_opens_on_error_rate():
+    """Test the circuit opens when the failure rate is reached."""
+    breaker = CircuitBreaker(
+        failure_threshold=100, error_rate=0.5, window=4, min_calls=4
+    )
+    for _ in range(2):
+        breaker.before('projects')
+        breaker.record('projects', None)
+        _fail(breaker)
+    assert breaker.state('projects') == OPEN
+
+
+def test_breaker_half_open_probes(clock):
+    """Test half open probes close or open the circuit again."""
+    breaker = CircuitBreaker(
+        failure_threshold=1, recovery_timeout=10, half_open_probes=1,
+        clock=clock,
+    )
+    _fail(breaker)
+    clock.now = 10
+    breaker.before('projects')
+    assert breaker.state('projects') == HALF_OPEN
+    with pytest.raises(CircuitOpen):
+        breaker.before('projects')
+    breaker.record('projects', requests.ConnectionError())
+    assert breaker.state('projects') == OPEN
+
+    clock.now = 20
+    with breaker.guard('projects'):
+        pass
+    assert breaker.state('projects') == CLOSED
+    assert breaker.snapshot()['projects']['failure_rate'] == 0.0
+
+
+def test_client_fetch_json_breaker(mock_request):
+    """Test the client fails fast when the circuit is open."""
+    breaker = CircuitBreaker(failure_threshold=1)
+    client = TextUnitedClient(company_id=123, api_key='abc', breaker=breaker)
+    mock_request.return_value.status_code = 500
+    with pytest.raises(ResourceUnavailable):
+        client.fetch_json('/projects')
+    with pytest.raises(CircuitOpen):
+        client.fetch_json('/projects/1')
+    mock_request.assert_called_once()
+    mock_request.return_value.status_code = 200
+    client.fetch_json('/employees')
@@ -0,0 +1,90 @@
+"""Test the buffer pool."""
+import base64
+import binascii
+
+import pytest
+
+from textunited import buffers, codec
+from textunited.buffers import BufferPool, decoded_size
+from textunited.codec import Codec
+from textunited.file import SOURCE
+
+
+@pytest.fixture
+def pool():
+    """Return a pool with small buffers and chunks."""
+    return BufferPool(max_bytes=64, min_size=8, max_buffer_size=32,
+                      chunk_size=12)
+
+
+@pytest.mark.parametrize('size', [0, 1, 2, 3, 11, 12, 13, 40, 100])
+def test_decode_encode(pool, size):
+    """Test the chunked codec matches the standard library."""
+    content = bytes(range(256)) * (size // 256) + bytes(range(size % 256))
+    payload = str(base64.b64encode(content), 'ascii')
+    assert decoded_size(payload) == size
+    assert pool.encode(content) == payload
+    with pool.decode(payload) as buffer:
+        assert len(buffer) == size
+        assert buffer.view == content
+        assert bytes(buffer) == content
+    with pool.decode(payload.encode('ascii')) as buffer:
+        assert buffer.view == content
+
+
+def test_decode_not_valid(pool):
+    """Test payloads not valid are rejected and the buffer is released."""
+    with pytest.raises(binascii.Error):
+        pool.decode('aGVs\nbG9fd29ybGQ=')
+    with pytest.raises(binascii.Error):
+        pool.decode('aGVsbG9fd2*ybGQ=')
+    assert pool.stats() == {'allocations': 1, 'reuses': 1, 'idle_bytes': 16}
+
+
+def test_buffers_reused(pool):
+    """Test released buffers are reused by contents of a similar size."""
+    buffer = pool.acquire(10)
+    assert len(buffer.data) == 16
+    data = buffer.data
+    buffer.release()
+    buffer.release()
+    with pytest.raises(ValueError):
+        buffer.view[0]
+    assert pool.acquire(12).data is data
+    assert pool.acquire(12).data is not data
+    assert pool.stats() == {'allocations': 2, 'reuses': 1, 'idle_bytes': 0}
+
+
+def test_buffers_limits(pool):
+    """Test the idle bytes and the pooled sizes are bounded."""
+    big = pool.acquire(100)
+    assert len(big.data) == 100
+    big.release()
+    assert pool.stats()['idle_bytes'] == 0
+
+    leased = [pool.acquire(32) for _ in range(3)]
+    for buffer in leased:
+        buffer.release()
+    assert pool.stats()['idle_bytes'] == 64
+    pool.clear()
+    assert pool.stats()['idle_bytes'] == 0
+
+
+def test_codec_pool(mocker):
+    """Test the codec encodes small payloads with its pool."""
+    pool = mocker.Mock()
+    pool.encode.return_value = 'payload'
+    assert Codec(pool=pool).b64encode(b'hello_world') == 'payload'
+    assert buffers.default_pool.encode(b'hello_world') == 'aGVsbG9fd29ybGQ='
+    # the pool is opt-in
+    assert codec.default_codec.pool is None
+
+
+def test_file_content_buffer(pool, file_factory):
+    """Test a content is downloaded into a pooled buffer."""
+    file, fetch_json, _, decoded = file_factory
+    with file.get_content_buffer(SOURCE, pool=pool) as buffer:
+        assert buffer.view == decoded
+    assert 'type=source' in fetch_json.call_args[0][0]
+    assert file.source_content is None
+    assert pool.stats()['idle_bytes'] == 16
@@ -0,0 +1,265 @@
+"""Test caches."""
+import multiprocessing
+import os
+import stat
+import threading
+import time
+
+import pytest
+
+from textunited.cache import (
+    MemoryCache,
+    NegativeCache,
+    SharedFileCache,
+    _default_directory,
+)
+from textunited.client import TextUnitedClient
+from textunited.project import ProjectRequest
+
+
+def test_negative_cache_not_valid_maxsize():
+    """Test not valid maxsize."""
+    with pytest.raises(ValueError):
+        NegativeCache(maxsize=0)
+
+
+def test_negative_cache_ttl(clock):
+    """Test entries expire after the ttl."""
+    cache = NegativeCache(ttl=10, clock=clock)
+    assert not cache.contains('project', 1)
+    cache.add('project', 1)
+    assert cache.contains('project', 1)
+    assert not cache.contains('account', 1)
+    clock.now = 10
+    assert not cache.contains('project', 1)
+    assert len(cache) == 0
+    assert cache.stats() == {'hits': 1, 'misses': 3, 'size': 0}
+
+
+def test_negative_cache_maxsize():
+    """Test the oldest entries are evicted."""
+    cache = NegativeCache(maxsize=2)
+    cache.add('project', 1)
+    cache.add('project', 2)
+    cache.add('project', 1)
+    cache.add('project', 3)
+    assert not cache.contains('project', 2)
+    assert cache.contains('project', 1)
+    assert cache.contains('project', 3)
+
+
+def test_negative_cache_invalidate():
+    """Test invalidation by kind and key."""
+    cache = NegativeCache()
+    for kind, key in [('project', 1), ('project', 2), ('account', 'a')]:
+        cache.add(kind, key)
+    cache.invalidate('project', 1)
+    assert not cache.contains('project', 1)
+    assert cache.contains('project', 2)
+    cache.invalidate('project')
+    assert not cache.contains('project', 2)
+    assert cache.contains('account', 'a')
+    cache.invalidate()
+    assert len(cache) == 0
+
+
+@pytest.mark.parametrize('cache_class', [MemoryCache, SharedFileCache])
+def test_response_cache(tmpdir, cache_class, clock):
+    """Test responses expire after the ttl."""
+    if cache_class is SharedFileCache:
+        cache = SharedFileCache(str(tmpdir), ttl=10, clock=clock)
+    else:
+        cache = MemoryCache(ttl=10, clock=clock)
+    assert cache.get('key') is None
+    cache.set('key', b'value')
+    cache.set('other', b'other', ttl=20)
+    assert cache.get('key') == b'value'
+    clock.now = 10
+    assert cache.get('key') is None
+    assert cache.get('other') == b'other'
+    assert cache.get_or_load('key', lambda: b'new') == b'new'
+    assert cache.get_or_load('key', lambda: b'newer') == b'new'
+    cache.delete('key')
+    assert cache.get('key') is None
+    assert cache.stats()['hits'] == 3
+    cache.clear()
+    assert cache.get('other') is None
+
+
+def test_memory_cache_maxsize():
+    """Test the least recently used responses are evicted."""
+    cache = MemoryCache(maxsize=2)
+    for key in 'abc':
+        cache.set(key, key.encode())
+    assert len(cache) == 2
+    assert cache.get('a') is None
+    with pytest.raises(ValueError):
+        MemoryCache(maxsize=0)
+
+
+@pytest.mark.parametrize('cache_class', [MemoryCache, SharedFileCache])
+def test_response_cache_max_bytes(tmpdir, cache_class, clock):
+    """Test the oldest responses are evicted over max_bytes."""
+    if cache_class is SharedFileCache:
+        # the files have the expiration time before the response
+        cache = SharedFileCache(str(tmpdir), max_bytes=3 * 108, clock=clock)
+    else:
+        cache = MemoryCache(max_bytes=300, clock=clock)
+    for i, key in enumerate('abcd'):
+        clock.now = i
+        cache.set(key, key.encode() * 100)
+        if cache_class is SharedFileCache:
+            os.utime(cache._path(key), (i, i))
+    assert cache.get('a') is None
+    assert cache.get('b') == b'b' * 100
+    assert cache.get('d') == b'd' * 100
+    # a response bigger than the cache is not kept
+    cache.set('b', b'b' * 1000)
+    assert cache.get('b') is None
+
+
+def test_memory_cache_bytes():
+    """Test the bytes of the responses are counted."""
+    cache = MemoryCache()
+    cache.set('a', b'aaa')
+    cache.set('a', b'aa')
+    cache.set('b', b'b')
+    assert cache.stats()['bytes'] == 3
+    cache.delete('a')
+    assert cache.stats()['bytes'] == 1
+    cache.clear()
+    assert cache.stats()['bytes'] == 0
+
+
+def test_shared_file_cache_lock_files(tmpdir):
+    """Test the lock files are removed."""
+    cache = SharedFileCache(str(tmpdir))
+    assert cache.get_or_load('key', lambda: b'value') == b'value'
+    name = os.path.basename(cache._path('key'))
+    assert os.listdir(cache.directory) == [name]
+
+    # left behind by a process killed while loading
+    open(cache._path('other') + '.lock', 'w').close()
+    cache.purge()
+    assert os.listdir(cache.directory) == [name]
+
+
+def test_memory_cache_single_flight():
+    """Test concurrent loads of a key send one request."""
+    cache = MemoryCache()
+    calls = []
+
+    def loader():
+        calls.append(1)
+        time.sleep(0.05)
+        return b'value'
+
+    results = []
+    threads = [
+        threading.Thread(
+            target=lambda: results.append(cache.get_or_load('key', loader))
+        )
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == [b'value'] * 4
+    assert calls == [1]
+
+
+def test_shared_file_cache_purge(tmpdir, clock):
+    """Test expired responses are removed."""
+    cache = SharedFileCache(str(tmpdir.join('cache')), ttl=10, clock=clock)
+    cache.set('old', b'old')
+    cache.set('new', b'new', ttl=100)
+    clock.now = 50
+    assert cache.purge() == 1
+    assert cache.get('new') == b'new'
+    assert len(os.listdir(cache.directory)) == 1
+
+
+def test_shared_file_cache_directory(tmpdir, mocker):
+    """Test the directory is private to the current user."""
+    assert _default_directory().endswith(
+        'textunited-cache-{}'.format(os.getuid())
+    )
+    cache = SharedFileCache(str(tmpdir.join('cache')))
+    assert stat.S_IMODE(os.stat(cache.directory).st_mode) == 0o700
+
+    shared = tmpdir.join('shared')
+    shared.mkdir()
+    shared.chmod(0o777)
+    with pytest.raises(PermissionError):
+        SharedFileCache(str(shared))
+
+    mocker.patch('textunited.cache.os.getuid', return_value=os.getuid() + 1)
+    with pytest.raises(PermissionError):
+        SharedFileCache(cache.directory)
+
+
+def _load_shared(directory, log):
+    """Load a key of the shared cache logging the loads."""
+    def loader():
+        with open(log, 'a') as f:
+            f.write('load\n')
+        time.sleep(0.2)
+        return b'value'
+
+    value = SharedFileCache(directory).get_or_load('key', loader)
+    assert value == b'value'
+
+
+def test_shared_file_cache_single_flight(tmpdir):
+    """Test processes missing at the same time send one request."""
+    log = str(tmpdir.join('log'))
+    directory = str(tmpdir.join('cache'))
+    SharedFileCache(directory)
+    processes = [
+        multiprocessing.Process(target=_load_shared, args=(directory, log))
+        for _ in range(3)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(10)
+        assert process.exitcode == 0
+    with open(log) as f:
+        assert f.read() == 'load\n'
+
+
+def test_client_response_cache(tmpdir, mocker, mock_request):
+    """Test clients sharing a cache send one request."""
+    cache = SharedFileCache(str(tmpdir))
+    first = TextUnitedClient(123, 'abc', response_cache=cache)
+    second = TextUnitedClient(123, 'abc', response_cache=cache)
+    mock_request.return_value.content = b'[{"Id": 1}]'
+    assert first.fetch_json('/employees') == [{'Id': 1}]
+    assert second.fetch_json('employees') == [{'Id': 1}]
+    mock_request.assert_called_once()
+
+    # other companies and POST requests are not cached
+    TextUnitedClient(456, 'abc', response_cache=cache).fetch_json(
+        '/employees'
+    )
+    first.fetch_json('/fastproject', 'POST', data={})
+    assert mock_request.call_count == 3
+
+    first.fetch_json('/projects')
+    first.fetch_json('/projects')
+    first.add_project(mocker.Mock(spec=ProjectRequest))
+    first.fetch_json('/projects')
+    assert mock_request.call_count == 6
+
+
+def test_client_response_cache_credentials(tmpdir, mock_request):
+    """Test clients with other api keys do not read the cached responses."""
+    cache = SharedFileCache(str(tmpdir))
+    client = TextUnitedClient(123, 'abc', response_cache=cache)
+    other = TextUnitedClient(123, 'wrong', response_cache=cache)
+    assert client.cache_key('/projects') != other.cache_key('projects')
+    mock_request.return_value.content = b'[{"Id": 1}]'
+    client.fetch_json('/employees')
+    other.fetch_json('/employees')
+    assert mock_request.call_count == 2
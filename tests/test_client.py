@@ -2,6 +2,7 @@
 import pytest
 from requests.auth import HTTPBasicAuth
 
+from textunited.cache import NegativeCache
 from textunited.client import TextUnitedClient
 from textunited.exceptions import (
     AccountNotFound,
@@ -153,6 +154,7 @@ def test_text_united_client_fetch_json(
         },
         auth=client_without_mock.auth,
         json=data,
+        timeout=None,
     )
 
 
@@ -172,3 +174,71 @@ def test_text_united_client_fetch_json_errors(
         'Error testing at https://www.textunited.com/api/employee '
         '(HTTP status: {})'.format(status_code)
     )
+
+
+@pytest.mark.parametrize('headers,status_code,exception', [
+    ({'If-None-Match': '"v1"'}, 304, None),
+    ({'If-Modified-Since': 'Tue, 01 Jan 2019'}, 304, None),
+    ({}, 304, ResourceUnavailable),
+    ({}, 200, None),
+])
+def test_text_united_client_fetch_response(
+        client_without_mock, mock_request, headers, status_code, exception):
+    """Test fetch_response only accepts 304 for conditional requests."""
+    mock_request.return_value.status_code = status_code
+    if exception:
+        with pytest.raises(exception):
+            client_without_mock.fetch_response('/projects/1', headers=headers)
+    else:
+        result = client_without_mock.fetch_response(
+            '/projects/1', headers=headers
+        )
+        assert result == mock_request.return_value
+    sent_headers = mock_request.call_args[1]['headers']
+    assert headers.items() <= sent_headers.items()
+
+
+@pytest.mark.parametrize('status_code,cached', [(404, True), (500, False)])
+def test_text_united_client_get_project_negative_cache(
+        mocker, client_mock, status_code, cached):
+    """Test missing projects are cached and add_project invalidates them."""
+    fetch_json, client = client_mock
+    client.negative_cache = NegativeCache()
+    http_response = mocker.Mock(status_code=status_code)
+    fetch_json.side_effect = ResourceUnavailable('ERROR', http_response)
+    for _ in range(2):
+        with pytest.raises(ProjectNotFound):
+            client.get_project(123)
+    assert fetch_json.call_count == (1 if cached else 2)
+
+    fetch_json.side_effect = None
+    client.add_project(mocker.Mock(spec=ProjectRequest))
+    assert not client.negative_cache.contains('project', 123)
+
+
+def test_text_united_client_get_account_negative_cache(mocker, client_mock):
+    """Test missing accounts are cached."""
+    _, client = client_mock
+    client.negative_cache = NegativeCache()
+    account1 = mocker.Mock(email='account1@example.com')
+    client.list_accounts = mocker.Mock(return_value=[account1])
+    for _ in range(2):
+        with pytest.raises(AccountNotFound):
+            client.get_account(email='account3@example.com')
+    client.list_accounts.assert_called_once_with()
+    assert client.get_account(email='account1@example.com') == account1
+
+
+def test_text_united_client_add_project_upload_index(mocker, client_mock):
+    """Test add_project reuses payloads and records the uploads."""
+    fetch_json, client = client_mock
+    client.upload_index = mocker.Mock()
+    project_request = mocker.Mock(spec=ProjectRequest)
+    project_request.files = ['file']
+    client.add_project(project_request)
+    project_request.to_json.assert_called_once_with(
+        upload_index=client.upload_index
+    )
+    client.upload_index.record.assert_called_once_with(
+        ['file'], fetch_json.return_value
+    )
@@ -0,0 +1,83 @@
+"""Test base64 codec."""
+import base64
+
+import pytest
+
+from textunited import codec
+from textunited.codec import Codec
+
+
+@pytest.fixture
+def parallel_codec():
+    """Return a codec using the process pool for small payloads."""
+    c = Codec(threshold=10, chunk_size=12, max_workers=2)
+    yield c
+    c.shutdown()
+
+
+def test_codec_chunk_size():
+    """Test the chunk size is a multiple of 12."""
+    assert Codec(chunk_size=100).chunk_size == 96
+    assert Codec(chunk_size=1).chunk_size == 12
+
+
+def test_codec_small_payloads(mocker):
+    """Test small payloads are not sent to the process pool."""
+    c = Codec(threshold=100)
+    c._map = mocker.Mock()
+    assert c.b64encode(b'hello_world') == 'aGVsbG9fd29ybGQ='
+    assert c.b64decode('aGVsbG9fd29ybGQ=') == b'hello_world'
+    assert c.b64decode(b'aGVsbG9fd29ybGQ=') == b'hello_world'
+    assert not c._map.called
+
+
+@pytest.mark.parametrize('size', [10, 12, 13, 100, 1001])
+def test_codec_parallel_payloads(parallel_codec, size):
+    """Test chunked payloads match the standard library."""
+    data = bytes(range(256)) * (size // 256) + bytes(range(size % 256))
+    encoded = str(base64.b64encode(data), 'utf-8')
+    assert parallel_codec.b64encode(data) == encoded
+    assert parallel_codec.b64decode(encoded) == data
+
+
+def test_codec_parallel_whitespace(parallel_codec):
+    """Test line breaks do not shift the chunks of a payload."""
+    data = bytes(range(256)) * 4
+    encoded = base64.encodebytes(data)
+    assert b'\n' in encoded
+    assert parallel_codec.b64decode(encoded) == data
+    assert parallel_codec.b64decode(' ' + encoded.decode('ascii')) == data
+
+
+def test_codec_spawn(mocker, parallel_codec):
+    """Test the worker processes are spawned, not forked."""
+    get_context = mocker.patch('multiprocessing.get_context')
+    get_context.return_value.Pool.return_value.map.return_value = [
+        b'aGVsbG9fd29ybGQ='
+    ]
+    assert parallel_codec.b64encode(b'hello_world') == 'aGVsbG9fd29ybGQ='
+    get_context.assert_called_once_with('spawn')
+
+
+def test_codec_pool_not_started(mocker, parallel_codec):
+    """Test payloads are processed in the thread when the pool fails."""
+    get_context = mocker.patch('multiprocessing.get_context')
+    get_context.return_value.Pool.side_effect = RuntimeError()
+    assert parallel_codec.b64encode(b'hello_world') == 'aGVsbG9fd29ybGQ='
+    assert parallel_codec.b64decode('aGVsbG9fd29ybGQ=') == b'hello_world'
+    assert get_context.return_value.Pool.call_count == 1
+
+
+def test_codec_no_threshold(mocker):
+    """Test the process pool is not used by default."""
+    c = Codec()
+    c._map = mocker.Mock()
+    assert c.b64decode(b'aGVsbG8h' * 1000) == b'hello!' * 1000
+    assert not c._map.called
+
+
+def test_default_codec(b64message):
+    """Test the module functions use the default codec."""
+    decoded, encoded = b64message
+    assert codec.b64encode(decoded) == encoded
+    assert codec.b64decode(encoded) == decoded
@@ -0,0 +1,79 @@
+"""Test upload deduplication."""
+import hashlib
+
+import pytest
+
+from textunited.dedup import UploadIndex, content_digest
+from textunited.file import FileUpload
+
+
+def test_content_digest(b64message):
+    """Test the digest is the SHA-256 of the content, computed once."""
+    decoded, _ = b64message
+    upload = FileUpload('a.txt', decoded)
+    digest = content_digest(upload)
+    assert digest == hashlib.sha256(decoded).hexdigest()
+    assert content_digest(FileUpload('b.txt', decoded)) == digest
+    upload.content = b'other'
+    assert content_digest(upload) != digest
+
+
+def test_upload_index_encode(mocker, b64message):
+    """Test identical contents are encoded once."""
+    decoded, encoded = b64message
+    b64encode = mocker.patch(
+        'textunited.dedup.codec.b64encode', return_value=encoded
+    )
+    index = UploadIndex()
+    first = FileUpload('a.txt', decoded)
+    second = FileUpload('b.txt', bytes(bytearray(decoded)))
+    assert first.to_json(upload_index=index)['Content'] == encoded
+    assert second.to_json(upload_index=index) == {
+        'Filename': 'b.txt', 'Content': encoded,
+    }
+    b64encode.assert_called_once_with(decoded)
+    assert index.stats() == {
+        'uploads': 0, 'payloads': 1, 'payload_bytes': len(encoded),
+        'hits': 1, 'misses': 1,
+    }
+
+
+def test_upload_index_payload_limit():
+    """Test the least recently used payloads are evicted."""
+    index = UploadIndex(max_payload_bytes=10)
+    index.encode(FileUpload('a.txt', b'aaaaaa'))
+    index.encode(FileUpload('b.txt', b'bbbbbb'))
+    index.encode(FileUpload('c.txt', b'c' * 100))
+    assert index.stats()['payloads'] == 1
+    assert index.payload_bytes == 8
+
+
+def test_upload_index_unchanged(b64message):
+    """Test the uploaded contents are reported as unchanged."""
+    decoded, _ = b64message
+    index = UploadIndex()
+    upload = FileUpload('a.txt', decoded)
+    new = FileUpload('new.txt', b'new')
+    index.record([upload], project_id=1)
+    index.record([FileUpload('b.txt', decoded)], project_id=2)
+    assert len(index) == 1
+    assert upload in index
+    assert index.unchanged([new, upload]) == [upload]
+    assert index.projects(upload) == [1, 2]
+    assert index.projects(new) == []
+
+
+def test_upload_index_persistence(tmpdir, b64message):
+    """Test the index is saved and loaded again."""
+    decoded, _ = b64message
+    path = str(tmpdir.join('uploads.json'))
+    index = UploadIndex(path)
+    index.record([FileUpload('a.txt', decoded)], project_id=1)
+    index.save()
+    assert tmpdir.listdir() == [tmpdir.join('uploads.json')]
+
+    loaded = UploadIndex(path)
+    assert loaded.unchanged([FileUpload('b.txt', decoded)])
+    assert loaded.projects(FileUpload('b.txt', decoded)) == [1]
+    with pytest.raises(ValueError):
+        UploadIndex().save()
@@ -0,0 +1,103 @@
+"""Test download scheduler."""
+import threading
+import time
+
+import pytest
+
+from textunited.downloads import DownloadScheduler, estimate_memory
+
+
+class FakeFile:
+    """File recording the downloads."""
+
+    def __init__(self, size, record, release=None):
+        """Constructor."""
+        self.size = size
+        self.record = record
+        self.release = release
+        self.translated_content = None
+        self.source_content = None
+
+    def get_translated_content(self):
+        """Record the download and wait for the release."""
+        self.record.append(self.size)
+        if self.release is not None:
+            self.release.wait(5)
+        self.translated_content = b'x' * self.size
+
+    def get_source_content(self):
+        """Set the source content."""
+        self.source_content = b'source'
+
+
+def test_estimate_memory():
+    """Test the estimation includes base64 and decoded content."""
+    assert estimate_memory(None) == 256
+    assert estimate_memory(3) == 2 * 4 + 3 + 256
+    assert estimate_memory(3000) == 2 * 4000 + 3000 + 256
+
+
+def test_download_scheduler_not_valid_budget():
+    """Test not valid byte budget."""
+    with pytest.raises(ValueError):
+        DownloadScheduler(byte_budget=0)
+
+
+def test_download_scheduler_map():
+    """Test downloads of translated and source content."""
+    scheduler = DownloadScheduler(byte_budget=10000, max_workers=2)
+    record = []
+    files = [FakeFile(size, record) for size in (10, 20, 30)]
+    assert scheduler.map(files) == [b'x' * 10, b'x' * 20, b'x' * 30]
+    assert scheduler.submit(files[0], source=True).result() == b'source'
+    scheduler.shutdown()
+    assert scheduler.stats() == {
+        'queue_depth': 0,
+        'in_flight': 0,
+        'bytes_in_flight': 0,
+        'byte_budget': 10000,
+        'budget_used': 0.0,
+    }
+    with pytest.raises(RuntimeError):
+        scheduler.submit(files[0])
+
+
+def test_download_scheduler_errors():
+    """Test errors are set in the future."""
+    scheduler = DownloadScheduler()
+    file = FakeFile(1, None)
+    with pytest.raises(AttributeError):
+        scheduler.submit(file).result()
+    scheduler.shutdown()
+
+
+@pytest.mark.parametrize('small_first,expected', [
+    (False, [1000, 900, 10]),
+    (True, [1000, 10, 900]),
+])
+def test_download_scheduler_budget(small_first, expected):
+    """Test files are admitted while they fit in the budget."""
+    budget = estimate_memory(1000) + estimate_memory(10)
+    scheduler = DownloadScheduler(
+        byte_budget=budget, max_workers=4, small_first=small_first
+    )
+    record = []
+    release = threading.Event()
+    big = scheduler.submit(FakeFile(1000, record, release))
+    while not record:
+        time.sleep(0.001)
+    futures = [
+        scheduler.submit(FakeFile(size, record, release))
+        for size in (900, 10)
+    ]
+    if small_first:
+        while len(record) < 2:
+            time.sleep(0.001)
+        assert scheduler.stats()['budget_used'] == 1.0
+    assert scheduler.queue_depth == len(expected) - len(record)
+    release.set()
+    big.result()
+    for future in futures:
+        future.result()
+    scheduler.shutdown()
+    assert record == expected
@@ -0,0 +1,103 @@
+"""Test endpoint selection."""
+import pytest
+import requests
+
+from textunited.client import TextUnitedClient
+from textunited.endpoints import EndpointSelector, normalize_base_url
+from textunited.exceptions import ResourceUnavailable
+
+EU = 'https://eu.example.com/api/'
+US = 'https://us.example.com/api/'
+
+
+def test_normalize_base_url():
+    """Test the base URL ends with a slash."""
+    assert normalize_base_url('http://localhost:8000/api') == (
+        'http://localhost:8000/api/'
+    )
+    assert normalize_base_url(EU) == EU
+
+
+def test_endpoint_selector_latency(clock):
+    """Test the endpoint with the lowest latency is chosen."""
+    selector = EndpointSelector(
+        ['https://eu.example.com/api', US], alpha=0.5, clock=clock
+    )
+    assert selector.base_urls == (EU, US)
+    assert selector.choose() == EU
+    selector.record(EU, 0.2)
+    assert selector.choose() == US
+    selector.record(US, 0.1)
+    assert selector.candidates() == [US, EU]
+    selector.record(US, 0.5)
+    assert selector.stats()[US]['latency'] == pytest.approx(0.3)
+    assert selector.choose() == EU
+
+    # unused endpoints are measured again
+    clock.now = 100
+    selector.record(EU, 0.2)
+    assert selector.choose() == US
+    with pytest.raises(ValueError):
+        EndpointSelector([])
+
+
+def test_endpoint_selector_failures(clock):
+    """Test failed endpoints are skipped during the cooldown."""
+    selector = EndpointSelector([EU, US], cooldown=10, clock=clock)
+    selector.record(EU, 0.1)
+    selector.record(US, 0.5)
+    selector.record(EU, failed=True)
+    assert selector.candidates() == [US, EU]
+    assert selector.stats()[EU] == {
+        'latency': 0.1, 'healthy': False, 'requests': 2, 'failures': 1,
+    }
+    clock.now = 10
+    assert selector.choose() == EU
+
+
+def test_client_base_url(mock_request):
+    """Test requests are sent to the configured base URL."""
+    client = TextUnitedClient(123, 'abc', base_url='http://localhost:8000')
+    assert client.endpoints is None
+    client.fetch_json('/projects')
+    assert mock_request.call_args[0][1] == 'http://localhost:8000/projects'
+
+
+def test_client_endpoints_failover(mocker, mock_request):
+    """Test GET requests fail over to the next endpoint."""
+    client = TextUnitedClient(123, 'abc', base_url=[EU, US])
+    assert client.base_url == EU
+    ok = mocker.Mock(status_code=200)
+    mock_request.side_effect = [requests.ConnectionError(), ok]
+    assert client.fetch_response('/projects') is ok
+    assert [c[0][1] for c in mock_request.call_args_list] == [
+        EU + 'projects', US + 'projects',
+    ]
+    stats = client.endpoints.stats()
+    assert not stats[EU]['healthy']
+    assert stats[US]['healthy']
+    assert stats[US]['latency'] is not None
+
+    # the failed endpoint is not used while it is down
+    mock_request.side_effect = None
+    mock_request.return_value = ok
+    client.fetch_json('/projects/1')
+    assert mock_request.call_args[0][1] == US + 'projects/1'
+
+
+def test_client_endpoints_no_failover(mock_request):
+    """Test missing resources and POST requests do not fail over."""
+    selector = EndpointSelector([EU, US])
+    client = TextUnitedClient(123, 'abc', base_url=selector)
+    assert client.endpoints is selector
+    mock_request.return_value.status_code = 404
+    with pytest.raises(ResourceUnavailable):
+        client.fetch_json('/projects/1')
+    mock_request.assert_called_once()
+    assert selector.stats()[EU]['healthy']
+
+    mock_request.reset_mock()
+    mock_request.side_effect = requests.ConnectionError()
+    with pytest.raises(requests.ConnectionError):
+        client.fetch_json('/fastproject', 'POST', data={})
+    mock_request.assert_called_once()
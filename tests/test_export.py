@@ -0,0 +1,144 @@
+"""Test project export."""
+import io
+import tarfile
+import threading
+import zipfile
+
+import pytest
+
+from textunited.export import archive_name, export_project
+from textunited.file import File
+
+
+class Unseekable:
+    """Stream with only a write method, like an HTTP response."""
+
+    def __init__(self):
+        """Constructor."""
+        self.buffer = io.BytesIO()
+
+    def write(self, data):
+        """Write the data."""
+        return self.buffer.write(data)
+
+    def flush(self):
+        """Do nothing."""
+
+
+@pytest.fixture
+def project(mocker, client_mock):
+    """Return a project whose files return their name as content."""
+    _, client = client_mock
+    files = [
+        File(client, 1, 1, 'a.txt', '', 10, 1, 'Translated'),
+        File(client, 1, 2, 'b.txt', 'sub\\dir\\', 10, 1, 'Translated'),
+        File(client, 1, 3, 'c.txt', '../up/', 10, 1, 'Translated'),
+        File(client, 1, 4, 'd.txt', '', 10, 1, 'NotTranslated'),
+    ]
+    for file in files:
+        file._fetch_content = mocker.Mock(
+            return_value='{} {}'.format(file.name, file.id_).encode()
+        )
+    project = mocker.Mock(id_=1)
+    project.get_files.return_value = files
+    return project
+
+
+def test_archive_name(client_mock):
+    """Test the names use the subdir and cannot leave the archive."""
+    _, client = client_mock
+    file = File(client, 1, 1, 'a.txt', 'sub\\dir\\', 1, 1, 'Translated')
+    assert archive_name(file) == 'sub/dir/a.txt'
+    file.subdir = '/../../etc/./'
+    assert archive_name(file) == 'etc/a.txt'
+    file.subdir = None
+    assert archive_name(file) == 'a.txt'
+    file.name = '..'
+    assert archive_name(file) == '1'
+
+
+def test_export_zip(project):
+    """Test the translated files are written to a ZIP stream in order."""
+    stream = Unseekable()
+    names = export_project(project, stream, max_workers=2)
+    assert names == ['a.txt', 'sub/dir/b.txt', 'up/c.txt']
+    project.get_files.assert_called_once_with(download_translations=False)
+    with zipfile.ZipFile(io.BytesIO(stream.buffer.getvalue())) as archive:
+        assert archive.namelist() == names
+        assert archive.read('sub/dir/b.txt') == b'b.txt 2'
+    files = project.get_files.return_value
+    files[0]._fetch_content.assert_called_once_with('translated')
+    assert files[0].translated_content is None
+    assert not files[3]._fetch_content.called
+
+
+@pytest.mark.parametrize('format,mode', [('tar', 'r:'), ('tar.gz', 'r:gz')])
+def test_export_tar(project, format, mode):
+    """Test the files are written to a TAR stream."""
+    stream = io.BytesIO()
+    files = project.get_files.return_value
+    export_project(project, stream, format, files=files[:2], source=True)
+    stream.seek(0)
+    with tarfile.open(fileobj=stream, mode=mode) as archive:
+        assert archive.getnames() == ['a.txt', 'sub/dir/b.txt']
+        assert archive.extractfile('a.txt').read() == b'a.txt 1'
+    files[0]._fetch_content.assert_called_once_with('source')
+
+
+def test_export_not_valid_format(project):
+    """Test not valid format."""
+    with pytest.raises(ValueError):
+        export_project(project, io.BytesIO(), 'rar')
+    assert not project.get_files.called
+
+
+def test_export_window(project):
+    """Test downloads wait while the pending contents fill the budget."""
+    files = project.get_files.return_value
+    release = threading.Event()
+    started = []
+
+    def fetch(file):
+        def fetch_content(content_type):
+            started.append(file.id_)
+            if file.id_ == 1:
+                release.wait(5)
+            return b'content'
+        return fetch_content
+
+    for file in files:
+        file._fetch_content = fetch(file)
+    thread = threading.Thread(
+        target=export_project,
+        args=(project, io.BytesIO()),
+        kwargs={'max_workers': 4, 'byte_budget': 20},
+    )
+    thread.start()
+    threading.Event().wait(0.1)
+    assert sorted(started) == [1, 2]
+    release.set()
+    thread.join(5)
+    assert sorted(started) == [1, 2, 3]
+
+
+@pytest.mark.parametrize('format', ['zip', 'tar', 'tar.gz'])
+def test_export_error(project, format):
+    """Test download errors are raised and the output removed."""
+    files = project.get_files.return_value
+    files[1]._fetch_content.side_effect = ValueError()
+    stream = io.BytesIO(b'header')
+    stream.seek(0, io.SEEK_END)
+    with pytest.raises(ValueError):
+        export_project(project, stream, format=format)
+    assert stream.getvalue() == b'header'
+
+
+def test_export_error_not_seekable(project):
+    """Test the archive of a failed export is not finished."""
+    files = project.get_files.return_value
+    files[1]._fetch_content.side_effect = ValueError()
+    stream = Unseekable()
+    with pytest.raises(ValueError):
+        export_project(project, stream, format='zip')
+    with pytest.raises(zipfile.BadZipFile):
+        zipfile.ZipFile(stream.buffer)
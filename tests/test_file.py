@@ -1,4 +1,6 @@
 """Test for files."""
+import pickle
+
 import pytest
 
 from textunited.file import File, FileUpload
@@ -16,16 +18,6 @@ def mock_file_download_content(mocker):
     return translated, source
 
 
-@pytest.fixture
-def file_factory(client_mock, b64message):
-    """Return a file factory."""
-    fetch_json, client = client_mock
-    decoded, encoded = b64message
-    fetch_json.return_value = {'Content': encoded}
-    file = File(client, 123, 321, 'Test.txt', None, 12, 12, 'Translated')
-    return file, fetch_json, client, decoded
-
-
 @pytest.mark.parametrize('download_source', [True, False])
 @pytest.mark.parametrize('download_translated,status,expected', [
     (True, 'Translated', True),
@@ -111,3 +103,39 @@ def test_file_upload_to_json(b64message):
         'Content': encoded
     }
     assert file.to_json() == expected_result
+
+
+def test_file_record(client_mock):
+    """Test file to_record and from_record."""
+    _, client = client_mock
+    file = File(client, 123, 321, 'Test.txt', 'dir', 12, 2, 'Translated')
+    file.translated_content = b'hello'
+    record = file.to_record()
+    assert record == {
+        'project_id': 123,
+        'id_': 321,
+        'name': 'Test.txt',
+        'subdir': 'dir',
+        'size': 12,
+        'words': 2,
+        'status': 'Translated',
+        'translated_content': b'hello',
+        'source_content': None,
+    }
+    assert 'translated_content' not in file.to_record(content=False)
+    result = File.from_record(record, client)
+    assert result.client is client
+    assert result.translated_content == b'hello'
+    assert str(result) == str(file)
+
+
+def test_file_pickle_without_client(client_mock):
+    """Test the client is not pickled and the file can be bound again."""
+    _, client = client_mock
+    file = File(client, 123, 321, 'Test.txt', None, 12, 2, 'Translated')
+    file.source_content = b'source'
+    result = pickle.loads(pickle.dumps(file))
+    assert result.client is None
+    assert result.source_content == b'source'
+    assert result.bind(client) is result
+    assert result.client is client
@@ -0,0 +1,164 @@
+"""Test hedging."""
+import threading
+from concurrent.futures import wait as futures_wait
+
+import pytest
+
+from textunited.client import TextUnitedClient
+from textunited.hedging import HedgingPolicy
+
+
+def test_hedging_policy_not_valid_arguments():
+    """Test not valid percentile and budget."""
+    with pytest.raises(ValueError):
+        HedgingPolicy(percentile=100)
+    with pytest.raises(ValueError):
+        HedgingPolicy(budget=-1)
+
+
+def test_hedging_policy_delay():
+    """Test delay uses the initial delay and then the percentile."""
+    policy = HedgingPolicy(
+        percentile=50, initial_delay=1, min_delay=0, min_samples=3
+    )
+    assert policy.delay == 1
+    for _ in range(3):
+        policy.run(lambda: None)
+    assert policy.delay < 1
+    assert policy.hedges == 0
+    assert policy.requests == 3
+
+
+def test_hedging_policy_fast_request_not_hedged(mocker):
+    """Test a request faster than the delay is not hedged."""
+    policy = HedgingPolicy(initial_delay=1, budget=1)
+    func = mocker.Mock(return_value='result')
+    assert policy.run(func, 'a', b='b') == 'result'
+    func.assert_called_once_with('a', b='b')
+    assert policy.stats()['hedges'] == 0
+
+
+def test_hedging_policy_slow_request_hedged():
+    """Test the duplicate request wins when the first one is slow."""
+    policy = HedgingPolicy(initial_delay=0.01, budget=1)
+    release = threading.Event()
+    calls = []
+
+    def func():
+        calls.append(1)
+        if len(calls) == 1:
+            release.wait(5)
+            return 'slow'
+        return 'fast'
+
+    assert policy.run(func) == 'fast'
+    release.set()
+    assert policy.hedges == 1
+    assert policy.hedge_wins == 1
+    assert policy.win_rate == 1.0
+    policy.shutdown()
+
+
+def test_hedging_policy_budget():
+    """Test hedges are not sent when the budget is exhausted."""
+    policy = HedgingPolicy(initial_delay=0.001, budget=0)
+    release = threading.Event()
+
+    def func():
+        release.wait(0.05)
+        return 'result'
+
+    assert policy.run(func) == 'result'
+    assert policy.hedges == 0
+    assert policy.win_rate == 0.0
+
+
+def test_hedging_policy_does_not_limit_callers():
+    """Test more callers than threads of a fixed pool run at once."""
+    policy = HedgingPolicy(initial_delay=10, budget=0)
+    barrier = threading.Barrier(20, timeout=5)
+    results = []
+    threads = [
+        threading.Thread(
+            target=lambda: results.append(policy.run(barrier.wait))
+        )
+        for _ in range(20)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+    # all the requests were in flight at the same time
+    assert sorted(results) == list(range(20))
+    policy.shutdown()
+
+
+def test_hedging_policy_delay_from_start():
+    """Test the delay counts from the start of the request."""
+    policy = HedgingPolicy(initial_delay=0.05, budget=1, max_workers=1)
+    release = threading.Event()
+    blocker = threading.Thread(target=policy.run, args=(release.wait,))
+    blocker.start()
+    threading.Event().wait(0.02)
+    # queued behind the blocker longer than the delay
+    waiter = threading.Thread(target=lambda: policy.run(lambda: None))
+    waiter.start()
+    threading.Event().wait(0.1)
+    release.set()
+    blocker.join(5)
+    waiter.join(5)
+    # only the blocker was hedged, the queued request was not slow
+    assert policy.hedges == 1
+    policy.shutdown()
+
+
+def test_hedging_policy_first_failure_waits_other():
+    """Test a failed request does not hide the result of the other one."""
+    policy = HedgingPolicy(initial_delay=0.01, budget=1)
+    calls = []
+
+    def func():
+        calls.append(1)
+        if len(calls) == 1:
+            threading.Event().wait(0.05)
+            raise RuntimeError('error')
+        threading.Event().wait(0.1)
+        return 'result'
+
+    assert policy.run(func) == 'result'
+
+
+def test_hedging_policy_both_finished(mocker):
+    """Test a successful hedge wins when both calls finish at once."""
+    policy = HedgingPolicy(initial_delay=0.01, budget=1)
+    calls = []
+
+    def func():
+        calls.append(1)
+        if len(calls) == 1:
+            threading.Event().wait(0.05)
+            raise RuntimeError('error')
+        return 'result'
+
+    def wait_all(futures, timeout=None, return_when=None):
+        # both calls are done when the caller looks at them
+        return futures_wait(futures, timeout=timeout)
+
+    mocker.patch('textunited.hedging.wait', wait_all)
+    assert policy.run(func) == 'result'
+    assert policy.hedge_wins == 1
+    policy.shutdown()
+
+
+@pytest.mark.parametrize('http,hedged', [('GET', True), ('POST', False)])
+def test_client_fetch_json_hedging(mocker, mock_request, http, hedged):
+    """Test only GET requests are hedged."""
+    policy = mocker.Mock(spec=HedgingPolicy)
+    client = TextUnitedClient(company_id=123, api_key='abc', hedging=policy)
+    result = client.fetch_json('/projects', http)
+    if hedged:
+        assert result == policy.run.return_value.json.return_value
+        policy.run.assert_called_once()
+    else:
+        assert result == mock_request.return_value.json.return_value
+        assert not policy.run.called
@@ -1,5 +1,15 @@
 """Test for language."""
-from textunited.language import Language
+import json
+
+import pytest
+
+from textunited.language import (
+    Language,
+    LanguageCatalog,
+    LanguageInfo,
+    get_catalog,
+    set_catalog,
+)
 
 
 def test_allowed_get_language_by_name_different_format():
@@ -8,3 +18,60 @@ def test_allowed_get_language_by_name_different_format():
     assert Language['es-es'] is Language.es_es
     assert Language['es_ES'] is Language.es_es
     assert Language['es-ES'] is Language.es_es
+
+
+def test_language_not_found():
+    """Test unknown names raise KeyError."""
+    with pytest.raises(KeyError):
+        Language['xx_xx']
+
+
+def test_bundled_catalog():
+    """Test the bundled catalog has the languages of the enum."""
+    catalog = LanguageCatalog.from_file()
+    assert len(catalog) == len(Language)
+    for member in Language:
+        assert catalog[member].language is member
+        assert catalog[member.name] is catalog[member.value]
+    assert catalog['EN_gb'] == LanguageInfo(40, 'en-GB', 'English (UK)')
+    assert catalog['english (uk)'].value == 40
+    assert catalog['zh-hans'] is catalog['zn_hans']
+    assert 'xx' not in catalog
+    assert catalog.get(0) is None
+    assert catalog.get(None, 'default') == 'default'
+    with pytest.raises(KeyError):
+        catalog['xx']
+    assert [language.id for language in catalog][:2] == [21, 32]
+
+
+def test_catalog_from_api(mocker):
+    """Test the catalog is loaded from the API records."""
+    client = mocker.Mock()
+    client.fetch_json.return_value = [
+        {'Id': 92, 'Code': 'pl-PL', 'Name': 'Polish'},
+    ]
+    catalog = LanguageCatalog.from_api(client)
+    client.fetch_json.assert_called_once_with('/languages')
+    polish = catalog['PL_pl']
+    assert polish.language is None
+    assert str(polish) == 'Polish (92)'
+    assert catalog['polish'] is polish
+
+
+def test_catalog_file(tmpdir):
+    """Test the catalog is loaded from a file."""
+    path = tmpdir.join('languages.json')
+    path.write(json.dumps([{'id': 52, 'code': 'ka', 'name': 'Georgian'}]))
+    catalog = LanguageCatalog.from_file(str(path))
+    assert catalog[52].code == 'ka'
+
+
+def test_get_catalog():
+    """Test the bundled catalog is used by default."""
+    catalog = LanguageCatalog([(92, 'pl-PL', 'Polish')])
+    set_catalog(catalog)
+    try:
+        assert get_catalog() is catalog
+    finally:
+        set_catalog(None)
+    assert get_catalog()[41].language is Language.en_us
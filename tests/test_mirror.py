@@ -0,0 +1,107 @@
+"""Test mirror."""
+from datetime import datetime
+
+import pytest
+
+from textunited.account import Account
+from textunited.exceptions import AccountNotFound, ProjectNotFound
+from textunited.file import File
+from textunited.mirror import Mirror
+from textunited.project import Project
+
+
+@pytest.fixture
+def mirror_factory(client_mock, data_list_projects, data_list_files,
+                   data_list_accounts):
+    """Return a synced mirror and the mocked fetch_json."""
+    fetch_json, client = client_mock
+
+    def fetch(uri):
+        if uri == '/projects':
+            return data_list_projects
+        if uri == '/employees':
+            return data_list_accounts
+        return data_list_files
+
+    fetch_json.side_effect = fetch
+    mirror = Mirror(client)
+    result = mirror.sync()
+    return mirror, fetch_json, result
+
+
+def test_mirror_first_sync(mirror_factory):
+    """Test all the projects and files are added."""
+    mirror, fetch_json, result = mirror_factory
+    assert result['projects_added'] == [8766, 8767]
+    assert result['files_added'] == 4
+    # only file listings, the content is not downloaded
+    assert fetch_json.call_count == 4
+
+
+def test_mirror_sync_only_changed(mocker, mirror_factory, data_list_projects,
+                                  data_list_files):
+    """Test files are only retrieved for changed projects."""
+    mirror, fetch_json, _ = mirror_factory
+    fetch_json.reset_mock()
+    data_list_projects[0]['Progress'] = 50
+    data_list_files[1]['Status'] = 'Translated'
+    data_list_projects.pop()
+
+    result = mirror.sync(accounts=False)
+    assert result['projects_added'] == []
+    assert result['projects_changed'] == [8766]
+    assert result['projects_removed'] == [8767]
+    assert result['files_changed'] == 1
+    fetch_json.assert_has_calls([
+        mocker.call('/projects'),
+        mocker.call('/projectfiles?projectId=8766'),
+    ])
+    assert fetch_json.call_count == 2
+    assert mirror.get_files(project_id=8767) == []
+
+
+def test_mirror_query_projects(mirror_factory):
+    """Test projects are returned without requests."""
+    mirror, fetch_json, _ = mirror_factory
+    fetch_json.reset_mock()
+    projects = mirror.list_projects(status='In progress', owner_id=1)
+    assert [p.id_ for p in projects] == [8766, 8767]
+    assert all(isinstance(p, Project) for p in projects)
+    project = mirror.get_project(8766)
+    assert project.end_date_utc == datetime(2015, 10, 13, 20, 0, 15, 85199)
+    assert project.target_language_code == 'EN'
+    assert mirror.list_projects(status='Completed') == []
+    assert len(mirror.overdue_projects()) == 2
+    assert mirror.overdue_projects(now=datetime(2015, 1, 1)) == []
+    with pytest.raises(ProjectNotFound):
+        mirror.get_project(1)
+    assert not fetch_json.called
+
+
+def test_mirror_query_files_and_accounts(mirror_factory):
+    """Test files and accounts are returned without requests."""
+    mirror, fetch_json, _ = mirror_factory
+    fetch_json.reset_mock()
+    files = mirror.get_files(project_id=8766, status='Translated')
+    assert len(files) == 1
+    assert isinstance(files[0], File)
+    assert files[0].id_ == 156148
+    assert files[0].size == 6991
+    assert files[0].translated_content is None
+    assert len(mirror.list_accounts()) == 2
+    account = mirror.get_account('jane.doe@example.com')
+    assert isinstance(account, Account)
+    assert account.id_ == 112000
+    with pytest.raises(AccountNotFound):
+        mirror.get_account('nobody@example.com')
+    assert not fetch_json.called
+
+
+def test_mirror_persistent(tmpdir, mirror_factory):
+    """Test the mirror is kept in the database file."""
+    client = mirror_factory[0].client
+    path = str(tmpdir.join('mirror.sqlite'))
+    mirror = Mirror(client, path)
+    mirror.sync()
+    mirror.close()
+    assert len(Mirror(client, path).list_projects()) == 2
@@ -0,0 +1,222 @@
+"""Test the prefetch of the files of the projects."""
+import json
+import threading
+
+import pytest
+
+from textunited.cache import MemoryCache
+from textunited.client import TextUnitedClient
+from textunited.downloads import JSON_OVERHEAD
+from textunited.prefetch import Prefetcher, is_completed
+from textunited.scheduler import PRIORITY_BULK
+
+
+@pytest.fixture
+def responses(mocker, mock_request, data_list_projects, data_list_files,
+              b64message):
+    """Answer the requests with the projects, files and contents."""
+    data_list_projects[0]['State'] = 'In progress'
+
+    def request(method, url, **kwargs):
+        response = mocker.Mock(status_code=200)
+        if 'type=translated' in url:
+            body = {'Content': b64message[1]}
+        elif 'projectfiles' in url:
+            body = data_list_files
+        elif url.endswith('/projects'):
+            body = data_list_projects
+        else:
+            body = data_list_projects[0]
+        response.content = json.dumps(body).encode('utf-8')
+        response.json.return_value = body
+        return response
+
+    mock_request.side_effect = request
+    return mock_request
+
+
+def complete(prefetcher, project):
+    """Watch a project in progress and then completed."""
+    project.status = 'In progress'
+    prefetcher.watch([project])
+    project.status = 'Completed'
+    return prefetcher.watch([project])
+
+
+def urls(mock_request):
+    """Return the URLs of the requests sent."""
+    return [c[0][1] for c in mock_request.call_args_list]
+
+
+def test_is_completed(mocker):
+    """Test the default predicate."""
+    assert is_completed(mocker.Mock(status='Completed'))
+    assert not is_completed(mocker.Mock(status='In progress'))
+
+
+def test_client_needs_cache():
+    """Test a prefetcher without a response cache is not valid."""
+    with pytest.raises(ValueError):
+        TextUnitedClient(123, 'abc', prefetcher=Prefetcher())
+
+
+def test_prefetch(responses, data_list_projects):
+    """Test get_files of a completed project is answered from the cache."""
+    prefetcher = Prefetcher()
+    client = TextUnitedClient(123, 'abc', response_cache=MemoryCache(),
+                              prefetcher=prefetcher)
+    client.list_projects()
+    # the listing expires and the project is listed again completed
+    client.response_cache.clear()
+    data_list_projects[0]['State'] = 'Completed'
+    projects = client.list_projects()
+    prefetcher.close()
+    assert urls(responses) == [
+        'https://www.textunited.com/api/projects',
+        'https://www.textunited.com/api/projects',
+        'https://www.textunited.com/api/projectfiles?projectId=8766',
+        'https://www.textunited.com/api/projectfiles?projectId=8766'
+        '&fileId=156148&type=translated',
+    ]
+    stats = prefetcher.stats()
+    assert stats['queued'] == stats['projects'] == stats['files'] == 1
+    # charged with the base64 JSON body of the 6991 bytes file
+    assert stats['budget_used'] == 4 * 2331 + JSON_OVERHEAD
+    assert stats['bytes'] == len(json.dumps({'Content': 'aGVsbG9fd29ybGQ='}))
+
+    files = projects[0].get_files()
+    assert files[0].translated_content == b'hello_world'
+    assert responses.call_count == 4
+
+    # projects already seen with the same status are not prefetched again
+    client.list_projects()
+    assert prefetcher.stats()['queued'] == 1
+
+
+def test_prefetch_first_sighting(mocker, client_mock):
+    """Test projects seen for the first time are not prefetched."""
+    _, client = client_mock
+    prefetcher = Prefetcher()
+    prefetcher._prefetch = mocker.Mock()
+    project = mocker.Mock(client=client, id_=1, status='Completed')
+    assert prefetcher.watch([project]) == 0
+    assert prefetcher.watch([project]) == 0
+    prefetcher.close()
+    prefetcher._prefetch.assert_not_called()
+
+
+def test_prefetch_max_projects(mocker, client_mock):
+    """Test only the statuses of the last projects seen are kept."""
+    _, client = client_mock
+    prefetcher = Prefetcher(max_projects=2)
+    prefetcher._prefetch = mocker.Mock()
+    projects = [
+        mocker.Mock(client=client, id_=i, status='In progress')
+        for i in range(3)
+    ]
+    prefetcher.watch(projects)
+    assert list(prefetcher._statuses) == [(123, 1), (123, 2)]
+    prefetcher.watch(projects[:1])
+    assert list(prefetcher._statuses) == [(123, 2), (123, 0)]
+    prefetcher.close()
+
+
+def test_prefetch_status_change(mocker, client_mock):
+    """Test projects are prefetched when they change to a matching status."""
+    _, client = client_mock
+    prefetcher = Prefetcher()
+    prefetcher._prefetch = mocker.Mock()
+    project = mocker.Mock(client=client, id_=1, status='In progress')
+    assert prefetcher.watch([project]) == 0
+    project.status = 'Completed'
+    assert prefetcher.watch([project]) == 1
+    assert prefetcher.watch([project]) == 0
+    prefetcher.close()
+    prefetcher._prefetch.assert_called_once_with(project)
+
+
+def test_prefetch_priority(mocker, responses):
+    """Test the prefetch requests are sent with the bulk priority."""
+    scheduler = mocker.Mock()
+    client = TextUnitedClient(123, 'abc', response_cache=MemoryCache(),
+                              scheduler=scheduler)
+    prefetcher = Prefetcher(download_translations=False)
+    complete(prefetcher, mocker.Mock(client=client, id_=1))
+    prefetcher.close()
+    scheduler.slot.assert_called_once_with(PRIORITY_BULK)
+
+
+def test_prefetch_budget(responses, clock):
+    """Test the contents over the budget are skipped until they expire."""
+    prefetcher = Prefetcher(byte_budget=9800, clock=clock)
+    client = TextUnitedClient(123, 'abc', response_cache=MemoryCache(ttl=30),
+                              prefetcher=prefetcher)
+    project = client.get_project(8766)
+    project.status = 'Completed'
+    prefetcher.watch([project])
+    prefetcher.close()
+    assert prefetcher.stats()['budget_used'] == 4 * 2331 + JSON_OVERHEAD
+
+    prefetcher._prefetch_content(
+        client, project, {'FileId': 1, 'FileSize': 100}, 30
+    )
+    assert prefetcher.stats()['skipped'] == 1
+    assert responses.call_count == 3
+
+    clock.now = 30
+    assert prefetcher.stats()['budget_used'] == 0
+    prefetcher._prefetch_content(
+        client, project, {'FileId': 1, 'FileSize': 100}, 30
+    )
+    assert prefetcher.stats()['budget_used'] == 4 * 34 + JSON_OVERHEAD
+    assert responses.call_count == 4
+
+
+def test_prefetch_errors(mocker, client_mock):
+    """Test prefetch errors are counted and not raised."""
+    fetch_json, client = client_mock
+    client.response_cache = MemoryCache()
+    fetch_json.side_effect = ValueError()
+    prefetcher = Prefetcher()
+    complete(prefetcher, mocker.Mock(client=client, id_=1))
+    prefetcher.close()
+    assert prefetcher.stats()['errors'] == 1
+
+
+def test_prefetch_runs_in_background(mocker, client_mock):
+    """Test watch returns before the prefetch ends."""
+    fetch_json, client = client_mock
+    client.response_cache = MemoryCache()
+    release = threading.Event()
+    fetch_json.side_effect = lambda *args, **kwargs: release.wait(5) and []
+    prefetcher = Prefetcher()
+    complete(prefetcher, mocker.Mock(client=client, id_=1))
+    assert prefetcher.stats()['projects'] == 0
+    release.set()
+    prefetcher.close()
+    assert prefetcher.stats()['projects'] == 1
+
+
+def test_prefetch_file_errors(mocker, client_mock, data_list_files):
+    """Test a failed content does not stop the others nor keep its budget."""
+    fetch_json, client = client_mock
+    client.response_cache = MemoryCache()
+    fetch_json.return_value = [
+        dict(data_list_files[0], FileId=i, Status='Translated')
+        for i in (1, 2)
+    ]
+    response = mocker.Mock(content=b'{"Content": ""}')
+    fetch_response = mocker.patch.object(
+        client, 'fetch_response', side_effect=[ValueError(), response]
+    )
+    prefetcher = Prefetcher()
+    complete(prefetcher, mocker.Mock(client=client, id_=1))
+    prefetcher.close()
+    stats = prefetcher.stats()
+    assert stats['errors'] == stats['files'] == stats['projects'] == 1
+    assert stats['budget_used'] == 4 * 2331 + JSON_OVERHEAD
+    assert fetch_response.call_count == 2
+    # the body is cached without decoding it
+    assert client.response_cache.get(client.cache_key(
+        '/projectfiles?projectId=1&fileId=2&type=translated'
+    )) == b'{"Content": ""}'
@@ -0,0 +1,31 @@
+"""Test per process client."""
+import pickle
+
+import pytest
+
+from textunited import process
+from textunited.client import TextUnitedClient
+from textunited.file import File
+
+
+@pytest.fixture
+def clean_process_client():
+    """Remove the client of the process after the test."""
+    yield
+    process.set_client(None)
+
+
+def test_initializer(clean_process_client):
+    """Test the initializer installs a client."""
+    assert process.get_client() is None
+    process.initializer(123, 'abc')
+    assert isinstance(process.get_client(), TextUnitedClient)
+
+
+def test_unpickled_objects_bound_to_process_client(
+        clean_process_client, client_mock):
+    """Test unpickled objects are bound to the client of the process."""
+    _, client = client_mock
+    data = pickle.dumps(File(client, 1, 2, 'a.txt', None, 1, 1, 'New'))
+    process.set_client(client)
+    assert pickle.loads(data).client is client
@@ -0,0 +1,106 @@
+"""Test profiling."""
+import time
+
+import pytest
+
+from textunited.client import TextUnitedClient
+from textunited.profiling import (
+    BASE64,
+    CONSTRUCT,
+    IO,
+    JSON,
+    NO_OPERATION,
+    OTHER,
+    Profiler,
+)
+
+
+@pytest.fixture
+def clock(mocker, clock):
+    """Patch the clock of the profiler."""
+    mocker.patch('textunited.profiling.time.perf_counter', clock)
+    return clock
+
+
+def test_profiler_nested(clock):
+    """Test phases and operations only count their own time."""
+    profiler = Profiler()
+    with profiler.operation('get_files'):
+        clock.now += 1
+        with profiler.phase(IO):
+            clock.now += 2
+        with profiler.phase(CONSTRUCT):
+            clock.now += 3
+            with profiler.operation('download'):
+                with profiler.phase(IO):
+                    clock.now += 10
+                with profiler.phase(BASE64):
+                    clock.now += 5
+        clock.now += 1
+    with profiler.phase(JSON):
+        clock.now += 7
+
+    stats = profiler.stats()
+    assert stats['get_files']['calls'] == 1
+    assert stats['get_files']['wall'] == 22
+    assert stats['get_files']['phases'] == {
+        IO: 2, JSON: 0, BASE64: 0, CONSTRUCT: 3, OTHER: 2,
+    }
+    assert stats['download']['wall'] == 15
+    assert stats['download']['phases'] == {
+        IO: 10, JSON: 0, BASE64: 5, CONSTRUCT: 0, OTHER: 0,
+    }
+    assert stats[NO_OPERATION]['phases'][JSON] == 7
+    assert stats[NO_OPERATION]['phases'][OTHER] == 0
+
+    report = profiler.report().splitlines()
+    assert report[0].split() == [
+        'operation', 'calls', 'wall', IO, JSON, BASE64, CONSTRUCT, OTHER,
+    ]
+    assert report[1].split()[:3] == ['get_files', '1', '22.000']
+    profiler.reset()
+    assert profiler.stats() == {}
+
+
+def test_client_profiler(mock_request, data_list_projects, data_list_files):
+    """Test the client operations are profiled."""
+    profiler = Profiler()
+    client = TextUnitedClient(company_id=123, api_key='abc',
+                              profiler=profiler)
+    mock_request.return_value.json.side_effect = [
+        data_list_projects[0], data_list_files, {'Content': 'aGVsbG8='},
+    ]
+    client.get_project(8766).get_files()
+    stats = profiler.stats()
+    assert set(stats) == {
+        'textunited.get_project', 'textunited.get_files',
+        'textunited.get_translated_content',
+    }
+    for stat in stats.values():
+        assert stat['calls'] == 1
+        assert stat['phases'][IO] > 0
+        assert stat['phases'][JSON] > 0
+    assert stats['textunited.get_project']['phases'][CONSTRUCT] > 0
+    assert stats['textunited.get_files']['phases'][CONSTRUCT] > 0
+    assert stats['textunited.get_translated_content']['phases'][BASE64] > 0
+
+
+def _busy_work():
+    """Run without releasing the thread."""
+    end = time.monotonic() + 0.1
+    while time.monotonic() < end:
+        pass
+
+
+def test_profiler_sampling():
+    """Test the stacks of the operations are sampled."""
+    profiler = Profiler(sample_interval=0.005)
+    try:
+        with profiler.operation('busy'):
+            _busy_work()
+    finally:
+        profiler.stop_sampling()
+    samples = profiler.stats()['busy']['samples']
+    assert samples
+    assert samples[0][0].startswith('_busy_work (test_profiling.py:')
+    assert '_busy_work' in profiler.report()
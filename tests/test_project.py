@@ -1,11 +1,26 @@
 """Test for project."""
+import json
+import pickle
 from datetime import datetime
 
 import pytest
 
+from textunited.cache import MemoryCache
+from textunited.client import TextUnitedClient
+from textunited.exceptions import ProjectNotFound, ResourceUnavailable
 from textunited.file import FileUpload
-from textunited.language import Language
-from textunited.project import Project, ProjectRequest, parse_datetime
+from textunited.language import (
+    Language,
+    LanguageCatalog,
+    LanguageInfo,
+    set_catalog,
+)
+from textunited.project import (
+    Project,
+    ProjectRequest,
+    parse_datetime,
+    refresh_projects,
+)
 
 
 def test_parse_datetime():
@@ -86,9 +101,18 @@ def test_project_get_files(mocker, client_mock):
         '/projectfiles?projectId=358'
     )
     file_from_json.assert_has_calls([
-        mocker.call(client=client, project_id=358, json_obj='1'),
-        mocker.call(client=client, project_id=358, json_obj='2'),
-        mocker.call(client=client, project_id=358, json_obj='3'),
+        mocker.call(
+            client=client, project_id=358, json_obj='1',
+            download_translations=True, download_sources=False
+        ),
+        mocker.call(
+            client=client, project_id=358, json_obj='2',
+            download_translations=True, download_sources=False
+        ),
+        mocker.call(
+            client=client, project_id=358, json_obj='3',
+            download_translations=True, download_sources=False
+        ),
     ])
 
 
@@ -203,3 +227,167 @@ def test_project_request_to_json(mocker):
     assert json_obj == expected_result
     file1.to_json.assert_called_once()
     file2.to_json.assert_called_once()
+
+
+def test_project_pickle_without_client(client_mock, data_list_projects):
+    """Test the client is not pickled and the project can be bound again."""
+    _, client = client_mock
+    project = Project.from_json(client, data_list_projects[0])
+    result = pickle.loads(pickle.dumps(project))
+    assert result.client is None
+    assert result.to_record() == project.to_record()
+    assert result.end_date_utc == project.end_date_utc
+    assert result.bind(client) is result
+    assert result.client is client
+
+
+def test_project_update_from_json(mocker, client_mock, data_list_projects):
+    """Test only changed attributes are updated and dates are not parsed."""
+    _, client = client_mock
+    json_obj = data_list_projects[0]
+    project = Project.from_json(client, json_obj)
+    parse = mocker.patch('textunited.project.parse_datetime')
+    assert project.update_from_json(json_obj) == {}
+    assert not parse.called
+
+    json_obj = dict(json_obj, Progress=50, State='Completed',
+                    EndDateUtc='2016-10-12T22:00:15Z')
+    parse.return_value = datetime(2016, 10, 12, 22, 0, 15)
+    changes = project.update_from_json(json_obj)
+    assert changes == {
+        'progress': (0, 50),
+        'status': ('In progress', 'Completed'),
+        'end_date_utc': (
+            datetime(2015, 10, 13, 20, 0, 15, 85199),
+            datetime(2016, 10, 12, 22, 0, 15),
+        ),
+    }
+    parse.assert_called_once_with('2016-10-12T22:00:15Z')
+    assert project.progress == 50
+
+
+def test_project_refresh(mocker, client_mock, data_list_projects):
+    """Test refresh sends conditional requests."""
+    _, client = client_mock
+    project = Project.from_json(client, data_list_projects[0])
+    response = mocker.Mock(
+        status_code=200,
+        headers={'ETag': '"v2"', 'Last-Modified': 'Tue, 01 Jan 2019'},
+    )
+    response.json.return_value = dict(data_list_projects[0], Progress=10)
+    fetch_response = mocker.patch.object(
+        client, 'fetch_response', return_value=response
+    )
+    assert project.refresh() == {'progress': (0, 10)}
+    fetch_response.assert_called_once_with('/projects/8766', headers={})
+
+    response.status_code = 304
+    assert project.refresh() == {}
+    fetch_response.assert_called_with('/projects/8766', headers={
+        'If-None-Match': '"v2"',
+        'If-Modified-Since': 'Tue, 01 Jan 2019',
+    })
+    assert project.progress == 10
+
+
+def test_project_refresh_not_found(mocker, client_mock, data_list_projects):
+    """Test refresh of a project that does not exist anymore."""
+    _, client = client_mock
+    project = Project.from_json(client, data_list_projects[0])
+    mocker.patch.object(
+        client, 'fetch_response', side_effect=ResourceUnavailable(
+            'ERROR', mocker.Mock(status_code=404)
+        )
+    )
+    with pytest.raises(ProjectNotFound):
+        project.refresh()
+
+
+def test_refresh_projects(mocker, client_mock, data_list_projects):
+    """Test projects are refreshed with a single conditional request."""
+    _, client = client_mock
+    projects = [Project.from_json(client, obj) for obj in data_list_projects]
+    response = mocker.Mock(status_code=200, headers={'ETag': '"v2"'})
+    response.json.return_value = [
+        dict(data_list_projects[0], State='Completed')
+    ]
+    fetch_response = mocker.patch.object(
+        client, 'fetch_response', return_value=response
+    )
+    assert refresh_projects(projects) == {
+        8766: {'status': ('In progress', 'Completed')},
+        8767: None,
+    }
+    fetch_response.assert_called_once_with('/projects', headers={})
+
+    response.status_code = 304
+    assert refresh_projects(projects) == {8766: {}, 8767: {}}
+    fetch_response.assert_called_with(
+        '/projects', headers={'If-None-Match': '"v2"'}
+    )
+
+    # a project not refreshed from the same listing needs the full listing
+    projects.append(Project.from_json(client, data_list_projects[1]))
+    refresh_projects(projects)
+    fetch_response.assert_called_with('/projects', headers={})
+    assert refresh_projects([]) == {}
+
+
+def test_refresh_projects_bypass_cache(mock_request, data_list_projects):
+    """Test the listing is not answered from the response cache."""
+    client = TextUnitedClient(123, 'abc', response_cache=MemoryCache())
+    response = mock_request.return_value
+    response.headers = {}
+    response.content = json.dumps(data_list_projects).encode('utf-8')
+    projects = client.list_projects()
+
+    response.json.return_value = [
+        dict(data_list_projects[0], State='Completed')
+    ]
+    changes = refresh_projects(projects)
+    assert changes[8766] == {'status': ('In progress', 'Completed')}
+    assert mock_request.call_count == 2
+
+
+def test_language_properties_catalog(client_mock):
+    """Test languages not in the enum are found in the catalog."""
+    _, client = client_mock
+    args = 18 * [None]
+    p = Project(client, 358, *args)
+    p.source_language_id = 92
+    p.source_language_code = 'PL'
+    p.target_language_id = 52
+    set_catalog(LanguageCatalog([(52, 'ka-GE', 'Georgian')]))
+    try:
+        assert p.source_language == LanguageInfo(92, 'PL', None)
+        assert p.target_language.name == 'Georgian'
+    finally:
+        set_catalog(None)
+
+
+def test_project_request_catalog_languages():
+    """Test ProjectRequest accepts codes and catalog entries."""
+    p = ProjectRequest(
+        'name', 'en-GB', LanguageInfo(92, 'pl-PL', 'Polish'), 'description',
+        [], 1,
+    )
+    assert p.source_language is Language.en_gb
+    assert ProjectRequest(
+        'name', 40, 'en-GB', 'description', [], 1
+    ).source_language is Language.en_gb
+    json_obj = p.to_json()
+    assert json_obj['SourceLanguageId'] == 40
+    assert json_obj['TargetLanguageId'] == 92
+    with pytest.raises(TypeError, match='source_language'):
+        ProjectRequest('name', 'xx', 'en-GB', 'description', [], 1)
+    with pytest.raises(TypeError, match='target_language'):
+        ProjectRequest('name', 'en-GB', 'xx', 'description', [], 1)
+
+
+def test_project_request_repr_catalog_language():
+    """Test the code of a catalog language without a name is printed."""
+    p = ProjectRequest(
+        'name', Language.en_gb, LanguageInfo(999, 'xx-YY', None),
+        'description', [], 1,
+    )
+    assert repr(p) == "'name' en_gb to xx-YY"
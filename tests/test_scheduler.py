@@ -0,0 +1,162 @@
+"""Test scheduler."""
+import threading
+import time
+
+import pytest
+
+from textunited.client import TextUnitedClient
+from textunited.hedging import HedgingPolicy
+from textunited.scheduler import (
+    PRIORITY_BULK,
+    PRIORITY_INTERACTIVE,
+    RequestScheduler,
+    default_priority,
+)
+
+
+@pytest.mark.parametrize('uri,expected', [
+    ('/projects', PRIORITY_INTERACTIVE),
+    ('/projectfiles?projectId=1', PRIORITY_INTERACTIVE),
+    ('/projectfiles?projectId=1&fileId=2&type=source', PRIORITY_BULK),
+])
+def test_default_priority(uri, expected):
+    """Test content downloads are bulk by default."""
+    assert default_priority(uri) == expected
+
+
+def test_scheduler_not_valid_arguments():
+    """Test not valid max_in_flight and priority."""
+    with pytest.raises(ValueError):
+        RequestScheduler(max_in_flight=0)
+    with pytest.raises(ValueError):
+        RequestScheduler().acquire('unknown')
+
+
+def test_scheduler_limits():
+    """Test limits are computed from the shares."""
+    scheduler = RequestScheduler(max_in_flight=4)
+    assert scheduler.limits == {'interactive': 4, 'normal': 3, 'bulk': 2}
+    with scheduler.slot(PRIORITY_BULK):
+        assert scheduler.stats()['bulk']['in_flight'] == 1
+        assert scheduler.in_flight == 1
+    assert scheduler.in_flight == 0
+
+
+def _start(scheduler, priority, order, release):
+    """Start a thread waiting for a slot and recording the order."""
+    def run():
+        with scheduler.slot(priority):
+            order.append(priority)
+            release.wait(5)
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread
+
+
+def _wait_waiting(scheduler, priority, count):
+    """Wait until `count` requests are waiting in the priority class."""
+    deadline = time.monotonic() + 5
+    while scheduler.stats()[priority]['waiting'] < count:
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+
+
+def test_scheduler_interactive_jump_ahead_of_bulk():
+    """Test interactive requests go before queued bulk requests."""
+    scheduler = RequestScheduler(max_in_flight=1)
+    order = []
+    release = threading.Event()
+    scheduler.acquire(PRIORITY_BULK)
+    threads = [_start(scheduler, PRIORITY_BULK, order, release)]
+    _wait_waiting(scheduler, PRIORITY_BULK, 1)
+    threads.append(_start(scheduler, PRIORITY_INTERACTIVE, order, release))
+    _wait_waiting(scheduler, PRIORITY_INTERACTIVE, 1)
+
+    release.set()
+    scheduler.release(PRIORITY_BULK)
+    for thread in threads:
+        thread.join()
+    assert order == [PRIORITY_INTERACTIVE, PRIORITY_BULK]
+
+
+def test_scheduler_bulk_share_leaves_room_for_interactive():
+    """Test bulk requests can not take all the slots."""
+    scheduler = RequestScheduler(max_in_flight=2)
+    order = []
+    release = threading.Event()
+    scheduler.acquire(PRIORITY_BULK)
+    bulk = _start(scheduler, PRIORITY_BULK, order, release)
+    _wait_waiting(scheduler, PRIORITY_BULK, 1)
+
+    with scheduler.slot(PRIORITY_INTERACTIVE):
+        assert scheduler.stats()['bulk']['waiting'] == 1
+
+    scheduler.release(PRIORITY_BULK)
+    release.set()
+    bulk.join()
+    assert order == [PRIORITY_BULK]
+
+
+@pytest.mark.parametrize('uri,context,argument,expected', [
+    ('/projects', None, None, PRIORITY_INTERACTIVE),
+    ('/projectfiles?projectId=1&fileId=2&type=source', None, None,
+     PRIORITY_BULK),
+    ('/projects', PRIORITY_BULK, None, PRIORITY_BULK),
+    ('/projects', PRIORITY_BULK, 'normal', 'normal'),
+])
+def test_client_fetch_json_scheduler(
+        mocker, mock_request, uri, context, argument, expected):
+    """Test fetch_json takes a slot with the right priority."""
+    scheduler = mocker.Mock(spec=RequestScheduler)
+    scheduler.slot.return_value = mocker.MagicMock()
+    client = TextUnitedClient(
+        company_id=123, api_key='abc', scheduler=scheduler
+    )
+    with client.priority(context):
+        client.fetch_json(uri, priority=argument)
+    scheduler.slot.assert_called_once_with(expected)
+    assert getattr(client._local, 'priority') is None
+
+
+def test_client_hedged_request_takes_slots(mocker, mock_request):
+    """Test each hedged duplicate takes its own slot."""
+    scheduler = RequestScheduler(max_in_flight=4)
+    policy = HedgingPolicy(initial_delay=0.01, budget=1)
+    release = threading.Event()
+    in_flight = []
+
+    def request(*args, **kwargs):
+        in_flight.append(scheduler.stats()[PRIORITY_BULK]['in_flight'])
+        if len(in_flight) == 1:
+            release.wait(5)
+        return mock_request.return_value
+
+    mock_request.side_effect = request
+    client = TextUnitedClient(
+        company_id=123, api_key='abc', scheduler=scheduler, hedging=policy
+    )
+    with client.priority(PRIORITY_BULK):
+        client.fetch_json('/projects')
+    release.set()
+    assert in_flight == [1, 2]
+    policy.shutdown()
+
+
+def test_client_hedging_saturated_scheduler(mock_request):
+    """Test the time queued in the scheduler does not trigger hedges."""
+    scheduler = RequestScheduler(max_in_flight=1)
+    policy = HedgingPolicy(initial_delay=0.01, budget=1)
+    client = TextUnitedClient(
+        company_id=123, api_key='abc', scheduler=scheduler, hedging=policy
+    )
+    mock_request.return_value.json.return_value = []
+    scheduler.acquire(PRIORITY_BULK)
+    timer = threading.Timer(0.2, scheduler.release, (PRIORITY_BULK,))
+    timer.start()
+    with client.priority(PRIORITY_BULK):
+        client.fetch_json('/projects')
+    timer.join()
+    assert policy.hedges == 0
+    assert mock_request.call_count == 1
+    policy.shutdown()
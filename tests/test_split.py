@@ -0,0 +1,141 @@
+"""Test the split of large project requests."""
+import json
+
+import pytest
+
+from textunited.exceptions import SplitProjectFailed
+from textunited.file import FileUpload
+from textunited.language import Language
+from textunited.project import ProjectRequest
+from textunited.split import (
+    encoded_size,
+    file_words,
+    part_names,
+    request_size,
+    split_request,
+)
+
+
+def make_request(sizes, reference_number='REF', words=None):
+    """Return a request with a file of each size."""
+    words = words or [None] * len(sizes)
+    files = [
+        FileUpload('file{}.txt'.format(i), b'x' * size, words=count)
+        for i, (size, count) in enumerate(zip(sizes, words))
+    ]
+    return ProjectRequest(
+        'Big', Language.en_gb, Language.de_de, 'description', files, 1,
+        reference_number=reference_number,
+    )
+
+
+def test_encoded_size():
+    """Test the size of the base64 encoding."""
+    for size in range(10):
+        content = b'x' * size
+        assert encoded_size(content) == len(
+            FileUpload('a', content).to_json()['Content']
+        )
+
+
+def test_request_size():
+    """Test the size is the length of the JSON body."""
+    project_obj = make_request([10, 200, 3000])
+    assert request_size(project_obj) == len(json.dumps(project_obj.to_json()))
+
+
+def test_file_words():
+    """Test the words of the uploads are estimated when unknown."""
+    assert file_words(FileUpload('a', b'one two\nthree')) == 3
+    assert file_words(FileUpload('a', b'one two', words=10)) == 10
+
+
+def test_part_names():
+    """Test the names and reference numbers of the parts."""
+    project_obj = make_request([1])
+    assert part_names(project_obj, 1, 1) == ('Big', 'REF')
+    assert part_names(project_obj, 2, 3) == ('Big (part 2/3)', 'REF-2')
+    project_obj.reference_number = None
+    assert part_names(project_obj, 2, 3) == ('Big (part 2/3)', None)
+
+
+def test_split_not_needed():
+    """Test requests under the limits are not split."""
+    project_obj = make_request([100, 100])
+    assert split_request(project_obj) == [project_obj]
+    assert split_request(project_obj, max_request_size=10 ** 6) == [
+        project_obj
+    ]
+    assert split_request(project_obj, max_words=10) == [project_obj]
+
+
+def test_split_size():
+    """Test no part is larger than the maximum size."""
+    sizes = [2200, 100, 1500, 1100, 500, 1800, 50, 900]
+    project_obj = make_request(sizes)
+    max_request_size = 4000
+    parts = split_request(project_obj, max_request_size=max_request_size)
+    assert len(parts) == 4
+    assert sorted(
+        f.name for part in parts for f in part.files
+    ) == sorted(f.name for f in project_obj.files)
+    for index, part in enumerate(parts, 1):
+        assert request_size(part) <= max_request_size
+        assert part.name == 'Big (part {}/4)'.format(index)
+        assert part.reference_number == 'REF-{}'.format(index)
+        assert part.source_language == Language.en_gb
+        names = [f.name for f in part.files]
+        assert names == sorted(names)
+    # the request is not modified
+    assert project_obj.name == 'Big'
+    assert len(project_obj.files) == len(sizes)
+
+
+def test_split_words():
+    """Test the parts are bounded by words, large files go alone."""
+    project_obj = make_request([10] * 4, words=[60, 50, 500, 40])
+    parts = split_request(project_obj, max_words=100)
+    assert [[f.name for f in part.files] for part in parts] == [
+        ['file2.txt'], ['file0.txt', 'file3.txt'], ['file1.txt'],
+    ]
+
+
+def test_split_file_too_large():
+    """Test a file larger than the request size is not valid."""
+    project_obj = make_request([100, 5000])
+    with pytest.raises(ValueError) as e:
+        split_request(project_obj, max_request_size=4000)
+    assert 'file1.txt' in str(e.value)
+
+
+def test_client_add_project_split(client_mock):
+    """Test the parts are created as projects."""
+    fetch_json, client = client_mock
+    fetch_json.side_effect = lambda path, method, data: data['ProjectName']
+    project_obj = make_request([2000, 2000, 100])
+    created = client.add_project(project_obj, max_request_size=4000)
+    assert sorted(created) == ['Big (part 1/2)', 'Big (part 2/2)']
+    assert [f.name for f in created['Big (part 1/2)'].files] == [
+        'file0.txt', 'file2.txt',
+    ]
+    assert fetch_json.call_count == 2
+    for call in fetch_json.call_args_list:
+        data = call[1]['data']
+        assert len(json.dumps(data)) <= 4000
+        assert data['ReferenceNumber'].startswith('REF-')
+
+
+def test_client_add_project_split_failed(client_mock):
+    """Test the parts created are reported when other parts fail."""
+    fetch_json, client = client_mock
+
+    def fetch(path, method, data):
+        if data['ProjectName'].startswith('Big (part 2'):
+            raise ValueError()
+        return 1
+
+    fetch_json.side_effect = fetch
+    with pytest.raises(SplitProjectFailed) as e:
+        client.add_project(make_request([2000, 2000]), max_request_size=4000)
+    assert list(e.value.created) == [1]
+    assert list(e.value.errors) == ['Big (part 2/2)']
@@ -0,0 +1,213 @@
+"""Test content store."""
+import gc
+import pickle
+import threading
+import time
+
+import pytest
+
+from textunited import store
+from textunited.file import File
+from textunited.store import ContentStore
+
+
+@pytest.fixture
+def installed_store():
+    """Install a content store of 16 bytes during the test."""
+    content_store = ContentStore(max_bytes=16)
+    store.set_store(content_store)
+    yield content_store
+    store.set_store(None)
+
+
+def test_content_store_not_valid_max_bytes():
+    """Test not valid max_bytes."""
+    with pytest.raises(ValueError):
+        ContentStore(max_bytes=-1)
+
+
+def test_content_store_lru_eviction(mocker):
+    """Test least recently used contents are evicted first."""
+    content_store = ContentStore(max_bytes=10)
+    loader = mocker.Mock(return_value=b'aaaa')
+    content_store.put('a', b'aaaa', loader)
+    content_store.put('b', b'bbbb')
+    assert content_store.get('a') == b'aaaa'
+    content_store.put('c', b'cccc')
+    # b is the least recently used
+    assert content_store.resident_bytes == 8
+    assert content_store.get('b') is None
+    content_store.put('d', b'dddd')
+    assert content_store.get('a') == b'aaaa'
+    loader.assert_called_once_with()
+    assert content_store.stats() == {
+        'contents': 4,
+        'resident_contents': 2,
+        'resident_bytes': 8,
+        'max_bytes': 10,
+        'evictions': 3,
+        'loads': 1,
+    }
+    assert content_store.get('unknown') is None
+    content_store.put('a', None)
+    assert len(content_store) == 3
+
+
+def test_content_store_spill(tmpdir):
+    """Test evicted contents are spilled to disk and read again."""
+    content_store = ContentStore(max_bytes=4, spill_dir=str(tmpdir))
+    content_store.put('a', b'aaaa')
+    content_store.put('b', b'bbbb')
+    assert len(tmpdir.listdir()) == 1
+    assert content_store.get('a') == b'aaaa'
+    assert content_store.resident_bytes == 4
+    assert len(tmpdir.listdir()) == 2
+    content_store.clear()
+    assert tmpdir.listdir() == []
+    assert content_store.resident_bytes == 0
+
+
+def test_content_store_loader_without_lock():
+    """Test other contents are read while a content is loaded."""
+    content_store = ContentStore(max_bytes=4)
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def loader():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return b'aaaa'
+
+    content_store.put('a', b'aaaa', loader)
+    content_store.put('b', b'bbbb')
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(content_store.get('a')))
+        for _ in range(2)
+    ]
+    for thread in threads:
+        thread.start()
+    assert started.wait(5)
+    # the store is not locked by the loader
+    assert content_store.peek('b') == b'bbbb'
+    assert content_store.peek('a') is None
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert results == [b'aaaa', b'aaaa']
+    assert calls == [1]
+
+
+def test_content_store_loaded_before_wake_up(mocker):
+    """Test waiting readers find the content stored by the loader."""
+    class SlowEvent(threading.Event):
+        """Event letting the woken threads run before the setter goes on."""
+
+        def set(self):
+            super().set()
+            time.sleep(0.05)
+
+    mocker.patch('textunited.store.threading.Event', SlowEvent)
+    content_store = ContentStore(max_bytes=4)
+    started = threading.Event()
+    calls = []
+
+    def loader():
+        calls.append(1)
+        started.set()
+        time.sleep(0.05)
+        return b'aaaa'
+
+    content_store.put('a', b'aaaa', loader)
+    content_store.put('b', b'bbbb', lambda: b'bbbb')
+    reader = threading.Thread(target=content_store.get, args=('a',))
+    reader.start()
+    assert started.wait(5)
+    assert content_store.get('a') == b'aaaa'
+    reader.join(5)
+    assert calls == [1]
+
+
+def test_content_store_spilled_read_without_lock(tmpdir, mocker):
+    """Test spilled contents are read without holding the lock."""
+    content_store = ContentStore(max_bytes=4, spill_dir=str(tmpdir))
+    content_store.put('a', b'aaaa')
+    content_store.put('b', b'bbbb')
+    real_open = open
+    reads = []
+
+    class SpilledFile:
+        """File checking the lock of the store is free while read."""
+
+        def __init__(self, *args):
+            self.f = real_open(*args)
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc_info):
+            self.f.close()
+
+        def read(self):
+            # stats takes the lock of the store
+            reader = threading.Thread(target=content_store.stats)
+            reader.start()
+            reader.join(1)
+            reads.append(not reader.is_alive())
+            return self.f.read()
+
+    mocker.patch('textunited.store.open', SpilledFile, create=True)
+    assert content_store.get('a') == b'aaaa'
+    assert content_store.peek('b') == b'bbbb'
+    assert reads == [True, True]
+
+
+def test_file_contents_in_store(installed_store, file_factory):
+    """Test file contents are kept in the store and downloaded again."""
+    file, fetch_json, _, decoded = file_factory
+    file.get_translated_content()
+    file.source_content = b'0123456789'
+    assert installed_store.resident_bytes == 10
+    assert file._contents == {}
+    assert file.translated_content == decoded
+    assert fetch_json.call_count == 2
+    assert installed_store.resident_bytes == len(decoded)
+    # fetch_json is mocked and returns the same content
+    assert file.source_content == decoded
+    fetch_json.assert_called_with(
+        '/projectfiles?projectId=123&fileId=321&type=source'
+    )
+
+
+def test_file_contents_discarded_with_file(installed_store, client_mock):
+    """Test the contents are removed when the file is collected."""
+    _, client = client_mock
+    file = File(client, 1, 2, 'a.txt', None, 1, 1, 'Translated')
+    file.translated_content = b'a'
+    assert len(installed_store) == 1
+    del file
+    gc.collect()
+    assert len(installed_store) == 0
+
+
+def test_file_contents_without_store(client_mock):
+    """Test the contents are kept in the file without a store."""
+    _, client = client_mock
+    file = File(client, 1, 2, 'a.txt', None, 1, 1, 'Translated')
+    assert file.translated_content is None
+    file.translated_content = b'a'
+    assert file.translated_content == b'a'
+
+
+def test_file_pickle_without_download(installed_store, file_factory):
+    """Test pickling a file does not download its dropped contents."""
+    file, fetch_json, _, decoded = file_factory
+    file.get_translated_content()
+    file.source_content = b'0123456789abcdef'
+    assert fetch_json.call_count == 1
+    record = pickle.loads(pickle.dumps(file)).to_record()
+    assert fetch_json.call_count == 1
+    assert record['translated_content'] is None
+    assert record['source_content'] == b'0123456789abcdef'
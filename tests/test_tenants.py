@@ -0,0 +1,173 @@
+"""Test multi-tenant client pool."""
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+from textunited.breaker import CircuitBreaker
+from textunited.exceptions import CircuitOpen, ResourceUnavailable
+from textunited.scheduler import RequestScheduler
+from textunited.tenants import ClientPool, TenantScheduler, TokenBucket
+
+
+def test_token_bucket(clock):
+    """Test the bucket allows a burst and then the rate."""
+    bucket = TokenBucket(rate=2, burst=2, clock=clock, sleep=clock.sleep)
+    assert bucket.acquire() == 0
+    assert bucket.acquire() == 0
+    assert bucket.acquire() == pytest.approx(0.5)
+    assert clock.sleeps == [pytest.approx(0.5)]
+    with pytest.raises(ValueError):
+        TokenBucket(rate=0)
+
+
+def test_client_pool_tenants(mocker):
+    """Test the clients share the transport and the scheduler."""
+    transport = mocker.Mock()
+    pool = ClientPool(max_in_flight=8, transport=transport, hedging=None)
+    acme = pool.add_tenant('acme', 1, 'abc')
+    other = pool.add_tenant('other', 2, 'def', max_in_flight=1, rate=10)
+    assert pool['acme'] is acme
+    assert pool.get('missing') is None
+    assert 'other' in pool and len(pool) == 2
+    assert acme.transport is other.transport is transport
+    assert acme.auth.username == 1
+    assert isinstance(acme.scheduler, TenantScheduler)
+    assert acme.scheduler.pool is pool
+    assert acme.scheduler.max_in_flight == 4
+    assert other.scheduler.max_in_flight == 1
+    assert other.scheduler.bucket.rate == 10
+    pool.remove_tenant('other')
+    with pytest.raises(KeyError):
+        pool['other']
+    pool.close()
+    transport.close.assert_called_once_with()
+
+
+def test_client_pool_default_transport():
+    """Test the default transport is a shared session."""
+    pool = ClientPool()
+    assert pool.transport.session is not None
+    assert isinstance(pool.scheduler, RequestScheduler)
+    assert pool.scheduler.max_in_flight == 16
+
+
+class CookieHandler(BaseHTTPRequestHandler):
+    """Set a cookie and answer with the cookies received."""
+
+    def do_GET(self):
+        """Answer a GET request."""
+        body = '["{}"]'.format(self.headers.get('Cookie', '')).encode()
+        self.send_response(200)
+        self.send_header('Set-Cookie', 'session={}'.format(
+            self.headers['Authorization'][-8:]
+        ))
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        """Do not log the requests."""
+
+
+def test_client_pool_no_shared_cookies():
+    """Test cookies set for a tenant are not sent for the others."""
+    server = HTTPServer(('127.0.0.1', 0), CookieHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        pool = ClientPool(
+            base_url='http://127.0.0.1:{}/'.format(server.server_port)
+        )
+        pool.add_tenant('acme', company_id='1', api_key='a')
+        pool.add_tenant('other', company_id='2', api_key='b')
+        assert pool['acme'].fetch_json('/employees') == ['']
+        assert pool['other'].fetch_json('/employees') == ['']
+        assert pool['acme'].fetch_json('/employees') == ['']
+        assert len(pool.transport.session.cookies) == 0
+        pool.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_client_pool_metrics(mocker):
+    """Test requests and errors are counted by tenant."""
+    transport = mocker.Mock()
+    transport.request.return_value.status_code = 200
+    pool = ClientPool(transport=transport)
+    client = pool.add_tenant('acme', 1, 'abc')
+    client.fetch_json('/projects')
+    transport.request.return_value.status_code = 500
+    with pytest.raises(ResourceUnavailable):
+        client.fetch_json('/projects')
+    stats = pool.stats()
+    assert stats['tenants']['acme']['requests'] == 2
+    assert stats['tenants']['acme']['errors'] == 1
+    assert stats['tenants']['acme']['in_flight'] == 0
+    assert stats['scheduler']['interactive']['in_flight'] == 0
+
+
+def test_tenant_quota():
+    """Test a tenant cannot use more than its quota."""
+    pool = ClientPool(max_in_flight=4, tenant_max_in_flight=1,
+                      transport=object())
+    busy = pool.add_tenant('busy', 1, 'abc').scheduler
+    other = pool.add_tenant('other', 2, 'def').scheduler
+    entered = threading.Event()
+
+    def second_request():
+        with busy.slot():
+            entered.set()
+
+    with busy.slot():
+        thread = threading.Thread(target=second_request)
+        thread.start()
+        assert not entered.wait(0.1)
+        with other.slot():
+            assert pool.scheduler.in_flight == 2
+    thread.join(5)
+    assert entered.is_set()
+
+
+def test_client_pool_breaker_by_tenant(mocker):
+    """Test each tenant has its own circuit breaker."""
+    transport = mocker.Mock()
+    transport.request.return_value.status_code = 500
+    breaker = CircuitBreaker(failure_threshold=1)
+    pool = ClientPool(transport=transport, hedging=None, breaker=breaker)
+    acme = pool.add_tenant('acme', 1, 'abc')
+    other = pool.add_tenant('other', 2, 'def')
+    assert acme.breaker is not other.breaker
+    assert acme.breaker is not breaker
+    assert acme.breaker.failure_threshold == 1
+    with pytest.raises(ResourceUnavailable):
+        acme.fetch_json('/projects')
+    with pytest.raises(CircuitOpen):
+        acme.fetch_json('/projects')
+    transport.request.return_value.status_code = 200
+    other.fetch_json('/projects')
+    own = CircuitBreaker()
+    assert pool.add_tenant('own', 3, 'ghi', breaker=own).breaker is own
+
+
+def test_tenant_rate_after_slot(mocker):
+    """Test the rate tokens are taken once the shared slot is held."""
+    pool = ClientPool(max_in_flight=1, rate=10, transport=object())
+    scheduler = pool.add_tenant('acme', 1, 'abc', rate=10).scheduler
+    calls = []
+    slot = pool.scheduler.slot
+
+    def shared_slot(priority):
+        calls.append('slot')
+        return slot(priority)
+
+    mocker.patch.object(pool.scheduler, 'slot', side_effect=shared_slot)
+    mocker.patch.object(scheduler.bucket, 'acquire',
+                        side_effect=lambda: calls.append('tenant'))
+    mocker.patch.object(pool.bucket, 'acquire',
+                        side_effect=lambda: calls.append('pool'))
+    with scheduler.slot():
+        pass
+    assert calls == ['slot', 'tenant', 'pool']
@@ -1,4 +1,8 @@
 """Text client calls."""
+import os
+import subprocess
+import sys
+
 import pytest
 
 import textunited
@@ -57,3 +61,30 @@ def test_add_project(mock_request, client):
     )
     project_id = client.add_project(project)
     assert project_id == '1232'
+
+
+def test_lazy_import_does_not_import_requests():
+    """Test requests is only imported when the client is used.
+
+    The module class is replaced, so it also runs on Python 3.6.
+    """
+    code = (
+        'import sys, textunited; '
+        'assert "requests" not in sys.modules; '
+        'textunited.Language; '
+        'assert "requests" not in sys.modules; '
+        'textunited.TextUnitedClient; '
+        'assert "requests" in sys.modules'
+    )
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    subprocess.check_call([sys.executable, '-c', code], env=env)
+
+
+def test_lazy_attributes():
+    """Test lazy attributes are listed and unknown ones raise."""
+    assert 'TextUnitedClient' in dir(textunited)
+    assert textunited.Language is Language
+    assert textunited.__dict__['Language'] is Language
+    assert type(textunited).__name__ == '_LazyModule'
+    with pytest.raises(AttributeError):
+        textunited.Unknown
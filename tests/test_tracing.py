@@ -0,0 +1,158 @@
+"""Test tracing."""
+import pytest
+import requests
+
+from textunited.client import TextUnitedClient
+from textunited.exceptions import ProjectNotFound
+from textunited.project import Project
+from textunited.tracing import (
+    NOOP_SPAN,
+    NOOP_TRACER,
+    FileExporter,
+    OpenTelemetryTracer,
+    Tracer,
+    read_spans,
+)
+
+
+class ListExporter:
+    """Exporter keeping the spans in a list."""
+
+    def __init__(self):
+        """Constructor."""
+        self.spans = []
+
+    def export(self, span):
+        """Keep the span."""
+        self.spans.append(span)
+
+
+@pytest.fixture
+def tracer():
+    """Return a tracer exporting to a list."""
+    return Tracer(ListExporter())
+
+
+def test_noop_tracer():
+    """Test the default tracer does nothing."""
+    client = TextUnitedClient(company_id=123, api_key='abc')
+    assert client.tracer is NOOP_TRACER
+    with NOOP_TRACER.span('name', {'a': 1}) as span:
+        assert span is NOOP_SPAN
+        span.set_attribute('b', 2)
+        assert not span.is_recording()
+
+
+def test_tracer_nested_spans(tracer):
+    """Test spans opened inside another span are its children."""
+    with tracer.span('parent', {'a': 1}) as parent:
+        assert tracer.current_span() is parent
+        with pytest.raises(ValueError):
+            with tracer.span('child') as child:
+                child.set_attribute('b', 2)
+                raise ValueError('error')
+    assert tracer.current_span() is None
+    assert tracer.exporter.spans == [child, parent]
+    assert child.parent_id == parent.span_id
+    assert child.trace_id == parent.trace_id
+    assert parent.parent_id is None
+    assert child.status == 'ERROR'
+    assert child.error == 'ValueError: error'
+    assert parent.status == 'OK'
+    assert parent.duration >= child.duration >= 0
+    assert child.to_dict()['attributes'] == {'b': 2}
+
+
+def test_file_exporter(tmpdir):
+    """Test the spans are written to a JSON lines file."""
+    path = str(tmpdir.join('spans.jsonl'))
+    exporter = FileExporter(path)
+    tracer = Tracer(exporter)
+    with tracer.span('parent'):
+        with tracer.span('child', {'size': 10}):
+            pass
+    exporter.close()
+    spans = read_spans(path)
+    assert [span['name'] for span in spans] == ['child', 'parent']
+    assert spans[0]['attributes'] == {'size': 10}
+    assert spans[0]['parent_id'] == spans[1]['span_id']
+
+
+def test_opentelemetry_tracer(mocker):
+    """Test spans are started in the OpenTelemetry tracer."""
+    otel_tracer = mocker.Mock()
+    tracer = OpenTelemetryTracer(otel_tracer)
+    span = tracer.span('name', {'a': 1, 'b': None})
+    assert span is otel_tracer.start_as_current_span.return_value
+    otel_tracer.start_as_current_span.assert_called_once_with(
+        'name', attributes={'a': 1}
+    )
+
+
+def test_client_spans(tracer, mock_request, data_list_projects):
+    """Test public operations and requests open spans."""
+    client = TextUnitedClient(company_id=123, api_key='abc', tracer=tracer)
+    mock_request.return_value.json.return_value = data_list_projects[0]
+    mock_request.return_value.content = b'0123456789'
+    client.get_project(8766)
+
+    request, operation = tracer.exporter.spans
+    assert operation.name == 'textunited.get_project'
+    assert operation.attributes == {'textunited.project_id': 8766}
+    assert request.name == 'GET projects'
+    assert request.parent_id == operation.span_id
+    assert request.attributes == {
+        'http.method': 'GET',
+        'http.status_code': 200,
+        'http.response_content_length': 10,
+        'textunited.endpoint': 'projects',
+        'textunited.path': 'projects/8766',
+        'textunited.retries': 0,
+    }
+
+    mock_request.return_value.status_code = 404
+    with pytest.raises(ProjectNotFound):
+        client.get_project(1)
+    request, operation = tracer.exporter.spans[2:]
+    assert request.attributes['http.status_code'] == 404
+    assert request.status == operation.status == 'ERROR'
+
+
+def test_project_file_spans(tracer, mock_request, data_list_projects,
+                            data_list_files):
+    """Test get_files and content downloads are nested spans."""
+    client = TextUnitedClient(company_id=123, api_key='abc', tracer=tracer)
+    project = Project.from_json(client, data_list_projects[0])
+    mock_request.return_value.json.side_effect = [
+        data_list_files, {'Content': 'aGVsbG8='},
+    ]
+    project.get_files()
+    names = [span.name for span in tracer.exporter.spans]
+    assert names == [
+        'GET projectfiles', 'GET projectfiles',
+        'textunited.get_translated_content', 'textunited.get_files',
+    ]
+    download, files = tracer.exporter.spans[2:]
+    assert download.parent_id == files.span_id
+    assert download.attributes == {
+        'textunited.project_id': 8766,
+        'textunited.file_id': 156148,
+        'textunited.file_size': 6991,
+    }
+
+
+def test_client_span_retries(tracer, mocker, mock_request):
+    """Test the requests sent again to other endpoints are counted."""
+    client = TextUnitedClient(
+        company_id=123, api_key='abc', tracer=tracer,
+        base_url=['https://eu.example.com/api/', 'https://us.example.com/api/'],
+    )
+    mock_request.side_effect = [
+        requests.ConnectionError(), mocker.Mock(status_code=200),
+    ]
+    client.fetch_response('/projects')
+    span, = tracer.exporter.spans
+    assert span.attributes['textunited.retries'] == 1
+    assert span.attributes['textunited.base_url'] == (
+        'https://us.example.com/api/'
+    )
@@ -0,0 +1,127 @@
+"""Test HTTP transports."""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+import requests
+
+from textunited.client import TextUnitedClient
+from textunited.exceptions import ResourceUnavailable
+from textunited.transport import (
+    HTTP2Transport,
+    RequestsTransport,
+    Transport,
+    Urllib3Transport,
+)
+
+
+class Handler(BaseHTTPRequestHandler):
+    """Handler answering with the received request."""
+
+    def do_GET(self):
+        """Answer with the path and the authorization header."""
+        status = 404 if self.path.endswith('missing') else 200
+        self._answer(status, {
+            'path': self.path,
+            'authorization': self.headers['Authorization'],
+        })
+
+    def do_POST(self):
+        """Answer with the received JSON body."""
+        length = int(self.headers['Content-Length'])
+        self._answer(200, json.loads(self.rfile.read(length).decode()))
+
+    def _answer(self, status, obj):
+        body = json.dumps(obj).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', '"v1"')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        """Do not log the requests."""
+        pass
+
+
+@pytest.fixture(scope='module')
+def server_url():
+    """Start a local server and return its URL."""
+    server = HTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield 'http://127.0.0.1:{}/api/'.format(server.server_port)
+    server.shutdown()
+    server.server_close()
+
+
+def _transports():
+    """Return a factory of each transport."""
+    yield RequestsTransport
+    yield lambda: RequestsTransport(requests.Session())
+    yield Urllib3Transport
+    try:
+        import httpx  # noqa:F401
+    except ImportError:
+        return
+    yield HTTP2Transport
+
+
+@pytest.mark.parametrize('transport_factory', list(_transports()))
+def test_transports(server_url, transport_factory):
+    """Test the transports with a local server."""
+    transport = transport_factory()
+    client = TextUnitedClient('123', 'abc', transport=transport)
+    url = server_url + 'projects'
+    auth = client.auth
+
+    response = client._request('GET', url, {'accept': 'application/json'})
+    assert response.status_code == 200
+    assert response.headers['etag'] == '"v1"'
+    assert response.json() == {
+        'path': '/api/projects',
+        'authorization': 'Basic MTIzOmFiYw==',
+    }
+
+    response = transport.request(
+        'POST', url, {'content-type': 'application/json'}, auth, json={'a': 1}
+    )
+    assert response.json() == {'a': 1}
+
+    with pytest.raises(ResourceUnavailable) as e:
+        client._request('GET', server_url + 'missing', {})
+    assert 'missing' in str(e.value)
+    transport.close()
+
+
+def test_transport_base_class():
+    """Test the base class is abstract."""
+    with pytest.raises(NotImplementedError):
+        Transport().request('GET', 'url', {}, None)
+    Transport().pool_connections()
+    Transport().close()
+
+
+def test_requests_transport_timeout(mocker):
+    """Test the timeout is given to requests."""
+    session = mocker.Mock()
+    RequestsTransport(session, timeout=5).request('GET', 'url', {}, None)
+    session.request.assert_called_once_with(
+        'GET', 'url', headers={}, auth=None, json=None, timeout=5
+    )
+
+
+def test_http2_transport_without_httpx(mocker):
+    """Test the error when httpx is not installed."""
+    mocker.patch.dict('sys.modules', {'httpx': None})
+    with pytest.raises(ImportError):
+        HTTP2Transport()
+
+
+def test_client_default_transport():
+    """Test requests is the default transport."""
+    client = TextUnitedClient('123', 'abc')
+    assert isinstance(client.transport, RequestsTransport)
+    assert client.transport.session is None
@@ -0,0 +1,155 @@
+"""Test watcher."""
+import asyncio
+
+import pytest
+
+from textunited.watcher import (
+    FileChanged,
+    FileTranslated,
+    ProjectAdded,
+    ProjectChanged,
+    ProjectRemoved,
+    Watcher,
+)
+
+
+@pytest.fixture
+def watcher_factory(client_mock, data_list_projects, data_list_files):
+    """Return a watcher after the first poll."""
+    fetch_json, client = client_mock
+
+    def fetch(uri):
+        if uri == '/projects':
+            return data_list_projects
+        return data_list_files
+
+    fetch_json.side_effect = fetch
+    watcher = Watcher(client, min_interval=0.01, max_interval=0.04)
+    assert watcher.poll() == []
+    fetch_json.reset_mock()
+    return watcher, fetch_json
+
+
+def test_watcher_not_valid_intervals(client_mock):
+    """Test not valid intervals."""
+    with pytest.raises(ValueError):
+        Watcher(client_mock[1], min_interval=10, max_interval=1)
+
+
+def test_watcher_no_changes(watcher_factory):
+    """Test no events and no file requests when nothing changes."""
+    watcher, fetch_json = watcher_factory
+    assert watcher.poll() == []
+    fetch_json.assert_called_once_with('/projects')
+
+
+def test_watcher_project_and_file_changes(
+        mocker, watcher_factory, data_list_projects, data_list_files):
+    """Test project and file events."""
+    watcher, fetch_json = watcher_factory
+    callback = mocker.Mock()
+    watcher.subscribe(callback)
+    data_list_projects[0]['Progress'] = 100
+    data_list_projects[0]['State'] = 'Completed'
+    data_list_files[1]['Status'] = 'Translated'
+    data_list_files.append(dict(data_list_files[0], FileId=1, Status='New'))
+    removed = data_list_projects.pop()
+    new = dict(removed, Id=1)
+    data_list_projects.append(new)
+
+    events = watcher.poll()
+    assert [type(e) for e in events] == [
+        ProjectChanged, FileTranslated, FileChanged, ProjectAdded,
+        ProjectRemoved,
+    ]
+    assert events[0].changes == {
+        'status': ('In progress', 'Completed'),
+        'progress': (0, 100),
+    }
+    assert events[1].file.id_ == 156155
+    assert events[1].old_status == 'Preprocessed'
+    assert events[2].old_status is None
+    assert events[3].project.id_ == 1
+    assert events[4].project_id == 8767
+    assert callback.call_count == 5
+    assert 'ProjectRemoved' in repr(events[4])
+
+
+def test_watcher_failed_poll(
+        watcher_factory, data_list_projects, data_list_files):
+    """Test a poll failing partway is retried from the previous state."""
+    watcher, fetch_json = watcher_factory
+    data_list_projects[0]['Progress'] = 50
+    data_list_projects[1]['Progress'] = 50
+    data_list_files[1]['Status'] = 'Translated'
+    calls = []
+
+    def fetch(uri):
+        if uri == '/projects':
+            return data_list_projects
+        calls.append(uri)
+        if len(calls) == 2:
+            raise ValueError()
+        return data_list_files
+
+    fetch_json.side_effect = fetch
+    with pytest.raises(ValueError):
+        watcher.poll()
+
+    events = watcher.poll()
+    assert [type(e) for e in events] == [
+        ProjectChanged, FileTranslated, ProjectChanged, FileTranslated,
+    ]
+    assert watcher.poll() == []
+
+
+def test_watcher_callback_errors_and_unsubscribe(
+        mocker, watcher_factory, data_list_projects):
+    """Test a failing callback does not stop the others."""
+    watcher, _ = watcher_factory
+    failing = mocker.Mock(side_effect=RuntimeError)
+    callback = mocker.Mock()
+    watcher.subscribe(failing)
+    unsubscribe = watcher.subscribe(callback)
+    data_list_projects.pop()
+    watcher.poll()
+    callback.assert_called_once()
+    unsubscribe()
+    data_list_projects.pop()
+    watcher.poll()
+    callback.assert_called_once()
+
+
+def test_watcher_events_async_iterator(watcher_factory, data_list_projects):
+    """Test events are received by the async iterator."""
+    watcher, _ = watcher_factory
+
+    async def consume():
+        events = watcher.events()
+        first = asyncio.ensure_future(events.__anext__())
+        await asyncio.sleep(0)
+        data_list_projects.pop()
+        await asyncio.get_event_loop().run_in_executor(None, watcher.poll)
+        event = await first
+        await events.aclose()
+        return event
+
+    loop = asyncio.new_event_loop()
+    try:
+        event = loop.run_until_complete(consume())
+    finally:
+        loop.close()
+    assert isinstance(event, ProjectRemoved)
+    assert watcher._callbacks == []
+
+
+def test_watcher_background_thread(watcher_factory, data_list_projects):
+    """Test the adaptive interval of the polling loop."""
+    watcher, fetch_json = watcher_factory
+    watcher.start()
+    with pytest.raises(RuntimeError):
+        watcher.start()
+    watcher._stop.wait(0.1)
+    watcher.stop()
+    assert watcher.interval == 0.04
+    assert fetch_json.call_count >= 2